@@ -0,0 +1,118 @@
+"""
+数据库查询基准：在填充了数百万条日志的数据库上，对比迁移前 (无索引 + 相关 COUNT) 与迁移后
+(复合索引 + 触发器维护的计数器) 的项目列表与单项目查询耗时。
+
+用法: python benchmarks/bench_db_queries.py --logs 2000000 --vulns 200000 --projects 20
+"""
+import sys
+import time
+import random
+import sqlite3
+import argparse
+import tempfile
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from src.utils.db_helper import DBHelper
+
+LEGACY_LIST_PROJECTS = '''
+    SELECT p.id, p.name, p.created_at,
+           (SELECT COUNT(*) FROM vulnerabilities v WHERE v.project_id = p.id) as vuln_count,
+           (SELECT COUNT(*) FROM agent_logs l WHERE l.project_id = p.id) as log_count
+    FROM projects p
+    ORDER BY created_at DESC
+'''
+LEGACY_PROJECT_LOGS = 'SELECT l.* FROM agent_logs l WHERE l.project_id = ? ORDER BY l.timestamp DESC LIMIT 100'
+LEGACY_PROJECT_VULNS = '''
+    SELECT v.*, p.name as project_name FROM vulnerabilities v
+    JOIN projects p ON v.project_id = p.id
+    WHERE v.project_id = ?
+    ORDER BY v.found_at DESC LIMIT 100
+'''
+
+def seed(helper: DBHelper, projects: int, logs: int, vulns: int, batch: int = 50000):
+    """批量插入随机数据 (时间戳分散在 90 天内)"""
+    project_ids = [helper.get_or_create_project(f"bench-{i}") for i in range(projects)]
+    base = time.time() - 90 * 86400
+
+    def ts() -> str:
+        return time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(base + random.random() * 90 * 86400))
+
+    with helper._get_connection() as conn:
+        for start in range(0, logs, batch):
+            rows = [
+                (random.choice(project_ids), f"task-{random.randint(0, 99999)}", "SQLi_Analyzer", "prompt", "response", ts())
+                for _ in range(min(batch, logs - start))
+            ]
+            conn.executemany(
+                'INSERT INTO agent_logs (project_id, request_id, agent_name, prompt, response, timestamp) VALUES (?, ?, ?, ?, ?, ?)',
+                rows
+            )
+            conn.commit()
+        for start in range(0, vulns, batch):
+            rows = [
+                (random.choice(project_ids), f"task-{random.randint(0, 99999)}", "SQLi", "http://t/api", "GET", "id", "1'", "error", ts())
+                for _ in range(min(batch, vulns - start))
+            ]
+            conn.executemany(
+                'INSERT INTO vulnerabilities (project_id, request_id, vuln_type, url, method, parameter, payload, evidence, found_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                rows
+            )
+            conn.commit()
+    return project_ids
+
+def timed(fn, repeat: int = 5) -> float:
+    """返回多次执行的中位数耗时 (毫秒)"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return sorted(samples)[len(samples) // 2]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logs", type=int, default=2_000_000)
+    parser.add_argument("--vulns", type=int, default=200_000)
+    parser.add_argument("--projects", type=int, default=20)
+    parser.add_argument("--db", type=str, default=None, help="数据库路径 (默认使用临时文件)")
+    args = parser.parse_args()
+
+    db_path = args.db or tempfile.mktemp(suffix=".db", prefix="bench_")
+    helper = DBHelper(db_path)
+
+    start = time.perf_counter()
+    project_ids = seed(helper, args.projects, args.logs, args.vulns)
+    print(f"seeded {args.logs} logs / {args.vulns} vulns / {args.projects} projects in {time.perf_counter() - start:.1f}s ({db_path})")
+    target = project_ids[0]
+
+    migrated = {
+        "list_projects": timed(helper.list_projects),
+        "project logs (100)": timed(lambda: helper.repo.query_logs(target, limit=100)),
+        "project vulns (100)": timed(lambda: helper.repo.query_vulnerabilities(target, limit=100)),
+    }
+
+    # 模拟迁移前的结构：去掉索引，使用相关 COUNT 子查询
+    raw = sqlite3.connect(db_path)
+    for index in ("idx_vulns_project_found", "idx_vulns_found", "idx_logs_project_ts"):
+        raw.execute(f"DROP INDEX IF EXISTS {index}")
+    raw.commit()
+    legacy = {
+        "list_projects": timed(lambda: raw.execute(LEGACY_LIST_PROJECTS).fetchall(), repeat=3),
+        "project logs (100)": timed(lambda: raw.execute(LEGACY_PROJECT_LOGS, (target,)).fetchall(), repeat=3),
+        "project vulns (100)": timed(lambda: raw.execute(LEGACY_PROJECT_VULNS, (target,)).fetchall(), repeat=3),
+    }
+    raw.close()
+
+    print(f"{'query':>22} | {'legacy (ms)':>12} | {'migrated (ms)':>14}")
+    for name in migrated:
+        print(f"{name:>22} | {legacy[name]:>12.2f} | {migrated[name]:>14.2f}")
+
+    if not args.db:
+        helper.pool.close()
+        for suffix in ("", "-wal", "-shm"):
+            Path(db_path + suffix).unlink(missing_ok=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+探测日志开销基准：使用 httpx.MockTransport (无网络) 驱动 StructuredExecutor，对比不同日志配置下
+每个探测请求的耗时，以及旧版 f-string 写法与惰性写法在单次日志调用上的开销。
+
+用法: python benchmarks/bench_probe_logging.py --probes 5000 --concurrency 50
+"""
+import sys
+import time
+import asyncio
+import argparse
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import httpx
+from loguru import logger
+from src.config.settings import settings
+from src.core.engine import structured_executor
+from src.core.engine.structured_executor import StructuredExecutor
+from src.utils.logger_config import lazy_logger, ProbeSampler
+
+HEADERS = {f"X-Header-{i}": "v" * 40 for i in range(20)}
+BODY = "username=admin&password={{PASS}}&token=" + "t" * 500
+
+def make_packet(probes: int) -> dict:
+    return {
+        "request": {
+            "method": "POST",
+            "target_url": "http://bench.local/login",
+            "headers": {**HEADERS, "Content-Type": "application/x-www-form-urlencoded"},
+            "body": BODY,
+        },
+        "test_cases": [{"parameter": "{{PASS}}", "payload": [f"' OR {i}=1 --" for i in range(probes)]}],
+    }
+
+def configure(level: str):
+    """模拟 setup_logging 的格式化 sink，输出丢弃，只保留格式化成本"""
+    logger.remove()
+    if level != "OFF":
+        logger.add(lambda message: None, level=level, format="{time:HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}")
+
+def run_executor(probes: int, concurrency: int) -> float:
+    """返回每个探测请求的平均耗时 (微秒)"""
+    # 使用流式响应体，使 httpx 在读取完毕后正常设置 elapsed
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, stream=httpx.ByteStream(b"ok")))
+    original_client = httpx.AsyncClient
+
+    class MockClient(original_client):
+        def __init__(self, *args, **kwargs):
+            kwargs.pop("proxy", None)
+            kwargs["transport"] = transport
+            super().__init__(*args, **kwargs)
+
+    structured_executor.httpx.AsyncClient = MockClient
+    try:
+        executor = StructuredExecutor(max_concurrency=concurrency)
+        packet = make_packet(probes)
+        start = time.perf_counter()
+        asyncio.run(executor.execute_structured(packet, original_response="ok"))
+        return (time.perf_counter() - start) / probes * 1e6
+    finally:
+        structured_executor.httpx.AsyncClient = original_client
+
+def legacy_call(method, url, body, headers, param_name, payload):
+    logger.debug(f"发送结构化探测 | 方法: {method} | URL: {url} | Body: {body[:200] if body else 'None'} | Headers: {headers} | 参数点: {param_name} | Payload: {payload}")
+
+def lazy_call(method, url, body, headers, param_name, payload, sampler):
+    if sampler.sample():
+        lazy_logger.debug("发送结构化探测 | {}", lambda: (
+            f"方法: {method} | URL: {url} | Body: {body[:200] if body else 'None'} | "
+            f"Headers: {headers} | 参数点: {param_name} | Payload: {payload}"
+        ))
+
+def time_calls(fn, calls: int) -> float:
+    """返回单次调用的平均耗时 (纳秒)"""
+    args = ("POST", "http://bench.local/login", BODY, HEADERS, "{{PASS}}", "' OR 1=1 --")
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn(*args)
+    return (time.perf_counter() - start) / calls * 1e9
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--probes", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--calls", type=int, default=100_000)
+    args = parser.parse_args()
+
+    print(f"{'log call (per call)':>34} | {'INFO (ns)':>10} | {'DEBUG (ns)':>10}")
+    rows = {
+        "legacy f-string": lambda *a: legacy_call(*a),
+        "lazy, sample 1.0": lambda *a, s=ProbeSampler(1.0): lazy_call(*a, s),
+        "lazy, sample 0.01": lambda *a, s=ProbeSampler(0.01): lazy_call(*a, s),
+    }
+    for name, fn in rows.items():
+        results = []
+        for level in ("INFO", "DEBUG"):
+            configure(level)
+            results.append(time_calls(fn, args.calls))
+        print(f"{name:>34} | {results[0]:>10.0f} | {results[1]:>10.0f}")
+
+    print()
+    print(f"{'executor (per probe, mock transport)':>34} | {'us/probe':>10}")
+    for level, rate in (("OFF", 1.0), ("INFO", 1.0), ("DEBUG", 1.0), ("DEBUG", 0.01)):
+        configure(level)
+        structured_executor.probe_sampler = ProbeSampler(rate)
+        label = f"{level}" + (f", sample {rate}" if level == "DEBUG" else "")
+        print(f"{label:>34} | {run_executor(args.probes, args.concurrency):>10.1f}")
+
+if __name__ == "__main__":
+    settings.SCAN_PROXY = None
+    main()
@@ -0,0 +1,87 @@
+"""
+Strategist 并发吞吐基准：对比阻塞式 invoke 与异步 agenerate 在 SCAN_MAX_TASKS 下的任务吞吐。
+
+用法: python benchmarks/bench_strategist_concurrency.py --tasks 12 --latency 0.5
+"""
+import sys
+import time
+import asyncio
+import argparse
+from pathlib import Path
+from typing import Any, List, Optional
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from src.config.settings import settings
+from src.core.llm.service import AuditedLLM, ModelCascade
+from src.core.engine.strategist import GenericStrategist
+from src.utils import auditor as auditor_module
+
+RESPONSE = '{"request": {"method": "GET", "target_url": "http://t/?id={{1}}"}, "test_cases": [{"parameter": "{{1}}", "payload": ["1\'"]}]}'
+
+class SlowFakeLLM(FakeListChatModel):
+    """模拟固定延迟的 LLM：同步路径阻塞线程，异步路径让出事件循环"""
+    model_name: str = "bench-fake"
+    latency: float = 0.5
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=RESPONSE))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=RESPONSE))])
+
+def build_strategist(latency: float) -> GenericStrategist:
+    strategist = GenericStrategist()
+    strategist.audited_llm = AuditedLLM(SlowFakeLLM(responses=[RESPONSE], latency=latency))
+    strategist.cascade = ModelCascade(strategist.audited_llm)
+    return strategist
+
+USER_CONTEXT = {"points": ["id"], "full_request": {"method": "GET", "url": "http://t/?id=1"}}
+
+async def run_tasks(strategist: GenericStrategist, tasks: int, max_tasks: int, blocking: bool, probe_time: float) -> float:
+    semaphore = asyncio.Semaphore(max_tasks)
+
+    async def one_task(i: int):
+        async with semaphore:
+            if blocking:
+                # 旧实现：在协程内直接调用同步 invoke，阻塞整个事件循环
+                prompt, inputs = strategist._build_prompt("sys", USER_CONTEXT)
+                strategist.audited_llm.invoke(
+                    chain=prompt | strategist.audited_llm.llm, inputs=inputs,
+                    agent_name="Bench_Strategist", task_id=str(i), prompt_template=prompt, use_cache=False
+                )
+            else:
+                await strategist.agenerate("Bench", "sys", USER_CONTEXT, request_id=str(i))
+            # 模拟执行器的网络探测
+            await asyncio.sleep(probe_time)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one_task(i) for i in range(tasks)))
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, default=12)
+    parser.add_argument("--latency", type=float, default=0.5, help="模拟的 LLM 延迟 (秒)")
+    parser.add_argument("--probe-time", type=float, default=0.2, help="模拟的探测耗时 (秒)")
+    args = parser.parse_args()
+
+    # 排除缓存与审计 I/O 的干扰，只衡量事件循环的并发能力
+    settings.LLM_CACHE_ENABLED = False
+    auditor_module.auditor.record = lambda **kwargs: None
+
+    strategist = build_strategist(args.latency)
+    print(f"tasks={args.tasks} llm_latency={args.latency}s probe_time={args.probe_time}s")
+    print(f"{'max_tasks':>10} | {'blocking (tasks/s)':>20} | {'async (tasks/s)':>18}")
+    for max_tasks in (1, 2, 4, 8):
+        blocking = asyncio.run(run_tasks(strategist, args.tasks, max_tasks, True, args.probe_time))
+        non_blocking = asyncio.run(run_tasks(strategist, args.tasks, max_tasks, False, args.probe_time))
+        print(f"{max_tasks:>10} | {args.tasks / blocking:>20.2f} | {args.tasks / non_blocking:>18.2f}")
+
+if __name__ == "__main__":
+    main()
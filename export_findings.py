@@ -0,0 +1,37 @@
+"""
+漏洞导出命令行工具：流式写出 NDJSON / CSV / SARIF。
+
+用法: python export_findings.py --project Default --format sarif --include-request --include-logs -o findings.sarif
+"""
+import os
+import sys
+import argparse
+
+# 确保项目根目录在 path 中
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from src.utils.db_helper import db_helper
+from src.utils.exporter import EXPORT_FORMATS, buffered, iter_export
+
+def main():
+    parser = argparse.ArgumentParser(description="导出扫描发现的漏洞")
+    parser.add_argument("--project", default=None, help="项目名称 (默认导出全部项目)")
+    parser.add_argument("--format", choices=list(EXPORT_FORMATS), default="ndjson")
+    parser.add_argument("--include-request", action="store_true", help="包含完整原始请求")
+    parser.add_argument("--include-logs", action="store_true", help="包含关联的 Agent 交互日志")
+    parser.add_argument("-o", "--output", default="-", help="输出文件 (默认输出到标准输出)")
+    args = parser.parse_args()
+
+    rows = db_helper.iter_vulnerabilities(args.project, include_request=args.include_request, include_logs=args.include_logs)
+    chunks = buffered(iter_export(rows, args.format, args.include_request, args.include_logs))
+    if args.output == "-":
+        for chunk in chunks:
+            sys.stdout.buffer.write(chunk)
+        sys.stdout.buffer.flush()
+        return
+    with open(args.output, "wb") as f:
+        for chunk in chunks:
+            f.write(chunk)
+
+if __name__ == "__main__":
+    main()
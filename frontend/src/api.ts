@@ -12,8 +12,10 @@ export const SettingsAPI = {
 export const ProjectsAPI = {
   listProjects: () => api.get('/projects/'),
   deleteProject: (id: number) => api.delete(`/projects/${id}`),
-  getVulnerabilities: (name: string) => api.get(`/projects/${name}/vulnerabilities`),
-  getLogs: (name: string) => api.get(`/projects/${name}/logs`),
+  // 游标分页：下一页游标在响应头 x-next-cursor 中
+  getVulnerabilities: (name: string, params: Record<string, any> = {}) => api.get(`/projects/${name}/vulnerabilities`, { params }),
+  getLogs: (name: string, params: Record<string, any> = {}) => api.get(`/projects/${name}/logs`, { params }),
+  getLog: (name: string, id: number) => api.get(`/projects/${name}/logs/${id}`),
 };
 
 export const ScannerAPI = {
@@ -23,7 +25,7 @@ export const ScannerAPI = {
 };
 
 export const VulnerabilitiesAPI = {
-  listAll: () => api.get('/vulnerabilities/'),
+  listAll: (params: Record<string, any> = {}) => api.get('/vulnerabilities/', { params }),
 };
 
 export default api;
@@ -26,10 +26,13 @@ interface Log {
   id: number;
   agent_name: string;
   timestamp: string;
-  prompt: string;
+  prompt?: string;
   response: string;
 }
 
+// 列表视图不加载 Prompt，查看详情时再单独获取
+const LOG_LIST_FIELDS = 'agent_name,timestamp,response';
+
 interface Vulnerability {
   id: number;
   vuln_type: string;
@@ -41,6 +44,8 @@ interface Vulnerability {
   found_at: string;
   url: string;
   method: string;
+  hit_count?: number;
+  last_seen?: string;
 }
 
 const ProjectsView: React.FC = () => {
@@ -54,6 +59,8 @@ const ProjectsView: React.FC = () => {
   const [searchTerm, setSearchTerm] = useState('');
   const [selectedLog, setSelectedLog] = useState<Log | null>(null);
   const [selectedVuln, setSelectedVuln] = useState<Vulnerability | null>(null);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   const filteredProjects = projects.filter(p => 
     p.name.toLowerCase().includes(searchTerm.toLowerCase())
@@ -81,17 +88,24 @@ const ProjectsView: React.FC = () => {
     }
   };
 
-  const fetchProjectDetails = async () => {
+  const fetchPage = async (cursor?: string) => {
     if (!selectedProject) return;
+    const params = cursor ? { cursor } : {};
+    if (activeSubTab === 'logs') {
+      const response = await ProjectsAPI.getLogs(selectedProject.name, { ...params, fields: LOG_LIST_FIELDS });
+      setLogs(prev => cursor ? [...prev, ...response.data] : response.data);
+      setNextCursor(response.headers['x-next-cursor'] || null);
+    } else {
+      const response = await ProjectsAPI.getVulnerabilities(selectedProject.name, params);
+      setVulnerabilities(prev => cursor ? [...prev, ...response.data] : response.data);
+      setNextCursor(response.headers['x-next-cursor'] || null);
+    }
+  };
+
+  const fetchProjectDetails = async () => {
     setDetailsLoading(true);
     try {
-      if (activeSubTab === 'logs') {
-        const response = await ProjectsAPI.getLogs(selectedProject.name);
-        setLogs(response.data);
-      } else {
-        const response = await ProjectsAPI.getVulnerabilities(selectedProject.name);
-        setVulnerabilities(response.data);
-      }
+      await fetchPage();
     } catch (error) {
       console.error('Failed to fetch project details:', error);
     } finally {
@@ -99,6 +113,41 @@ const ProjectsView: React.FC = () => {
     }
   };
 
+  const loadMore = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    try {
+      await fetchPage(nextCursor);
+    } catch (error) {
+      console.error('Failed to load more:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  const openLog = async (log: Log) => {
+    if (!selectedProject) return;
+    try {
+      const response = await ProjectsAPI.getLog(selectedProject.name, log.id);
+      setSelectedLog(response.data);
+    } catch (error) {
+      console.error('Failed to fetch log detail:', error);
+    }
+  };
+
+  const loadMoreButton = nextCursor && (
+    <div className="flex justify-center pt-2">
+      <button
+        onClick={loadMore}
+        disabled={loadingMore}
+        className="text-xs text-primary hover:underline flex items-center gap-1 disabled:opacity-50"
+      >
+        {loadingMore && <Loader2 className="animate-spin" size={12} />}
+        加载更多
+      </button>
+    </div>
+  );
+
   const handleDeleteProject = async (e: React.MouseEvent, id: number) => {
     e.stopPropagation();
     if (!confirm('确定要删除该项目及其所有历史数据吗？此操作不可撤销。')) return;
@@ -236,7 +285,7 @@ const ProjectsView: React.FC = () => {
                             </pre>
                             <div className="mt-3 flex justify-end">
                               <button 
-                                onClick={() => setSelectedLog(log)}
+                                onClick={() => openLog(log)}
                                 className="text-[10px] text-primary hover:underline flex items-center gap-1"
                               >
                                 查看完整上下文 <ChevronRight size={10} />
@@ -245,6 +294,7 @@ const ProjectsView: React.FC = () => {
                           </div>
                         </div>
                       ))}
+                      {loadMoreButton}
                     </div>
                   ) : (
                     <div className="space-y-6">
@@ -273,7 +323,12 @@ const ProjectsView: React.FC = () => {
                                 onClick={() => setSelectedVuln(v)}
                                 className="hover:bg-slate-800/30 transition-colors cursor-pointer text-xs"
                               >
-                                <td className="px-4 py-3 font-medium">{v.vuln_type}</td>
+                                <td className="px-4 py-3 font-medium">
+                                  {v.vuln_type}
+                                  {(v.hit_count ?? 1) > 1 && (
+                                    <span className="ml-2 text-[10px] text-slate-500" title="重复发现次数">×{v.hit_count}</span>
+                                  )}
+                                </td>
                                 <td className="px-4 py-3">
                                   <span className={`px-1.5 py-0.5 rounded text-[10px] font-bold uppercase ${
                                     v.severity === 'critical' || v.severity === 'high' ? 'bg-danger/10 text-danger' :
@@ -284,12 +339,13 @@ const ProjectsView: React.FC = () => {
                                 </td>
                                 <td className="px-4 py-3 font-mono text-slate-400">{v.parameter || '-'}</td>
                                 <td className="px-4 py-3 text-slate-500 truncate max-w-[200px]" title={v.url}>{v.url}</td>
-                                <td className="px-4 py-3 text-slate-500">{new Date(v.found_at).toLocaleDateString()}</td>
+                                <td className="px-4 py-3 text-slate-500">{new Date(v.last_seen || v.found_at).toLocaleDateString()}</td>
                               </tr>
                             ))}
                           </tbody>
                         </table>
                       </div>
+                      {loadMoreButton}
                     </div>
                   )}
                 </div>
@@ -6,15 +6,44 @@ interface LogEntry {
   time: string;
   level: string;
   content: string;
+  project?: string;
+  request_id?: string;
+  component?: string;
+  dropped?: number;
 }
 
+interface TaskProgress {
+  request_id: string;
+  project: string;
+  method: string;
+  url: string;
+  status: 'running' | 'done' | 'error';
+  node: string;
+  round: number;
+  probes_sent: number;
+  probes_total: number;
+  llm_calls: number;
+  findings: number;
+  started: number;
+  elapsed: number;
+  idle: number;
+  probe_rate: number;
+  stalled: boolean;
+}
+
+const STREAM_LEVELS = ['DEBUG', 'INFO', 'SUCCESS', 'WARNING', 'ERROR'];
+const MAX_PROGRESS_ROWS = 50;
+
 const ScannerView: React.FC = () => {
   const [projectName, setProjectName] = useState('Default_Project');
   const [logs, setLogs] = useState<LogEntry[]>([]);
   const [isScanning, setIsScanning] = useState(false);
   const [status, setStatus] = useState<'idle' | 'running' | 'error'>('idle');
+  const [minLevel, setMinLevel] = useState('INFO');
   const scrollRef = useRef<HTMLDivElement>(null);
   const wsRef = useRef<WebSocket | null>(null);
+  const progressWsRef = useRef<WebSocket | null>(null);
+  const [tasks, setTasks] = useState<Record<string, TaskProgress>>({});
 
   useEffect(() => {
     // 检查初始状态
@@ -52,17 +81,27 @@ const ScannerView: React.FC = () => {
     }
   };
 
+  useEffect(() => {
+    // 修改级别时通知服务端更新过滤条件，无需重连
+    if (wsRef.current && wsRef.current.readyState === WebSocket.OPEN) {
+      wsRef.current.send(JSON.stringify({ level: minLevel }));
+    }
+  }, [minLevel]);
+
   const connectWebSocket = () => {
     if (wsRef.current) wsRef.current.close();
 
     const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
-    const wsUrl = `${protocol}//${window.location.host}/api/scanner/ws/logs`;
+    const query = new URLSearchParams({ level: minLevel });
+    const wsUrl = `${protocol}//${window.location.host}/api/scanner/ws/logs?${query}`;
     const ws = new WebSocket(wsUrl);
 
     ws.onmessage = (event) => {
       try {
-        const log: LogEntry = JSON.parse(event.data);
-        setLogs(prev => [...prev.slice(-100), log]); // Keep last 100 logs
+        // 服务端按时间窗口合并发送，每帧为日志数组
+        const data = JSON.parse(event.data);
+        const batch: LogEntry[] = Array.isArray(data) ? data : [data];
+        setLogs(prev => [...prev, ...batch].slice(-100)); // Keep last 100 logs
       } catch (e) {
         // Handle plain text logs if any
         setLogs(prev => [...prev.slice(-100), { time: new Date().toLocaleTimeString(), level: 'INFO', content: event.data }]);
@@ -76,6 +115,35 @@ const ScannerView: React.FC = () => {
     };
 
     wsRef.current = ws;
+    // 进度通道独立重连，日志通道重连时不打断它
+    if (!progressWsRef.current || progressWsRef.current.readyState > WebSocket.OPEN) {
+      connectProgress();
+    }
+  };
+
+  const connectProgress = () => {
+    if (progressWsRef.current) progressWsRef.current.close();
+
+    const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+    const ws = new WebSocket(`${protocol}//${window.location.host}/api/scanner/ws/progress`);
+
+    ws.onmessage = (event) => {
+      // snapshot 为全量，update 只包含有变化的任务
+      const data = JSON.parse(event.data) as { type: string; tasks: TaskProgress[] };
+      setTasks(prev => {
+        const next = data.type === 'snapshot' ? {} : { ...prev };
+        data.tasks.forEach(task => { next[task.request_id] = task; });
+        return next;
+      });
+    };
+
+    ws.onclose = () => {
+      if (progressWsRef.current === ws && isScanning) {
+        setTimeout(connectProgress, 3000);
+      }
+    };
+
+    progressWsRef.current = ws;
   };
 
   const stopScanner = async () => {
@@ -90,8 +158,16 @@ const ScannerView: React.FC = () => {
       wsRef.current.close();
       wsRef.current = null;
     }
+    if (progressWsRef.current) {
+      progressWsRef.current.close();
+      progressWsRef.current = null;
+    }
   };
 
+  const taskRows = Object.values(tasks)
+    .sort((a, b) => b.started - a.started)
+    .slice(0, MAX_PROGRESS_ROWS);
+
   return (
     <div className="grid grid-cols-1 lg:grid-cols-3 gap-8 h-full">
       <div className="lg:col-span-1 space-y-6">
@@ -109,6 +185,19 @@ const ScannerView: React.FC = () => {
               />
             </div>
             
+            <div>
+              <label className="block text-sm text-slate-400 mb-2">实时日志级别</label>
+              <select
+                value={minLevel}
+                onChange={(e) => setMinLevel(e.target.value)}
+                className="w-full bg-slate-800 border border-slate-700 rounded-lg px-4 py-2 text-white focus:ring-2 focus:ring-primary outline-none transition-all"
+              >
+                {STREAM_LEVELS.map(level => (
+                  <option key={level} value={level}>{level}</option>
+                ))}
+              </select>
+            </div>
+
             <div className="pt-4">
               {!isScanning ? (
                 <button 
@@ -179,6 +268,60 @@ const ScannerView: React.FC = () => {
           )}
         </div>
       </div>
+
+      <div className="lg:col-span-3 bg-[#1e293b] rounded-xl border border-slate-700 overflow-hidden">
+        <div className="px-4 py-3 border-b border-slate-700 flex items-center gap-2">
+          <Activity size={16} className="text-slate-400" />
+          <span className="text-sm font-semibold text-slate-300">任务进度</span>
+        </div>
+        <div className="overflow-x-auto">
+          <table className="w-full text-xs font-mono">
+            <thead className="text-slate-500 text-left">
+              <tr>
+                <th className="px-4 py-2">状态</th>
+                <th className="px-4 py-2">请求</th>
+                <th className="px-4 py-2">当前节点</th>
+                <th className="px-4 py-2 text-right">轮次</th>
+                <th className="px-4 py-2 text-right">探测</th>
+                <th className="px-4 py-2 text-right">速率 (/s)</th>
+                <th className="px-4 py-2 text-right">LLM</th>
+                <th className="px-4 py-2 text-right">发现</th>
+                <th className="px-4 py-2 text-right">耗时 (s)</th>
+              </tr>
+            </thead>
+            <tbody>
+              {taskRows.length === 0 && (
+                <tr><td colSpan={9} className="px-4 py-4 text-slate-600 italic">暂无运行中的任务</td></tr>
+              )}
+              {taskRows.map(task => (
+                <tr key={task.request_id} className={`border-t border-slate-800 ${task.stalled ? 'bg-warning/10' : ''}`}>
+                  <td className="px-4 py-2">
+                    {task.status === 'running' ? (
+                      <span className={task.stalled ? 'text-warning' : 'text-primary'}>
+                        {task.stalled ? `停滞 ${task.idle.toFixed(0)}s` : (
+                          <span className="inline-flex items-center gap-1"><Loader2 size={12} className="animate-spin" />运行中</span>
+                        )}
+                      </span>
+                    ) : (
+                      <span className={task.status === 'error' ? 'text-danger' : 'text-success'}>
+                        {task.status === 'error' ? '异常' : '完成'}
+                      </span>
+                    )}
+                  </td>
+                  <td className="px-4 py-2 text-slate-400 max-w-xs truncate" title={task.url}>{task.method} {task.url}</td>
+                  <td className="px-4 py-2 text-slate-300">{task.node || '-'}</td>
+                  <td className="px-4 py-2 text-right text-slate-400">{task.round || '-'}</td>
+                  <td className="px-4 py-2 text-right text-slate-300">{task.probes_sent}/{task.probes_total}</td>
+                  <td className="px-4 py-2 text-right text-slate-400">{task.probe_rate.toFixed(1)}</td>
+                  <td className="px-4 py-2 text-right text-slate-400">{task.llm_calls}</td>
+                  <td className={`px-4 py-2 text-right ${task.findings ? 'text-danger font-bold' : 'text-slate-400'}`}>{task.findings}</td>
+                  <td className="px-4 py-2 text-right text-slate-400">{task.elapsed.toFixed(1)}</td>
+                </tr>
+              ))}
+            </tbody>
+          </table>
+        </div>
+      </div>
     </div>
   );
 };
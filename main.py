@@ -9,10 +9,11 @@ from loguru import logger
 sys.path.append(os.path.abspath(os.path.dirname(__file__)))
 
 from src.utils.logger_config import setup_logging
-from src.core.engine.manager import scanner_manager
+from src.config.settings import settings
 
-# 全局保存前端进程对象，以便清理
+# 全局保存前端与监管进程对象，以便清理
 frontend_process = None
+supervisor_process = None
 
 def start_frontend():
     """启动前端开发服务器"""
@@ -35,12 +36,23 @@ def start_frontend():
     except Exception as e:
         logger.error(f"启动前端服务失败: {e}")
 
+def start_supervisor():
+    """启动组件监管进程 (负责 mitmproxy / 任务处理器的启停与后台维护，API worker 通过 Redis 向其下发命令)"""
+    global supervisor_process
+    logger.info("正在启动组件监管进程...")
+    try:
+        supervisor_process = subprocess.Popen(
+            [sys.executable, "-m", "src.core.engine.supervisor"],
+            cwd=os.path.abspath(os.path.dirname(__file__))
+        )
+    except Exception as e:
+        logger.error(f"启动组件监管进程失败: {e}")
+
 def run_api():
-    """启动 FastAPI 后端服务"""
+    """启动 FastAPI 后端服务 (多 worker 模式需要以导入字符串指定应用)"""
     import uvicorn
-    from src.api.main import app
-    logger.info("正在启动 API 服务 (端口: 8000)...")
-    uvicorn.run(app, host="0.0.0.0", port=8000, log_level="info")
+    logger.info(f"正在启动 API 服务 (端口: 8000, worker 数: {settings.API_WORKERS})...")
+    uvicorn.run("src.api.main:app", host="0.0.0.0", port=8000, log_level="info", workers=settings.API_WORKERS)
 
 def main():
     # 初始化日志
@@ -52,14 +64,23 @@ def main():
         # 1. 启动前端 (非阻塞)
         start_frontend()
         
-        # 2. 启动 API 服务 (阻塞主线程)
+        # 2. 启动组件监管进程 (非阻塞)
+        start_supervisor()
+        
+        # 3. 启动 API 服务 (阻塞主线程)
         run_api()
         
     except KeyboardInterrupt:
         logger.info("\n正在停止系统...")
     finally:
-        # 确保所有子进程都已关闭
-        scanner_manager.stop_all()
+        # 监管进程收到 SIGTERM 后会先关闭其管理的组件子进程
+        if supervisor_process and supervisor_process.poll() is None:
+            logger.info("正在关闭组件监管进程...")
+            supervisor_process.terminate()
+            try:
+                supervisor_process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                supervisor_process.kill()
         
         if frontend_process:
             logger.info("正在关闭前端服务...")
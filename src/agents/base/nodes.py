@@ -1,12 +1,15 @@
+import re
 import json
 import httpx
 from pathlib import Path
 from typing import List, Dict, Optional, Any
 from langchain_core.prompts import ChatPromptTemplate
 from src.config.settings import settings
-from src.core.llm.service import create_audited_llm
+from src.core.llm.service import create_audited_llm, create_worker_cascade
 from src.core.engine.strategist import GenericStrategist
 from src.core.engine.structured_executor import StructuredExecutor
+from src.core.engine.findings import finding_index
+from src.utils.endpoint import endpoint_template
 from loguru import logger
 
 class BaseVulnNodes:
@@ -17,6 +20,9 @@ class BaseVulnNodes:
     3. 异步探测执行
     4. 基础响应获取
     """
+    # 时间型探测 Payload 特征 (子类按需设置)，命中时分析结果依赖耗时判断，不交给快速模型
+    TIMING_PAYLOAD_PATTERN: Optional[re.Pattern] = None
+
     def __init__(self, retry_key: str = "retry_count"):
         self.retry_key = retry_key
         self.strategist = GenericStrategist()
@@ -25,6 +31,11 @@ class BaseVulnNodes:
             model_name=settings.MODEL_NAME_WORKER,
             api_key=settings.OPENAI_API_KEY,
             api_base=settings.OPENAI_API_BASE,
+            model_setting="MODEL_NAME_WORKER",
+            model_kwargs={"response_format": {"type": "json_object"}}
+        )
+        self.llm_cascade = create_worker_cascade(
+            strong=self.audited_llm,
             model_kwargs={"response_format": {"type": "json_object"}}
         )
 
@@ -124,8 +135,13 @@ class BaseVulnNodes:
             logger.warning("没有发现计划中的测试任务 (planned_data 为空)，跳过执行")
             return {"test_results": [], "history_results": []}
 
-        # 执行结构化数据包
-        results = await self.executor.execute_structured(structured_data)
+        if structured_data.get("stream"):
+            # 流式数据包：边接收 Strategist 输出边执行探测
+            packet_stream = self.strategist.astream_packet(**structured_data["stream"])
+            results = await self.executor.execute_stream(packet_stream)
+        else:
+            # 执行结构化数据包
+            results = await self.executor.execute_structured(structured_data)
         
         # 将结果存入 test_results，并更新历史记录
         return {
@@ -146,6 +162,51 @@ class BaseVulnNodes:
                 "decision": default_decision
             }
 
+    def _is_easy_analysis(self, results: List[Dict[str, Any]]) -> bool:
+        """
+        无异常判定：状态码一致、无超时/错误、响应长度稳定、耗时无明显差异且 Payload 未被回显，可交给快速模型分析。
+        时间盲注的响应内容与正常响应一致，只能通过耗时区分，因此耗时异常或使用了时间型 Payload 时一律交给强模型。
+        """
+        if not results:
+            return True
+        statuses = {r.get("status") for r in results}
+        if len(statuses) != 1 or 0 in statuses:
+            return False
+        lengths = [len(r.get("response") or "") for r in results]
+        if max(lengths) - min(lengths) > 50:
+            return False
+        elapsed = [float(r.get("elapsed") or 0.0) for r in results]
+        if max(elapsed) > settings.LLM_CASCADE_EASY_MAX_ELAPSED:
+            return False
+        # 以本轮最快的响应作为基线 (下限 0.2 秒，避免毫秒级抖动被放大)
+        if max(elapsed) > settings.LLM_CASCADE_EASY_ELAPSED_RATIO * max(min(elapsed), 0.2):
+            return False
+        for r in results:
+            if r.get("similarity", 1.0) < 0.99:
+                return False
+            if str(r.get("payload")) in (r.get("response") or ""):
+                return False
+            if self.TIMING_PAYLOAD_PATTERN and self.TIMING_PAYLOAD_PATTERN.search(str(r.get("payload"))):
+                return False
+        return True
+
+    @staticmethod
+    def _check_analysis(content: str) -> Optional[str]:
+        """级联校验：快速模型的分析结果必须可解析且置信度足够"""
+        try:
+            analysis = json.loads(content)
+        except Exception as e:
+            return f"JSON 解析失败: {e}"
+        if not isinstance(analysis, dict) or "decision" not in analysis:
+            return "缺少 decision 字段"
+        try:
+            confidence = float(analysis.get("confidence", 1.0))
+        except (TypeError, ValueError):
+            return "confidence 字段无效"
+        if confidence < settings.LLM_CASCADE_MIN_CONFIDENCE:
+            return f"置信度过低 ({confidence})"
+        return None
+
     def _validate_decision(self, is_vulnerable: bool, decision: str, vuln_type: str) -> str:
         """通用决策校验逻辑 (防止 False + FOUND 矛盾)"""
         decision = decision.lower()
@@ -251,13 +312,19 @@ class BaseVulnNodes:
                 "body": state.get("body")
             }
         }
-        test_cases = self.strategist.generate(
-            vuln_type=vuln_type,
-            system_prompt=system_prompt,
-            user_context=user_context,
-            request_id=state["request_id"],
-            project_name=state.get("project_name", "Default")
-        )
+        generation_args = {
+            "vuln_type": vuln_type,
+            "system_prompt": system_prompt,
+            "user_context": user_context,
+            "request_id": state["request_id"],
+            "project_name": state.get("project_name", "Default"),
+            "retry_count": state.get(self.retry_key, 0)
+        }
+        if settings.STRATEGIST_STREAMING:
+            # 流式模式：生成推迟到执行器节点，与探测并行进行
+            return {"planned_data": {"stream": generation_args}}
+
+        test_cases = await self.strategist.agenerate(**generation_args)
         return {"planned_data": test_cases}
 
     async def _generic_analyzer_node(
@@ -270,21 +337,22 @@ class BaseVulnNodes:
         agent_name: str
     ) -> dict:
         """通用分析器节点逻辑"""
-        chain = prompt | self.audited_llm.llm
-        
         # 准备 LLM 输入
         inputs = {"results": json.dumps(results_summary)}
         if "orig" in prompt.input_variables:
             inputs["orig"] = state.get("response_body", "")[:500]
 
-        # 调用 LLM
-        response = await self.audited_llm.ainvoke(
-            chain=chain,
+        # 调用 LLM (无异常的结果交给快速模型，低置信度或无法解析时自动升级)
+        response = await self.llm_cascade.ainvoke(
+            prompt=prompt,
             inputs=inputs,
             agent_name=agent_name,
             task_id=state["request_id"],
-            prompt_template=prompt,
-            project_name=state.get("project_name", "Default")
+            project_name=state.get("project_name", "Default"),
+            easy=self._is_easy_analysis(state.get("test_results", [])),
+            retry_count=state.get(self.retry_key, 0),
+            accept=self._check_analysis,
+            endpoint=endpoint_template(state["method"], state["target_url"])
         )
         
         analysis = self._safe_json_parse(response.content)
@@ -313,12 +381,13 @@ class BaseVulnNodes:
                 }
             }
             findings.append(finding)
-            logger.success(f"发现 {vuln_type} 漏洞! 参数: {analysis.get('vulnerable_parameter')}")
-            
-            # 存入 SQLite 数据库
+
+            # 按漏洞身份去重后存入 SQLite 数据库
             try:
-                from src.utils.db_helper import db_helper
-                db_helper.save_vulnerability(state.get("project_name", "Default"), finding)
+                if finding_index.record(state.get("project_name", "Default"), finding):
+                    logger.success(f"发现 {vuln_type} 漏洞! 参数: {analysis.get('vulnerable_parameter')}")
+                else:
+                    logger.info(f"重复发现 {vuln_type} 漏洞，已累加命中次数 | 参数: {analysis.get('vulnerable_parameter')}")
             except Exception as e:
                 logger.error(f"无法将漏洞结果存入数据库: {e}")
 
@@ -1,16 +1,17 @@
 from langgraph.graph import StateGraph, END
 from src.agents.fuzz.state import FuzzState
 from src.agents.fuzz.nodes import FuzzNodes
+from src.utils.metrics import instrument_node
 
 def create_fuzz_graph():
     nodes = FuzzNodes()
     workflow = StateGraph(FuzzState)
 
     # 添加节点
-    workflow.add_node("analyze_points", nodes.analyze_points_node)
-    workflow.add_node("generate_payloads", nodes.strategist_node)
-    workflow.add_node("execute_tests", nodes.executor_node)
-    workflow.add_node("analyze_results", nodes.analyzer_node)
+    workflow.add_node("analyze_points", instrument_node("fuzz", "analyze_points", nodes.analyze_points_node))
+    workflow.add_node("generate_payloads", instrument_node("fuzz", "generate_payloads", nodes.strategist_node))
+    workflow.add_node("execute_tests", instrument_node("fuzz", "execute_tests", nodes.executor_node))
+    workflow.add_node("analyze_results", instrument_node("fuzz", "analyze_results", nodes.analyzer_node))
 
     # 定义边
     workflow.set_entry_point("analyze_points")
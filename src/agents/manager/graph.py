@@ -4,6 +4,7 @@ from src.agents.manager.nodes import ManagerAgent
 from src.agents.sqli.graph import sqli_graph
 from src.agents.xss.graph import xss_graph
 from src.agents.fuzz.graph import fuzz_graph
+from src.utils.metrics import instrument_node
 
 def create_manager_graph():
     """创建主控图"""
@@ -11,7 +12,7 @@ def create_manager_graph():
     manager = ManagerAgent()
 
     # 添加主节点
-    builder.add_node("manager", manager.analyze_request)
+    builder.add_node("manager", instrument_node("manager", "manager", manager.analyze_request))
     
     # 添加子图节点
     builder.add_node("sqli_worker", sqli_graph)
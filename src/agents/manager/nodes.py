@@ -4,6 +4,7 @@ from src.config.settings import settings
 from src.utils.auditor import auditor
 from src.core.llm.service import create_audited_llm
 from src.agents.manager.state import AgentState
+from src.utils.endpoint import endpoint_template
 from loguru import logger
 
 class ManagerAgent:
@@ -14,7 +15,8 @@ class ManagerAgent:
         self.audited_llm = create_audited_llm(
             model_name=settings.MODEL_NAME_MANAGER,
             api_key=settings.OPENAI_API_KEY,
-            api_base=settings.OPENAI_API_BASE
+            api_base=settings.OPENAI_API_BASE,
+            model_setting="MODEL_NAME_MANAGER"
         )
         self.prompt = ChatPromptTemplate.from_messages([
             ("system", """你是一个资深安全分析专家。请分析以下 HTTP 请求和响应上下文，判断其可能存在的漏洞（sqli, xss, fuzz）。
@@ -62,7 +64,8 @@ class ManagerAgent:
             agent_name="Manager",
             task_id=state["request_id"],
             prompt_template=self.prompt,
-            project_name=state.get("project_name", "Default")
+            project_name=state.get("project_name", "Default"),
+            endpoint=endpoint_template(state["method"], state["target_url"])
         )
 
         # 4. 解析任务
@@ -1,16 +1,17 @@
 from langgraph.graph import StateGraph, END
 from src.agents.sqli.state import SQLiState
 from src.agents.sqli.nodes import SQLiNodes
+from src.utils.metrics import instrument_node
 
 def create_sqli_graph():
     builder = StateGraph(SQLiState)
     nodes = SQLiNodes()
 
     # 添加所有节点
-    builder.add_node("analyzer_init", nodes.analyze_injection_points)
-    builder.add_node("strategist", nodes.strategist_node)
-    builder.add_node("executor", nodes.executor_node)
-    builder.add_node("analyzer", nodes.analyzer_node)
+    builder.add_node("analyzer_init", instrument_node("sqli", "analyzer_init", nodes.analyze_injection_points))
+    builder.add_node("strategist", instrument_node("sqli", "strategist", nodes.strategist_node))
+    builder.add_node("executor", instrument_node("sqli", "executor", nodes.executor_node))
+    builder.add_node("analyzer", instrument_node("sqli", "analyzer", nodes.analyzer_node))
 
     # 条件边：如果在初始化阶段未发现注入点，直接结束
     def route_after_init(state: SQLiState):
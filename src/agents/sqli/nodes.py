@@ -1,3 +1,4 @@
+import re
 import json
 import httpx
 import asyncio
@@ -13,6 +14,12 @@ from src.agents.base.nodes import BaseVulnNodes
 from src.core.prompts.sqli import SQLI_GENERATOR_PROMPT, SQLI_ANALYZER_PROMPT
 
 class SQLiNodes(BaseVulnNodes):
+    # 时间盲注常用的延时函数
+    TIMING_PAYLOAD_PATTERN = re.compile(
+        r"sleep\s*\(|benchmark\s*\(|waitfor\s+delay|pg_sleep|dbms_lock\.sleep|dbms_pipe\.receive_message",
+        re.IGNORECASE
+    )
+
     def __init__(self):
         super().__init__(retry_key="sqli_retry_count")
         # 从文件加载静态 Payloads
@@ -1,16 +1,17 @@
 from langgraph.graph import StateGraph, END
 from src.agents.xss.state import XSSState
 from src.agents.xss.nodes import XSSNodes
+from src.utils.metrics import instrument_node
 
 def create_xss_graph():
     builder = StateGraph(XSSState)
     nodes = XSSNodes()
 
     # 添加节点
-    builder.add_node("analyzer", nodes.analyze_injection_points)
-    builder.add_node("strategist", nodes.strategist_node)
-    builder.add_node("executor", nodes.executor_node)
-    builder.add_node("final_analyzer", nodes.analyzer_node)
+    builder.add_node("analyzer", instrument_node("xss", "analyzer", nodes.analyze_injection_points))
+    builder.add_node("strategist", instrument_node("xss", "strategist", nodes.strategist_node))
+    builder.add_node("executor", instrument_node("xss", "executor", nodes.executor_node))
+    builder.add_node("final_analyzer", instrument_node("xss", "final_analyzer", nodes.analyzer_node))
 
     # 条件边：如果在初始化阶段未发现注入点，直接结束
     def route_after_init(state: XSSState):
@@ -0,0 +1,272 @@
+import json
+import time
+import asyncio
+from datetime import datetime
+from collections import deque
+from typing import Any, Deque, Dict, Mapping, Optional, Set, Tuple
+import redis.asyncio as aioredis
+from fastapi import WebSocket, WebSocketDisconnect
+from loguru import logger
+from src.config.settings import settings
+
+LEVELS = {"TRACE": 5, "DEBUG": 10, "INFO": 20, "SUCCESS": 25, "WARNING": 30, "ERROR": 40, "CRITICAL": 50}
+
+class LogFilter:
+    """客户端选择的过滤条件：最低级别与 project / request_id / component 精确匹配"""
+    FIELDS = ("project", "request_id", "component")
+
+    def __init__(self):
+        self.min_level = 0
+        self.match_fields: Dict[str, str] = {}
+
+    def update(self, params: Mapping[str, Any]):
+        """按客户端参数更新条件，空值表示取消该条件"""
+        if "level" in params:
+            self.min_level = LEVELS.get(str(params["level"] or "").upper(), 0)
+        for field in self.FIELDS:
+            if field in params:
+                if params[field]:
+                    self.match_fields[field] = str(params[field])
+                else:
+                    self.match_fields.pop(field, None)
+
+    def match(self, entry: Dict[str, Any]) -> bool:
+        if entry["levelno"] < self.min_level:
+            return False
+        for field, value in self.match_fields.items():
+            if entry.get(field) != value:
+                return False
+        return True
+
+class LogClient:
+    """
+    单个 WebSocket 客户端：
+    1. 过滤在入队前完成，不匹配的日志不占用队列
+    2. 独立的有界队列，消费过慢时丢弃最旧的消息而不是阻塞其他客户端
+    3. 按时间窗口合并为 JSON 数组帧发送，并按 LOG_STREAM_MAX_RATE 限速，丢弃的行数以提示条目告知
+    4. 回放完成前到达的实时日志先进入 pending 缓冲，回放结束后按 Stream ID 去掉已回放过的条目再放行
+    """
+    def __init__(self, websocket: WebSocket, queue_size: int):
+        self.websocket = websocket
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.filter = LogFilter()
+        self.filter.update(websocket.query_params)
+        self.dropped = 0
+        self.pending: Optional[Deque[Tuple[Dict[str, Any], str]]] = deque(maxlen=queue_size)
+        self.replayed_ids: Set[str] = set()
+
+    def offer(self, entry: Dict[str, Any], raw: str):
+        """接收一条实时日志 (回放期间暂存)"""
+        if self.pending is not None:
+            if len(self.pending) == self.pending.maxlen:
+                self.dropped += 1
+            self.pending.append((entry, raw))
+            return
+        # 回放前已写入 Stream、回放后才推送到的日志已经回放过
+        if entry.get("id") in self.replayed_ids:
+            return
+        self.deliver(entry, raw)
+
+    def finish_replay(self):
+        """回放结束：放行暂存的实时日志，之后的日志直接进入发送队列"""
+        pending, self.pending = self.pending, None
+        for entry, raw in pending:
+            self.offer(entry, raw)
+
+    def deliver(self, entry: Dict[str, Any], raw: str):
+        if not self.filter.match(entry):
+            return
+        try:
+            self.queue.put_nowait(raw)
+        except asyncio.QueueFull:
+            self.queue.get_nowait()
+            self.queue.put_nowait(raw)
+            self.dropped += 1
+
+    def _dropped_marker(self) -> str:
+        marker = json.dumps({
+            "time": datetime.now().strftime("%H:%M:%S"),
+            "level": "WARNING",
+            "levelno": LEVELS["WARNING"],
+            "content": f"日志过多，已丢弃 {self.dropped} 条",
+            "dropped": self.dropped
+        }, ensure_ascii=False)
+        self.dropped = 0
+        return marker
+
+    async def send_loop(self, interval: float, max_rate: int):
+        tokens, last = float(max_rate), time.monotonic()
+        while True:
+            batch = [await self.queue.get()]
+            # 等待一个时间窗口，把期间到达的日志合并为一帧
+            await asyncio.sleep(interval)
+            while not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+
+            # 令牌桶限速：超出部分只保留最新的日志
+            now = time.monotonic()
+            tokens = min(float(max_rate), tokens + (now - last) * max_rate)
+            last = now
+            allowed = int(tokens)
+            if len(batch) > allowed:
+                self.dropped += len(batch) - allowed
+                batch = batch[len(batch) - allowed:]
+            tokens -= len(batch)
+
+            if self.dropped:
+                batch.insert(0, self._dropped_marker())
+            await self.websocket.send_text("[" + ",".join(batch) + "]")
+
+    async def receive_loop(self):
+        """接收客户端发送的过滤条件 (JSON 对象)，同时用于及时感知连接断开"""
+        while True:
+            text = await self.websocket.receive_text()
+            try:
+                params = json.loads(text)
+            except ValueError:
+                continue
+            if isinstance(params, dict):
+                self.filter.update(params)
+
+class LogHub:
+    """
+    实时日志分发 (每个 API 进程一个)：
+    1. 只建立一个异步 Redis 订阅，消息到达即推送，无轮询延迟
+    2. 新连接先注册 (实时日志暂存)，确认订阅已建立后再从 Redis Stream 回放最近 LOG_STREAM_REPLAY 条日志，
+       回放与实时推送按 Stream ID 去重，两者衔接处不会遗漏或重复
+    3. 每条消息只解析一次，按各客户端的过滤条件放入其有界队列，由客户端各自的发送协程写出
+    4. 第一个客户端连接时启动订阅，Redis 断开后自动重连
+    """
+    def __init__(self, channel: str = "webagent:logs", stream_key: str = "webagent:logs:stream", queue_size: int = None):
+        self.channel = channel
+        self.stream_key = stream_key
+        self.queue_size = queue_size or settings.LOG_STREAM_QUEUE_SIZE
+        self.clients: Set[LogClient] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._redis: Optional[aioredis.Redis] = None
+        # 订阅确认后置位，回放须在此之后读取历史
+        self._subscribed = asyncio.Event()
+
+    def _ensure_started(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._listen())
+
+    @staticmethod
+    def _normalize(entry: Any) -> Optional[Dict[str, Any]]:
+        if not isinstance(entry, dict):
+            return None
+        if "levelno" not in entry:
+            entry["levelno"] = LEVELS.get(entry.get("level"), LEVELS["INFO"])
+        return entry
+
+    def publish(self, data: str):
+        """将一条消息分发给所有客户端 (消息可以是单条日志或发送端合并的日志数组)"""
+        if not self.clients:
+            return
+        try:
+            payload = json.loads(data)
+        except ValueError:
+            payload = {"time": datetime.now().strftime("%H:%M:%S"), "level": "INFO", "content": data}
+        entries = payload if isinstance(payload, list) else [payload]
+        for entry in entries:
+            entry = self._normalize(entry)
+            if entry is None:
+                continue
+            raw = json.dumps(entry, ensure_ascii=False)
+            for log_client in tuple(self.clients):
+                log_client.offer(entry, raw)
+
+    async def _replay(self, log_client: LogClient):
+        """从 Redis Stream 回放最近的日志，新连接的客户端无需等待即可看到上下文"""
+        if settings.LOG_STREAM_REPLAY <= 0:
+            return
+        if self._redis is None:
+            self._redis = aioredis.from_url(settings.REDIS_URL, decode_responses=True)
+        try:
+            items = await self._redis.xrevrange(self.stream_key, count=settings.LOG_STREAM_REPLAY)
+        except Exception as e:
+            logger.warning(f"读取历史实时日志失败: {e}")
+            return
+        for stream_id, fields in reversed(items):
+            try:
+                entry = self._normalize(json.loads(fields.get("data", "")))
+            except ValueError:
+                continue
+            if entry is not None:
+                entry["id"] = stream_id
+                log_client.replayed_ids.add(stream_id)
+                log_client.deliver(entry, json.dumps(entry, ensure_ascii=False))
+
+    async def _listen(self):
+        delay = 1.0
+        while True:
+            client = aioredis.from_url(settings.REDIS_URL, decode_responses=True)
+            pubsub = client.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                delay = 1.0
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        self.publish(message["data"])
+                    elif message["type"] == "subscribe":
+                        self._subscribed.set()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"实时日志订阅中断，{delay:.0f} 秒后重连: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
+            finally:
+                self._subscribed.clear()
+                try:
+                    await pubsub.aclose()
+                    await client.aclose()
+                except Exception:
+                    pass
+
+    async def serve(self, websocket: WebSocket):
+        """
+        处理一个 WebSocket 连接直到断开。
+        过滤条件可通过查询参数 (?level=INFO&project=xx&request_id=xx&component=runner) 指定，
+        连接后也可随时发送同名字段的 JSON 对象进行修改。
+        """
+        await websocket.accept()
+        log_client = LogClient(websocket, self.queue_size)
+        # 先注册并等待订阅建立，再读取历史：读取之后写入的日志一定会通过订阅到达，
+        # 读取之前写入但之后才推送的日志按 Stream ID 去重
+        self.clients.add(log_client)
+        self._ensure_started()
+        try:
+            await asyncio.wait_for(self._subscribed.wait(), timeout=2.0)
+        except asyncio.TimeoutError:
+            logger.warning("实时日志订阅尚未建立，回放与实时日志之间可能有遗漏")
+        await self._replay(log_client)
+        log_client.finish_replay()
+        tasks = [
+            asyncio.create_task(log_client.send_loop(settings.LOG_STREAM_BATCH_INTERVAL, settings.LOG_STREAM_MAX_RATE)),
+            asyncio.create_task(log_client.receive_loop())
+        ]
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                error = task.exception()
+                if error and not isinstance(error, WebSocketDisconnect):
+                    logger.error(f"WebSocket 异常: {error}")
+        finally:
+            for task in tasks:
+                task.cancel()
+            self.clients.discard(log_client)
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+
+log_hub = LogHub()
@@ -1,3 +1,4 @@
+import os
 import sys
 from pathlib import Path
 
@@ -6,20 +7,36 @@ sys.path.append(str(Path(__file__).resolve().parents[2]))
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from src.api.routes import settings, projects, vulnerabilities, scanner
+from src.api.routes import settings, projects, vulnerabilities, scanner, usage, search, metrics, traces, profiles
 from src.config.settings import settings as app_settings
 from src.utils.logger_config import setup_logging
-from src.core.engine.manager import scanner_manager
+from src.utils.auditor import auditor
+from src.utils.async_db import async_db
+from src.api.log_stream import log_hub
+from src.api.progress_stream import progress_hub
+from src.utils.metrics import metrics as metrics_registry
+from src.utils.runtime_config import runtime_config
 
 # 初始化全局日志
 setup_logging()
 
 app = FastAPI(title="AegisX API", version="1.0.0")
 
+@app.on_event("startup")
+def startup_event():
+    # API 以多 worker 运行，各 worker 按 PID 导出指标快照，由 /api/metrics 合并
+    # (组件子进程与后台维护由独立的监管进程负责，不随 worker 启停)
+    metrics_registry.start_exporter(f"api-{os.getpid()}")
+    # 同步其他 API worker 发布的运行时配置
+    runtime_config.start("api")
+
 @app.on_event("shutdown")
-def shutdown_event():
-    # 退出时确保所有子进程都已关闭
-    scanner_manager.stop_all()
+async def shutdown_event():
+    await log_hub.stop()
+    await progress_hub.stop()
+    metrics_registry.stop_exporter(remove=True)
+    async_db.shutdown()
+    auditor.close()
 
 # 配置跨域
 app.add_middleware(
@@ -28,6 +45,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # 注册路由
@@ -35,6 +53,11 @@ app.include_router(settings.router, prefix="/api/settings", tags=["Settings"])
 app.include_router(projects.router, prefix="/api/projects", tags=["Projects"])
 app.include_router(vulnerabilities.router, prefix="/api/vulnerabilities", tags=["Vulnerabilities"])
 app.include_router(scanner.router, prefix="/api/scanner", tags=["Scanner"])
+app.include_router(usage.router, prefix="/api/usage", tags=["Usage"])
+app.include_router(search.router, prefix="/api/search", tags=["Search"])
+app.include_router(metrics.router, prefix="/api/metrics", tags=["Metrics"])
+app.include_router(traces.router, prefix="/api/traces", tags=["Traces"])
+app.include_router(profiles.router, prefix="/api/profiles", tags=["Profiles"])
 
 @app.get("/")
 async def root():
@@ -42,4 +65,5 @@ async def root():
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # 多 worker 模式需要以导入字符串指定应用
+    uvicorn.run("src.api.main:app", host="0.0.0.0", port=8000, workers=app_settings.API_WORKERS)
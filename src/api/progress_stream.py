@@ -0,0 +1,159 @@
+import json
+import time
+import asyncio
+from typing import Any, Dict, Optional, Set
+import redis.asyncio as aioredis
+from fastapi import WebSocket, WebSocketDisconnect
+from loguru import logger
+from src.config.settings import settings
+from src.utils.progress import PROGRESS_CHANNEL, PROGRESS_INDEX_KEY, PROGRESS_KEY_PREFIX, annotate, parse_progress
+
+class ProgressClient:
+    """单个进度 WebSocket 客户端：只记录有变化的任务 ID，发送时取最新状态，消费再慢也不会积压"""
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        self.pending: Set[str] = set()
+        self.event = asyncio.Event()
+
+    def notify(self, request_ids):
+        self.pending.update(request_ids)
+        self.event.set()
+
+class ProgressHub:
+    """
+    任务进度分发 (每个 API 进程一个)：
+    1. 共享一个异步 Redis 订阅，维护各任务的最新状态
+    2. 新连接先收到 Redis 哈希中的快照，之后按 PROGRESS_INTERVAL 合并推送有变化的任务
+    3. 每隔 TICK 秒重发运行中的任务，使没有新事件的停滞任务也能及时标记
+    """
+    TICK = 5.0
+
+    def __init__(self, channel: str = PROGRESS_CHANNEL):
+        self.channel = channel
+        self.tasks: Dict[str, Dict[str, Any]] = {}
+        self.clients: Set[ProgressClient] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._redis: Optional[aioredis.Redis] = None
+
+    def _ensure_started(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._listen())
+
+    def publish(self, data: str):
+        try:
+            states = json.loads(data)
+        except ValueError:
+            return
+        changed = []
+        for state in states if isinstance(states, list) else [states]:
+            if isinstance(state, dict) and state.get("request_id"):
+                self.tasks[state["request_id"]] = state
+                changed.append(state["request_id"])
+        for client in tuple(self.clients):
+            client.notify(changed)
+
+    def snapshot(self) -> list:
+        now = time.time()
+        # 清理超过保留时间的任务
+        for request_id in [rid for rid, state in self.tasks.items() if now - state["updated"] > settings.PROGRESS_TTL]:
+            self.tasks.pop(request_id, None)
+        return sorted((annotate(state, now) for state in self.tasks.values()), key=lambda s: s["started"], reverse=True)
+
+    async def load(self, limit: int = 200):
+        """从 Redis 哈希读取近期任务进度 (订阅建立前发布的进度只能从这里获得)"""
+        if self._redis is None:
+            self._redis = aioredis.from_url(settings.REDIS_URL, decode_responses=True)
+        try:
+            request_ids = await self._redis.zrevrange(PROGRESS_INDEX_KEY, 0, limit - 1)
+            pipe = self._redis.pipeline(transaction=False)
+            for request_id in request_ids:
+                pipe.hgetall(PROGRESS_KEY_PREFIX + request_id)
+            for raw in (await pipe.execute()) if request_ids else []:
+                if not raw:
+                    continue
+                state = parse_progress(raw)
+                current = self.tasks.get(state["request_id"])
+                if current is None or current["updated"] <= state["updated"]:
+                    self.tasks[state["request_id"]] = state
+        except Exception as e:
+            logger.warning(f"读取任务进度失败: {e}")
+
+    async def _listen(self):
+        delay = 1.0
+        while True:
+            client = aioredis.from_url(settings.REDIS_URL, decode_responses=True)
+            pubsub = client.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                delay = 1.0
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        self.publish(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"任务进度订阅中断，{delay:.0f} 秒后重连: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
+            finally:
+                try:
+                    await pubsub.aclose()
+                    await client.aclose()
+                except Exception:
+                    pass
+
+    async def _send_loop(self, client: ProgressClient):
+        await client.websocket.send_text(json.dumps({"type": "snapshot", "server_time": time.time(), "tasks": self.snapshot()}, ensure_ascii=False))
+        while True:
+            try:
+                await asyncio.wait_for(client.event.wait(), timeout=self.TICK)
+                # 合并一个时间窗口内的更新
+                await asyncio.sleep(settings.PROGRESS_INTERVAL)
+                request_ids, client.pending = client.pending, set()
+            except asyncio.TimeoutError:
+                request_ids = {rid for rid, state in self.tasks.items() if state.get("status") == "running"}
+            client.event.clear()
+            if not request_ids:
+                continue
+            now = time.time()
+            tasks = [annotate(self.tasks[rid], now) for rid in request_ids if rid in self.tasks]
+            await client.websocket.send_text(json.dumps({"type": "update", "server_time": now, "tasks": tasks}, ensure_ascii=False))
+
+    async def serve(self, websocket: WebSocket):
+        """处理一个进度 WebSocket 连接直到断开"""
+        await websocket.accept()
+        client = ProgressClient(websocket)
+        self.clients.add(client)
+        self._ensure_started()
+        await self.load()
+        tasks = [asyncio.create_task(self._send_loop(client)), asyncio.create_task(self._receive_loop(websocket))]
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                error = task.exception()
+                if error and not isinstance(error, WebSocketDisconnect):
+                    logger.error(f"进度 WebSocket 异常: {error}")
+        finally:
+            for task in tasks:
+                task.cancel()
+            self.clients.discard(client)
+
+    @staticmethod
+    async def _receive_loop(websocket: WebSocket):
+        """进度通道不接收客户端消息，只用于及时感知连接断开"""
+        while True:
+            await websocket.receive_text()
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+
+progress_hub = ProgressHub()
@@ -0,0 +1,27 @@
+import time
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from src.config.settings import settings
+from src.utils.metrics import metrics, render
+
+router = APIRouter()
+
+def _component_up(snapshots: list) -> dict:
+    """按快照更新时间判断各进程是否存活 (超过 3 个写入周期未更新视为停止)"""
+    now = time.time()
+    samples = [
+        [[snapshot.get("component") or "unknown"], 1 if now - snapshot.get("updated", 0) <= 3 * settings.METRICS_FLUSH_INTERVAL else 0]
+        for snapshot in snapshots
+    ]
+    return {"metrics": {"aegisx_component_up": {
+        "type": "gauge", "help": "进程指标快照是否在更新 (1 为运行中)", "labels": ["component"], "samples": samples
+    }}}
+
+@router.get("", response_class=PlainTextResponse)
+def get_metrics():
+    """Prometheus 文本格式的全链路指标 (合并拦截器、运行器与 API 进程)"""
+    snapshots = metrics.collect_snapshots()
+    return PlainTextResponse(
+        render(snapshots + [_component_up(snapshots)]),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
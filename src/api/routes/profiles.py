@@ -0,0 +1,49 @@
+import os
+import json
+import time
+import asyncio
+from typing import Literal
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import FileResponse
+from pydantic import BaseModel, Field
+from src.utils.redis_helper import RedisHelper
+from src.utils.profiler import profiler
+
+router = APIRouter()
+redis = RedisHelper()
+
+class ProfileRequest(BaseModel):
+    target: Literal["runner", "api"] = "runner"
+    mode: Literal["sample", "cprofile", "memory"] = "sample"
+    duration: float = Field(default=30.0, gt=0, description="剖析持续时间 (秒)")
+
+@router.post("/")
+async def start_profile(request: ProfileRequest):
+    """
+    开启按需剖析。运行器通过 Redis 控制队列接收命令 (在下一次取任务时生效)，
+    API 进程则直接在当前事件循环中开启 (多 worker 部署时只剖析处理该请求的 worker)。
+    """
+    if request.target == "runner":
+        command = {"action": "profile", "mode": request.mode, "duration": request.duration, "requested_at": time.time()}
+        await asyncio.to_thread(redis.client.rpush, "webagent:control:runner", json.dumps(command))
+        return {"status": "queued", **command}
+    try:
+        return {"status": "started", **profiler.start(request.mode, request.duration, component=f"api-{os.getpid()}")}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@router.get("/")
+async def list_profiles():
+    """列出剖析结果文件 (运行器与 API 共用目录) 以及 API 进程中正在进行的剖析"""
+    files = await asyncio.to_thread(profiler.list_profiles)
+    return {"active": profiler.active(), "files": files}
+
+@router.get("/{name}")
+async def download_profile(name: str):
+    """下载剖析结果 (.folded / .prof / .txt)"""
+    path = profiler.resolve(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, filename=name)
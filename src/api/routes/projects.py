@@ -1,29 +1,84 @@
-from fastapi import APIRouter, HTTPException
-from src.utils.db_helper import db_helper
-from typing import List
+import asyncio
+from fastapi import APIRouter, HTTPException, Query, Response
+from src.utils.async_db import async_db
+from src.core.engine.supervisor import supervisor_client
+from typing import List, Optional
 
 router = APIRouter()
 
+def _split_fields(fields: Optional[str]) -> Optional[List[str]]:
+    return [name.strip() for name in fields.split(",") if name.strip()] if fields else None
+
 @router.get("/")
 async def list_projects():
     """获取所有项目列表"""
-    return db_helper.list_projects()
+    return await async_db.list_projects()
 
 @router.delete("/{project_id}")
 async def delete_project(project_id: int):
-    """删除项目"""
+    """删除项目 (标记删除后由后台分批清理数据)"""
     try:
-        db_helper.delete_project(project_id)
-        return {"status": "success", "message": "项目已删除"}
+        await async_db.delete_project(project_id)
+        # 后台清理由监管进程执行，唤醒命令无需等待结果
+        await asyncio.to_thread(supervisor_client.send, "wake_maintenance")
+        return {"status": "success", "message": "项目已删除，历史数据正在后台清理"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/{project_name}/vulnerabilities")
-async def get_project_vulnerabilities(project_name: str):
-    """获取指定项目的漏洞列表"""
-    return db_helper.query_vulnerabilities_by_project(project_name)
+async def get_project_vulnerabilities(
+    project_name: str,
+    response: Response,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="上一页响应头 X-Next-Cursor 的值"),
+    since: Optional[int] = Query(None, description="只返回 id 大于该值的新漏洞 (重复发现只更新已有记录的 hit_count / last_seen，不会出现在增量结果中)"),
+    vuln_type: Optional[str] = None,
+    request_id: Optional[str] = None,
+    start: Optional[str] = Query(None, description="起始时间 (ISO 8601)"),
+    end: Optional[str] = Query(None, description="结束时间 (ISO 8601)"),
+    fields: Optional[str] = Query(None, description="逗号分隔的返回字段")
+):
+    """获取指定项目的漏洞列表 (游标分页，下一页游标见响应头 X-Next-Cursor)"""
+    try:
+        rows, next_cursor = await async_db.page_vulnerabilities(
+            project_name, limit=limit, cursor=cursor, since=since, vuln_type=vuln_type,
+            request_id=request_id, start=start, end=end, fields=_split_fields(fields)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return rows
 
 @router.get("/{project_name}/logs")
-async def get_project_logs(project_name: str):
-    """获取指定项目的 Agent 交互日志"""
-    return db_helper.query_logs_by_project(project_name)
+async def get_project_logs(
+    project_name: str,
+    response: Response,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="上一页响应头 X-Next-Cursor 的值"),
+    since: Optional[int] = Query(None, description="只返回 id 大于该值的新日志"),
+    agent: Optional[str] = None,
+    request_id: Optional[str] = None,
+    start: Optional[str] = Query(None, description="起始时间 (ISO 8601)"),
+    end: Optional[str] = Query(None, description="结束时间 (ISO 8601)"),
+    fields: Optional[str] = Query(None, description="逗号分隔的返回字段，列表视图可省略 prompt/response")
+):
+    """获取指定项目的 Agent 交互日志 (游标分页，下一页游标见响应头 X-Next-Cursor)"""
+    try:
+        rows, next_cursor = await async_db.page_logs(
+            project_name, limit=limit, cursor=cursor, since=since, agent=agent,
+            request_id=request_id, start=start, end=end, fields=_split_fields(fields)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return rows
+
+@router.get("/{project_name}/logs/{log_id}")
+async def get_project_log(project_name: str, log_id: int):
+    """获取单条交互日志的完整 Prompt 与响应"""
+    log = await async_db.get_log(project_name, log_id)
+    if log is None:
+        raise HTTPException(status_code=404, detail="日志不存在")
+    return log
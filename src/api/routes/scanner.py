@@ -1,79 +1,58 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, HTTPException, WebSocket
 from src.utils.redis_helper import RedisHelper
-from src.core.engine.manager import scanner_manager
+from src.core.engine.supervisor import supervisor_client, SupervisorUnavailable
+from src.api.log_stream import log_hub
+from src.api.progress_stream import progress_hub
 import asyncio
-import json
-from loguru import logger
 
 router = APIRouter()
 redis = RedisHelper()
 
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: list[WebSocket] = []
-
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
-
-    def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
-
-    async def broadcast(self, message: str):
-        for connection in self.active_connections:
-            try:
-                await connection.send_text(message)
-            except Exception:
-                pass
-
-manager = ConnectionManager()
-
 @router.get("/status")
 async def get_status():
-    """获取扫描器状态"""
-    manager_status = scanner_manager.get_status()
+    """获取扫描器状态 (读取监管进程定期写入的组件状态，任一 API worker 结果一致)"""
+    supervisor_status = await asyncio.to_thread(supervisor_client.status)
+    components = supervisor_status["components"]
     return {
-        "status": "running" if any(v == "running" for v in manager_status.values()) else "idle",
-        "components": manager_status
+        "status": "running" if any(v == "running" for v in components.values()) else "idle",
+        **supervisor_status,
     }
 
 @router.post("/start")
 async def start_scanner(project_name: str = "Default"):
-    """开始扫描 (设置当前活跃项目并确保组件启动)"""
+    """开始扫描 (设置当前活跃项目并通知监管进程启动组件)"""
     # 1. 设置当前活跃项目
-    redis.client.set("webagent:current_project", project_name)
+    await asyncio.to_thread(redis.client.set, "webagent:current_project", project_name)
     
-    # 2. 启动/确保拦截器和执行器运行
-    scanner_manager.start_components()
+    # 2. 启动/确保拦截器和执行器运行 (进程启停可能耗时数秒，不占用事件循环)
+    try:
+        result = await asyncio.to_thread(supervisor_client.request, "start")
+    except SupervisorUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
     
-    return {"status": "success", "message": f"项目 {project_name} 扫描已启动"}
+    return {"status": "success", "message": f"项目 {project_name} 扫描已启动", "components": result["components"]}
 
 @router.post("/stop")
 async def stop_scanner():
     """停止扫描组件"""
-    scanner_manager.stop_all()
-    return {"status": "success", "message": "扫描组件已停止"}
+    try:
+        result = await asyncio.to_thread(supervisor_client.request, "stop")
+    except SupervisorUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return {"status": "success", "message": "扫描组件已停止", "components": result["components"]}
 
 @router.websocket("/ws/logs")
 async def websocket_logs(websocket: WebSocket):
-    await manager.connect(websocket)
-    pubsub = redis.client.pubsub()
-    pubsub.subscribe("webagent:logs")
-    
-    try:
-        while True:
-            # 检查 pubsub 消息
-            message = pubsub.get_message(ignore_subscribe_messages=True)
-            if message:
-                log_data = message['data']
-                if isinstance(log_data, bytes):
-                    log_data = log_data.decode('utf-8')
-                await websocket.send_text(log_data)
-            await asyncio.sleep(0.1)
-    except WebSocketDisconnect:
-        manager.disconnect(websocket)
-    except Exception as e:
-        logger.error(f"WebSocket 异常: {e}")
-        manager.disconnect(websocket)
-    finally:
-        pubsub.unsubscribe("webagent:logs")
+    """实时日志推送 (由进程内共享的 Redis 订阅分发)"""
+    await log_hub.serve(websocket)
+
+@router.get("/progress")
+async def get_progress():
+    """近期任务的实时进度 (含探测速率与停滞标记)"""
+    await progress_hub.load()
+    return progress_hub.snapshot()
+
+@router.websocket("/ws/progress")
+async def websocket_progress(websocket: WebSocket):
+    """任务进度推送：连接时发送快照，之后合并推送有变化的任务"""
+    await progress_hub.serve(websocket)
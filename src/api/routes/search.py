@@ -0,0 +1,56 @@
+import sqlite3
+from fastapi import APIRouter, HTTPException, Query
+from src.utils.async_db import async_db
+from typing import Optional
+
+router = APIRouter()
+
+# trigram 分词器要求字面查询至少 3 个字符
+_MIN_QUERY = 3
+
+def _check_query(q: str, raw: bool):
+    if not raw and len(q) < _MIN_QUERY:
+        raise HTTPException(status_code=400, detail=f"检索关键字至少 {_MIN_QUERY} 个字符")
+
+@router.get("/logs")
+async def search_logs(
+    q: str = Query(..., description="检索内容 (默认按字面子串匹配)"),
+    project: Optional[str] = Query(None, description="按项目名称过滤"),
+    agent: Optional[str] = Query(None, description="按 Agent 名称过滤"),
+    limit: int = Query(50, ge=1, le=500),
+    raw: bool = Query(False, description="使用 FTS5 查询语法 (AND / OR / NEAR 等)")
+):
+    """全文检索 Agent 交互日志，按相关度排序"""
+    _check_query(q, raw)
+    try:
+        return await async_db.search_logs(q, project, agent=agent, limit=limit, raw=raw)
+    except sqlite3.OperationalError as e:
+        raise HTTPException(status_code=400, detail=f"检索语法错误: {e}")
+
+@router.get("/vulnerabilities")
+async def search_vulnerabilities(
+    q: str = Query(..., description="检索内容 (默认按字面子串匹配)"),
+    project: Optional[str] = Query(None, description="按项目名称过滤"),
+    vuln_type: Optional[str] = Query(None, description="按漏洞类型过滤"),
+    limit: int = Query(50, ge=1, le=500),
+    raw: bool = Query(False, description="使用 FTS5 查询语法 (AND / OR / NEAR 等)")
+):
+    """全文检索漏洞证据与 Payload，按相关度排序"""
+    _check_query(q, raw)
+    try:
+        return await async_db.search_vulnerabilities(q, project, vuln_type=vuln_type, limit=limit, raw=raw)
+    except sqlite3.OperationalError as e:
+        raise HTTPException(status_code=400, detail=f"检索语法错误: {e}")
+
+@router.get("/archive")
+async def search_archived_logs(
+    q: str = Query(..., description="检索内容 (不区分大小写的子串匹配)"),
+    project: str = Query(..., description="项目名称"),
+    start_month: Optional[str] = Query(None, description="起始月份 (YYYY-MM)"),
+    end_month: Optional[str] = Query(None, description="结束月份 (YYYY-MM)"),
+    agent: Optional[str] = Query(None, description="按 Agent 名称过滤"),
+    limit: int = Query(50, ge=1, le=500)
+):
+    """按需检索已归档的 Agent 日志 (只解压所选月份的归档段)"""
+    _check_query(q, False)
+    return await async_db.search_archived_logs(q, project, start_month, end_month, agent=agent, limit=limit)
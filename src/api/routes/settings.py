@@ -1,8 +1,12 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from src.config.settings import settings, Settings
+from src.utils.runtime_config import runtime_config, RESTART_REQUIRED
 import os
+import asyncio
+import redis
 from dotenv import set_key
+from loguru import logger
 from typing import Dict, Any
 
 router = APIRouter()
@@ -18,21 +22,39 @@ async def get_settings():
 
 @router.post("/")
 async def update_settings(update: SettingsUpdate):
-    """更新系统配置并持久化到 .env"""
+    """
+    更新系统配置：持久化到 .env，并通过 Redis 发布到运行器与拦截器进程，
+    并发上限、超时、白名单与模型等配置无需重启即可生效
+    """
     env_path = ".env"
     if not os.path.exists(env_path):
         with open(env_path, "w") as f:
             f.write("")
 
+    # 忽略不属于 Settings 的字段
+    updates = {key: value for key, value in update.configs.items() if key in Settings.model_fields}
     try:
-        for key, value in update.configs.items():
-            # 校验 key 是否在 Settings 中
-            if hasattr(settings, key):
-                # 更新内存中的配置
-                setattr(settings, key, value)
-                # 持久化到 .env
-                set_key(env_path, key, str(value))
-        
-        return {"status": "success", "message": "配置已更新"}
+        values = runtime_config.validate(updates)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"配置校验失败: {str(e)}")
+
+    try:
+        for key, value in values.items():
+            # 持久化到 .env (列表按逗号分隔，与读取时的解析方式一致)
+            set_key(env_path, key, ",".join(map(str, value)) if isinstance(value, list) else str(value))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"更新配置失败: {str(e)}")
+
+    try:
+        version, _ = await asyncio.to_thread(runtime_config.publish, values)
+    except redis.RedisError as e:
+        # 本进程已生效，其他进程将在重启后从 .env 读取
+        logger.warning(f"运行时配置发布失败: {e}")
+        return {"status": "partial", "message": "配置已保存，但未能通知运行中的组件 (Redis 不可用)"}
+
+    return {
+        "status": "success",
+        "message": "配置已更新",
+        "version": version,
+        "restart_required": sorted(set(values) & RESTART_REQUIRED)
+    }
@@ -0,0 +1,50 @@
+from typing import Dict, List
+from fastapi import APIRouter, HTTPException, Query
+from src.utils.async_db import async_db
+from src.utils.tracing import to_otlp
+
+router = APIRouter()
+
+def _waterfall(spans: List[Dict]) -> Dict:
+    """计算每个 Span 的层级与相对根 Span 的起始偏移，前端按此绘制瀑布图"""
+    by_id = {span["span_id"]: span for span in spans}
+    root = next((span for span in spans if not span["parent_id"]), spans[0])
+    origin = min(span["start_time"] for span in spans)
+
+    def depth(span: Dict) -> int:
+        level = 0
+        while span["parent_id"] in by_id and level < 64:
+            span = by_id[span["parent_id"]]
+            level += 1
+        return level
+
+    rows = [{
+        **span,
+        "depth": depth(span),
+        "offset_ms": round((span["start_time"] - origin) * 1000, 3),
+    } for span in spans]
+    return {
+        "trace_id": root["trace_id"],
+        "name": root["name"],
+        "duration_ms": root["duration_ms"],
+        "status": "error" if any(span["status"] == "error" for span in spans) else "ok",
+        "attributes": root["attributes"],
+        "spans": rows,
+    }
+
+@router.get("/")
+async def list_traces(project: str = Query("Default", description="项目名称"),
+                      limit: int = Query(50, ge=1, le=500),
+                      min_duration_ms: float = Query(0, ge=0, description="只返回耗时不低于该值的任务")):
+    """列出项目最近的任务追踪 (根 Span)"""
+    return await async_db.list_traces(project, limit=limit, min_duration_ms=min_duration_ms)
+
+@router.get("/{request_id}")
+async def get_trace(request_id: str, format: str = Query("waterfall", description="返回格式: waterfall / otlp")):
+    """获取单个任务的 Span 树；format=otlp 时返回 OTLP/JSON，可直接导入支持 OpenTelemetry 的工具"""
+    spans = await async_db.get_trace(request_id)
+    if not spans:
+        raise HTTPException(status_code=404, detail="Trace not found")
+    if format == "otlp":
+        return to_otlp(spans)
+    return _waterfall(spans)
@@ -0,0 +1,22 @@
+from fastapi import APIRouter, HTTPException, Query
+from src.utils.async_db import async_db
+
+router = APIRouter()
+
+@router.get("/")
+async def usage_by_project():
+    """按项目汇总 LLM 调用次数、Token、耗时与费用"""
+    return await async_db.usage_by_project()
+
+@router.get("/{project_name}")
+async def project_usage(project_name: str, group_by: str = Query("agent", description="分组维度: agent / model / task")):
+    """按 Agent、模型或任务汇总指定项目的 LLM 用量"""
+    try:
+        return await async_db.usage_rollup(project_name, group_by)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/{project_name}/endpoints")
+async def top_endpoints(project_name: str, top: int = Query(10, ge=1, le=100)):
+    """获取 LLM 花费最高的 Top-N 接口"""
+    return await async_db.top_endpoints_by_cost(project_name, top)
@@ -1,9 +1,53 @@
-from fastapi import APIRouter
-from src.utils.db_helper import db_helper
+from fastapi import APIRouter, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from urllib.parse import quote
+from src.utils.async_db import async_db
+from src.utils.exporter import EXPORT_FORMATS, buffered, iter_export
+from typing import Optional
 
 router = APIRouter()
 
 @router.get("/")
-async def list_all_vulnerabilities():
-    """获取所有发现的漏洞列表"""
-    return db_helper.query_all_vulnerabilities()
+async def list_all_vulnerabilities(
+    response: Response,
+    project: Optional[str] = Query(None, description="按项目名称过滤"),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="上一页响应头 X-Next-Cursor 的值"),
+    since: Optional[int] = Query(None, description="只返回 id 大于该值的新漏洞 (重复发现只更新已有记录的 hit_count / last_seen，不会出现在增量结果中)"),
+    vuln_type: Optional[str] = None,
+    request_id: Optional[str] = None,
+    start: Optional[str] = Query(None, description="起始时间 (ISO 8601)"),
+    end: Optional[str] = Query(None, description="结束时间 (ISO 8601)"),
+    fields: Optional[str] = Query(None, description="逗号分隔的返回字段")
+):
+    """获取所有发现的漏洞列表 (游标分页，下一页游标见响应头 X-Next-Cursor)"""
+    try:
+        rows, next_cursor = await async_db.page_vulnerabilities(
+            project, limit=limit, cursor=cursor, since=since, vuln_type=vuln_type, request_id=request_id,
+            start=start, end=end, fields=[name.strip() for name in fields.split(",") if name.strip()] if fields else None
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return rows
+
+@router.get("/export")
+async def export_vulnerabilities(
+    project: Optional[str] = Query(None, description="按项目名称过滤，默认导出全部项目"),
+    format: str = Query("ndjson", description="导出格式: ndjson / csv / sarif"),
+    include_request: bool = Query(False, description="包含完整原始请求"),
+    include_logs: bool = Query(False, description="包含关联的 Agent 交互日志")
+):
+    """流式导出漏洞 (逐条生成，内存占用与项目规模无关)"""
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"不支持的导出格式: {format}")
+    media_type, extension = EXPORT_FORMATS[format]
+    # 项目解析在数据库线程池中完成，逐行读取由 StreamingResponse 在工作线程中迭代
+    rows = await async_db.iter_vulnerabilities(project, include_request=include_request, include_logs=include_logs)
+    filename = quote(f"{project or 'all'}_findings.{extension}")
+    return StreamingResponse(
+        buffered(iter_export(rows, format, include_request, include_logs)),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename*=UTF-8''{filename}"}
+    )
@@ -8,6 +8,25 @@ class Settings(BaseSettings):
     OPENAI_API_BASE: str = Field(default="https://api.openai.com/v1", description="OpenAI API Base URL")
     MODEL_NAME_MANAGER: str = Field(default="gpt-4o", description="Manager 节点使用的模型")
     MODEL_NAME_WORKER: str = Field(default="gpt-3.5-turbo", description="Worker 节点使用的模型")
+    MODEL_NAME_WORKER_FAST: Optional[str] = Field(default=None, description="级联策略中的低成本/快速模型，留空则禁用级联")
+    LLM_CASCADE_ESCALATE_RETRY: int = Field(default=1, description="重试轮数达到该值后直接使用强模型")
+    LLM_CASCADE_MIN_CONFIDENCE: float = Field(default=0.7, description="快速模型输出置信度低于该值时升级到强模型")
+    LLM_CASCADE_EASY_MAX_ELAPSED: float = Field(default=2.0, description="任一探测耗时超过该值 (秒) 即视为时间异常，分析不交给快速模型")
+    LLM_CASCADE_EASY_ELAPSED_RATIO: float = Field(default=3.0, description="最长探测耗时超过最短耗时的该倍数即视为时间异常 (用于识别时间盲注)")
+    LLM_PRICING: str = Field(
+        default="gpt-4o:2.5:10,gpt-4o-mini:0.15:0.6,gpt-3.5-turbo:0.5:1.5",
+        description="模型价格 (美元/百万 Token，格式: 模型:输入价格:输出价格，逗号分隔)"
+    )
+
+    # LLM 响应缓存
+    LLM_CACHE_ENABLED: bool = Field(default=True, description="是否启用 LLM 响应缓存")
+    LLM_CACHE_TTL: int = Field(default=86400, description="缓存默认过期时间 (秒)")
+    LLM_CACHE_MAX_ENTRIES: int = Field(default=5000, description="缓存最大条目数，超出后按最近访问时间淘汰")
+    LLM_CACHE_AGENT_POLICY: str = Field(
+        # Manager 与各分析器的输出是扫描决策，回放旧结果会掩盖模型更新或配置变化后的判断，默认不缓存
+        default="Manager:0,SQLi_Analyzer:0,XSS_Analyzer:0,Fuzz_Analyzer:0",
+        description="按 Agent 覆盖缓存 TTL (格式: Manager:0,SQLi_Strategist:3600，0 表示对该 Agent 禁用缓存)"
+    )
 
     # 代理配置
     MITM_PROXY_PORT: int = Field(default=8080, description="Mitmproxy 监听端口")
@@ -18,6 +37,9 @@ class Settings(BaseSettings):
     SCAN_MAX_CONCURRENCY: int = Field(default=5, description="单个扫描任务内的最大并发探测数")
     SCAN_MAX_RETRIES: int = Field(default=3, description="每个参数的最大重试轮数")
     SCAN_TIMEOUT: float = Field(default=10.0, description="请求超时时间")
+    STRATEGIST_STREAMING: bool = Field(default=True, description="Strategist 流式输出，边生成边探测")
+    FINDING_INDEX_SIZE: int = Field(default=10000, description="运行器内存中保留的最近漏洞身份数量")
+    FINDING_FLUSH_INTERVAL: float = Field(default=5.0, description="重复漏洞命中次数批量写回数据库的间隔 (秒)")
 
     # 目标限制
     TARGET_WHITELIST: Any = Field(
@@ -38,6 +60,12 @@ class Settings(BaseSettings):
     @field_validator("SCAN_PROXY", mode="before")
     @classmethod
     def parse_proxy(cls, v: Any) -> Optional[str]:
+        return cls._blank_to_none(v)
+
+    @field_validator("MODEL_NAME_WORKER_FAST", mode="before")
+    @classmethod
+    def _blank_to_none(cls, v: Any) -> Optional[str]:
+        """空字符串或 "none" 视为未配置"""
         if v is None:
             return None
         s = str(v).strip()
@@ -54,7 +82,52 @@ class Settings(BaseSettings):
 
     # 日志配置
     LOG_LEVEL: str = Field(default="INFO", description="日志级别")
-    LOG_PROMPT_INTERACTION: bool = Field(default=True, description="是否记录全量 Prompt 交互")
+    LOG_PROBE_SAMPLE_RATE: float = Field(default=1.0, description="逐个探测请求 DEBUG 日志的采样率 (0~1，0 表示不记录)")
+    LOG_PROMPT_INTERACTION: bool = Field(default=True, description="是否在控制台回显 Prompt 交互")
+    AUDIT_ECHO_VERBOSITY: int = Field(default=1, description="审计回显详细程度 (0: 关闭, 1: 单行摘要, 2: 完整 Prompt/响应)")
+    AUDIT_QUEUE_SIZE: int = Field(default=10000, description="审计记录队列容量")
+    AUDIT_PUT_TIMEOUT: float = Field(default=1.0, description="审计队列已满时非事件循环线程的最长等待时间 (秒)，超时后丢弃记录")
+    AUDIT_BATCH_SIZE: int = Field(default=200, description="审计记录单批写入的最大条数")
+    AUDIT_FLUSH_INTERVAL: float = Field(default=0.5, description="审计记录批量写入的最长等待时间 (秒)")
+    LOG_COMPRESS_MIN_BYTES: int = Field(default=1024, description="超过该大小的 Prompt/响应文本压缩存储")
+    PROMPT_SEGMENT_MIN_CHARS: int = Field(default=256, description="不含变量且超过该长度的 Prompt 片段按哈希去重存储")
+    LOG_SEARCH_INDEX_ENABLED: bool = Field(default=True, description="是否为 Agent 日志建立全文索引 (用于 /api/search)；关闭期间写入的日志在重新开启后由后台维护任务补建索引")
+
+    # 数据库配置
+    DB_POOL_SIZE: int = Field(default=8, description="SQLite 连接池大小 (每个进程)")
+    DB_BUSY_TIMEOUT: float = Field(default=30.0, description="SQLite 锁等待与连接获取超时 (秒)")
+    DB_PROJECT_CACHE_TTL: float = Field(default=60.0, description="项目名称到 ID 的进程内缓存有效期 (秒)")
+    DB_ASYNC_WORKERS: int = Field(default=4, description="API 进程中执行数据库查询的线程数")
+    DB_ASYNC_MAX_PENDING: int = Field(default=64, description="API 进程中排队等待的数据库调用上限")
+    LOG_STREAM_QUEUE_SIZE: int = Field(default=1000, description="实时日志 WebSocket 每个客户端的待发送队列长度，超出后丢弃最旧的日志")
+    LOG_STREAM_LEVEL: str = Field(default="INFO", description="推送到实时日志通道的最低级别 (DEBUG 会推送每个探测请求的日志)")
+    LOG_STREAM_BATCH_INTERVAL: float = Field(default=0.25, description="实时日志合并为一帧发送的时间窗口 (秒)")
+    LOG_STREAM_MAX_RATE: int = Field(default=200, description="每个实时日志客户端每秒最多接收的日志行数，超出部分丢弃并提示")
+    LOG_STREAM_MAXLEN: int = Field(default=2000, description="Redis 日志 Stream 保留的最近日志条数 (新连接的客户端回放)")
+    LOG_STREAM_REPLAY: int = Field(default=200, description="WebSocket 连接时回放的最近日志条数 (0 表示不回放)")
+    LOG_SHIP_INTERVAL: float = Field(default=0.2, description="实时日志后台批量发送间隔 (秒)")
+    LOG_SHIP_BATCH_SIZE: int = Field(default=500, description="实时日志每批发送的最大条数")
+    LOG_SHIP_BUFFER: int = Field(default=20000, description="Redis 不可用时进程内缓存的实时日志上限，超出后丢弃最旧的日志")
+    METRICS_DIR: str = Field(default="logs/metrics", description="各进程指标快照目录 (由 /api/metrics 合并)")
+    METRICS_FLUSH_INTERVAL: float = Field(default=5.0, description="进程指标快照的写入间隔 (秒)")
+    METRICS_SNAPSHOT_TTL: float = Field(default=300.0, description="指标快照文件超过该时长 (秒) 未更新即删除 (被强制结束的进程遗留的文件)")
+    TRACE_ENABLED: bool = Field(default=True, description="是否记录任务级追踪 Span (存入 SQLite，可在 /api/traces 查看)")
+    TRACE_OTLP_FILE: Optional[str] = Field(default=None, description="追加写入 OTLP/JSON 追踪数据的文件路径 (为空则不导出)")
+    TRACE_QUEUE_SIZE: int = Field(default=20000, description="追踪 Span 写入队列容量，写入过慢导致队列已满时丢弃新的 Span")
+    PROFILE_DIR: str = Field(default="logs/profiles", description="按需剖析结果的输出目录")
+    PROFILE_MAX_DURATION: float = Field(default=600.0, description="单次剖析的最长持续时间 (秒)")
+    PROFILE_SAMPLE_INTERVAL: float = Field(default=0.005, description="栈采样剖析的采样间隔 (秒)")
+    PROFILE_TRACEMALLOC_FRAMES: int = Field(default=10, description="内存剖析时 tracemalloc 保留的调用栈深度")
+    PROGRESS_INTERVAL: float = Field(default=0.5, description="任务进度写入 Redis 并推送的间隔 (秒)")
+    PROGRESS_TTL: int = Field(default=3600, description="任务进度在 Redis 中的保留时间 (秒)")
+    PROGRESS_STALL_SECONDS: float = Field(default=60.0, description="运行中的任务超过该时长无进展即标记为停滞 (秒)")
+    API_WORKERS: int = Field(default=4, description="API 服务的 uvicorn worker 进程数 (组件启停由独立的监管进程负责)")
+    SUPERVISOR_HEARTBEAT: float = Field(default=2.0, description="监管进程写入组件状态的间隔 (秒)，状态超过 3 倍间隔未更新即视为监管进程离线")
+    SUPERVISOR_REQUEST_TIMEOUT: float = Field(default=30.0, description="API 等待监管进程执行启停命令的超时时间 (秒)")
+    LOG_RETENTION_DAYS: int = Field(default=30, description="Agent 日志在数据库中保留的天数，超期归档为 JSONL.gz (0 表示不归档)")
+    LOG_ARCHIVE_DIR: str = Field(default="data/archive", description="日志归档文件目录")
+    RETENTION_INTERVAL: float = Field(default=3600.0, description="日志归档任务的执行间隔 (秒)")
+    DB_DELETE_BATCH_SIZE: int = Field(default=2000, description="后台删除 / 归档时单个事务处理的行数")
 
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8", extra="ignore")
 
@@ -4,18 +4,51 @@ import asyncio
 import difflib
 from loguru import logger
 from typing import Optional, List, Dict
-from urllib.parse import parse_qsl
+from urllib.parse import parse_qsl, urlsplit
 from src.config.settings import settings
+from src.utils.logger_config import lazy_logger, probe_sampler
+from src.utils.metrics import metrics
+from src.utils.tracing import tracer
+from src.utils.concurrency import ResizableSemaphore
+from src.utils.progress import progress
+
+PROBES = metrics.counter("aegisx_probes_total", "发送的探测请求 (按目标主机)", ["host"])
+PROBE_STATUS = metrics.counter("aegisx_probe_responses_total", "探测响应状态分布 (timeout / error 表示未获得响应)", ["status"])
+PROBE_SECONDS = metrics.histogram(
+    "aegisx_probe_duration_seconds", "单个探测请求的耗时", buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+
+def record_probe(url: str, status: str, elapsed: float):
+    """记录一次探测的主机、状态与耗时 (两个执行器共用)"""
+    PROBES.inc(host=urlsplit(url).hostname or "unknown")
+    PROBE_STATUS.inc(status=status)
+    PROBE_SECONDS.observe(elapsed)
+    progress.incr("probes_sent")
+
+def probe_summary(results: List[Dict]) -> Dict[str, int]:
+    """执行器批次 Span 的属性：探测总数与未获得响应的数量"""
+    return {"probes": len(results), "failed": sum(1 for r in results if not r.get("status"))}
 
 class GenericExecutor:
     """
     通用探测执行引擎：支持 GET/POST 异步并发参数注入
     """
     def __init__(self, timeout: Optional[float] = None, proxies: Optional[str] = None, max_concurrency: Optional[int] = None):
-        self.timeout = timeout or settings.SCAN_TIMEOUT
+        self._timeout = timeout
         self.proxies = proxies or settings.SCAN_PROXY
-        self.max_concurrency = max_concurrency or settings.SCAN_MAX_CONCURRENCY
-        self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        # 未显式指定时跟随 SCAN_MAX_CONCURRENCY，运行中修改配置后在下一次获取 / 释放时生效
+        self.semaphore = ResizableSemaphore(max_concurrency or (lambda: settings.SCAN_MAX_CONCURRENCY))
+        # 空闲的并发槽编号，作为探测日志的 worker 上下文 (按需分配，上限调大时自动增加)
+        self._free_slots: List[int] = []
+        self._slot_count = 0
+
+    @property
+    def timeout(self) -> float:
+        return self._timeout or settings.SCAN_TIMEOUT
+
+    @property
+    def max_concurrency(self) -> int:
+        return self.semaphore.limit
 
     async def execute_batch(self, 
                             target_url: str, 
@@ -124,18 +157,31 @@ class GenericExecutor:
                 ))
 
             # 并发执行所有请求
-            results = await asyncio.gather(*tasks)
+            progress.incr("probes_total", len(tasks))
+            with tracer.span("executor.batch", concurrency=self.max_concurrency) as span:
+                results = await asyncio.gather(*tasks)
+                span.set(**probe_summary(results))
             
         return results
 
     async def _execute_with_semaphore(self, *args, **kwargs):
-        """带并发控制的执行包装器"""
+        """带并发控制的执行包装器 (占用一个并发槽，槽内所有日志带上 worker 编号)"""
         async with self.semaphore:
-            return await self._execute_single(*args, **kwargs)
+            if self._free_slots:
+                slot = self._free_slots.pop()
+            else:
+                slot = self._slot_count
+                self._slot_count += 1
+            try:
+                with logger.contextualize(worker=slot):
+                    return await self._execute_single(*args, **kwargs)
+            finally:
+                self._free_slots.append(slot)
 
     async def _execute_single(self, client, method, url, params, data, is_json, param_name, payload, original_response=None) -> Dict:
         """执行单个异步请求"""
-        logger.debug(f"发送异步探测 | 方法: {method} | 参数: {param_name} | 并发槽: {self.max_concurrency - self.semaphore._value} | Payload: {payload}")
+        if probe_sampler.sample():
+            lazy_logger.debug("发送异步探测 | {}", lambda: f"方法: {method} | 参数: {param_name} | Payload: {payload}")
         try:
             if method == "GET":
                 resp = await client.get(url, params=params, timeout=self.timeout)
@@ -157,6 +203,7 @@ class GenericExecutor:
                 matcher = difflib.SequenceMatcher(None, orig_snippet, resp_snippet)
                 diff_stats["similarity"] = round(matcher.quick_ratio(), 4)
 
+            record_probe(url, str(resp.status_code), resp.elapsed.total_seconds())
             return {
                 "parameter": param_name,
                 "payload": payload,
@@ -168,6 +215,7 @@ class GenericExecutor:
         except httpx.ReadTimeout:
             # 捕获超时异常，视为可能的时间盲注成功
             logger.warning(f"请求超时 (可能触发了时间盲注) | 参数: {param_name} | Payload: {payload}")
+            record_probe(url, "timeout", float(self.timeout))
             return {
                 "parameter": param_name,
                 "payload": payload,
@@ -177,6 +225,7 @@ class GenericExecutor:
             }
         except Exception as e:
             logger.exception(f"异步请求失败 ({param_name}): {e}")
+            record_probe(url, "error", 0.0)
             return {
                 "parameter": param_name, "payload": payload,
                 "response": f"Error: {str(e)}", "status": 0, "elapsed": 0.0
@@ -0,0 +1,78 @@
+import time
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Tuple
+from loguru import logger
+from src.config.settings import settings
+from src.utils.endpoint import finding_identity
+from src.utils.metrics import metrics
+from src.utils.progress import progress
+
+FINDINGS = metrics.counter("aegisx_findings_total", "确认的漏洞发现 (new 为首次发现，duplicate 为重复命中)", ["vuln_type", "result"])
+
+class FindingIndex:
+    """
+    运行器内的最近漏洞索引：
+    1. 以 (项目 ID, 指纹) 为键缓存已入库的漏洞 id (LRU)；使用 ID 而非名称，
+       项目被删除后以同名重建时不会误判为已知漏洞
+    2. 首次发现走数据库 Upsert；已知漏洞的重复命中只在内存中累加，
+       按 FINDING_FLUSH_INTERVAL 批量写回 hit_count / last_seen
+    """
+    def __init__(self, max_entries: int = None, flush_interval: float = None):
+        self.max_entries = max_entries or settings.FINDING_INDEX_SIZE
+        self.flush_interval = flush_interval if flush_interval is not None else settings.FINDING_FLUSH_INTERVAL
+        self._entries: "OrderedDict[Tuple[int, str], int]" = OrderedDict()
+        # 漏洞 id -> [待写回的命中次数, 最近发现时间]
+        self._pending: Dict[int, List[Any]] = {}
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+    def record(self, project_name: str, finding: Dict[str, Any]) -> bool:
+        """记录一次发现，返回是否为新漏洞"""
+        from src.utils.db_helper import db_helper
+        _, fingerprint = finding_identity(finding.get("type"), finding.get("method"), finding.get("url"), finding.get("parameter"))
+        key = (db_helper.get_or_create_project(project_name), fingerprint)
+
+        with self._lock:
+            vuln_id = self._entries.get(key)
+            if vuln_id is not None:
+                self._entries.move_to_end(key)
+                pending = self._pending.setdefault(vuln_id, [0, None])
+                pending[0] += 1
+                pending[1] = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+        if vuln_id is None:
+            vuln_id, hit_count = db_helper.save_vulnerability(project_name, finding)
+            with self._lock:
+                self._entries[key] = vuln_id
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            created = hit_count == 1
+        else:
+            created = False
+
+        FINDINGS.inc(vuln_type=finding.get("type") or "unknown", result="new" if created else "duplicate")
+        progress.incr("findings")
+        self.maybe_flush()
+        return created
+
+    def maybe_flush(self):
+        """距上次写回超过 FINDING_FLUSH_INTERVAL 时写回"""
+        if self._pending and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """将累积的重复命中写回数据库"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+        if not pending:
+            return
+        try:
+            from src.utils.db_helper import db_helper
+            db_helper.add_vulnerability_hits([(vuln_id, count, last_seen) for vuln_id, (count, last_seen) in pending.items()])
+        except Exception as e:
+            logger.error(f"写回漏洞命中次数失败 ({len(pending)} 条): {e}")
+
+finding_index = FindingIndex()
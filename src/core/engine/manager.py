@@ -94,6 +94,7 @@ class ScannerManager:
         content = """
 import sys
 import os
+import signal
 import asyncio
 from loguru import logger
 
@@ -102,17 +103,32 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../.
 
 from src.core.engine.runner import TaskRunner
 from src.utils.logger_config import setup_logging
+from src.utils.auditor import auditor
+from src.core.engine.findings import finding_index
+from src.utils.metrics import metrics
+from src.utils.tracing import tracer
+from src.utils.runtime_config import runtime_config
 
 async def main():
-    setup_logging()
+    setup_logging(component="runner")
+    metrics.start_exporter("runner")
+    # 加载并订阅 API 发布的运行时配置 (并发上限、超时、模型等)
+    runtime_config.start("runner")
     logger.info("TaskRunner 子进程已启动")
     try:
         runner = TaskRunner()
         await runner.run()
     except Exception as e:
         logger.error(f"TaskRunner 运行异常: {e}")
+    finally:
+        # 刷新尚未写入的漏洞命中次数、审计记录与追踪 Span
+        finding_index.flush()
+        tracer.flush()
+        auditor.close()
 
 if __name__ == "__main__":
+    # 将 terminate() 发送的 SIGTERM 转换为正常退出，以便刷新审计队列
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
     asyncio.run(main())
 """
         with open(path, "w", encoding="utf-8") as f:
@@ -7,6 +7,18 @@ from src.utils.redis_helper import RedisHelper
 from src.agents.manager.graph import graph
 from src.agents.manager.state import AgentState
 from src.config.settings import settings
+from src.core.engine.findings import finding_index
+from src.utils.metrics import metrics
+from src.utils.tracing import tracer
+from src.utils.profiler import profiler
+from src.utils.progress import progress
+from src.utils.concurrency import ResizableSemaphore
+from src.utils.runtime_config import runtime_config
+
+TASKS_STARTED = metrics.counter("aegisx_tasks_started_total", "运行器开始处理的任务")
+TASKS_COMPLETED = metrics.counter("aegisx_tasks_completed_total", "运行器完成的任务 (按结果)", ["outcome"])
+TASKS_IN_PROGRESS = metrics.gauge("aegisx_tasks_in_progress", "正在处理的任务数")
+TASK_SECONDS = metrics.histogram("aegisx_task_duration_seconds", "单个任务的端到端耗时")
 
 class TaskRunner:
     """
@@ -15,59 +27,106 @@ class TaskRunner:
     def __init__(self):
         self.redis = RedisHelper()
         self.queue_key = "webagent:tasks:initial"
-        # 引入信号量限制并发任务数
-        self.semaphore = asyncio.Semaphore(settings.SCAN_MAX_TASKS)
+        # 控制命令队列 (由 API 写入，例如开启剖析)，与任务队列在同一次 BLPOP 中等待
+        self.control_key = "webagent:control:runner"
+        # 引入信号量限制并发任务数 (跟随 SCAN_MAX_TASKS，运行中可调整)
+        self.semaphore = ResizableSemaphore(lambda: settings.SCAN_MAX_TASKS)
         logger.info(f"TaskRunner 初始化成功，最大并发任务数: {settings.SCAN_MAX_TASKS}")
 
     async def _process_task(self, request: dict):
         """处理单个任务的协程"""
         async with self.semaphore:
+            request_id = str(uuid.uuid4())
+            project_name = request.get("project_name", "Default")
+            # 任务内所有日志 (包括子图与工具调用) 都带上项目与任务 ID，供实时日志按任务过滤
+            with logger.contextualize(project=project_name, request_id=request_id), \
+                    tracer.span("task", trace_id=request_id, project=project_name,
+                                method=request.get("method"), url=request.get("url")) as span, \
+                    progress.task(request_id, project_name, request.get("method") or "", request.get("url") or ""):
+                outcome = await self._run_graph(request, request_id, project_name)
+                span.set(outcome=outcome)
+
+    async def _run_graph(self, request: dict, request_id: str, project_name: str) -> str:
+        TASKS_STARTED.inc()
+        TASKS_IN_PROGRESS.inc()
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            # 初始化 Agent 状态
+            initial_state: AgentState = {
+                "request_id": request_id,
+                "project_name": project_name, # 提取项目名称
+                "target_url": request["url"],
+                "method": request["method"],
+                "headers": request.get("headers", {}),
+                "body": request.get("body"),
+                "response_headers": request.get("response_headers", {}),
+                "response_body": request.get("response_body", ""),
+                "tasks": [],
+                "messages": [],
+                "findings": []
+            }
+
+            logger.info(f"开始处理任务: {initial_state['request_id']} | {initial_state['method']} {initial_state['target_url']}")
+
+            # 驱动 LangGraph 异步运行
+            final_state = await graph.ainvoke(initial_state)
+
+            findings = final_state.get("findings", [])
+            outcome = "vulnerable" if findings else "clean"
+            if findings:
+                logger.success(f"发现漏洞！任务 ID: {initial_state['request_id']}")
+            else:
+                logger.info(f"未发现漏洞: {initial_state['request_id']}")
+
+            logger.success(f"任务处理完成: {initial_state['request_id']} | 识别任务: {final_state.get('tasks', [])}")
+
+        except Exception as e:
+            logger.exception(f"处理任务时发生异常: {str(e)}")
+        finally:
+            TASKS_IN_PROGRESS.dec()
+            TASKS_COMPLETED.inc(outcome=outcome)
+            TASK_SECONDS.observe(time.perf_counter() - started)
+        return outcome
+
+    def _handle_control(self, command: dict):
+        """处理控制命令 (在事件循环线程中执行，cProfile 剖析依赖于此)"""
+        if time.time() - command.get("requested_at", 0) > 60:
+            logger.warning(f"忽略过期的控制命令: {command}")
+            return
+        if command.get("action") == "profile":
             try:
-                # 初始化 Agent 状态
-                initial_state: AgentState = {
-                    "request_id": str(uuid.uuid4()),
-                    "project_name": request.get("project_name", "Default"), # 提取项目名称
-                    "target_url": request["url"],
-                    "method": request["method"],
-                    "headers": request.get("headers", {}),
-                    "body": request.get("body"),
-                    "response_headers": request.get("response_headers", {}),
-                    "response_body": request.get("response_body", ""),
-                    "tasks": [],
-                    "messages": [],
-                    "findings": []
-        }
-                
-                logger.info(f"开始处理任务: {initial_state['request_id']} | {initial_state['method']} {initial_state['target_url']}")
-                
-                # 驱动 LangGraph 异步运行
-                final_state = await graph.ainvoke(initial_state)
-                
-                findings = final_state.get("findings", [])
-                if findings:
-                    logger.success(f"发现漏洞！任务 ID: {initial_state['request_id']}")
-                else:
-                    logger.info(f"未发现漏洞: {initial_state['request_id']}")
-                
-                logger.success(f"任务处理完成: {initial_state['request_id']} | 识别任务: {final_state.get('tasks', [])}")
-                
-            except Exception as e:
-                logger.exception(f"处理任务时发生异常: {str(e)}")
+                profiler.start(command.get("mode", "sample"), command.get("duration", 30), component="runner")
+            except (ValueError, RuntimeError) as e:
+                logger.warning(f"无法开启剖析: {e}")
+        else:
+            logger.warning(f"未知的控制命令: {command}")
+
+    def _on_settings_changed(self, changed: set):
+        """运行时配置变化 (在事件循环线程中执行)：调大并发任务数时立即放行排队的任务"""
+        self.semaphore.refresh()
+        logger.info(f"并发任务数上限: {self.semaphore.limit} | 运行中: {self.semaphore.in_use} | 排队: {self.semaphore.waiting}")
 
     async def run(self):
         logger.info("Task Runner 启动，正在监听任务队列...")
         loop = asyncio.get_event_loop()
+        runtime_config.add_listener(self._on_settings_changed, keys={"SCAN_MAX_TASKS"}, loop=loop)
         
         while True:
             try:
-                # 从 Redis 队列中获取任务 (阻塞式获取)
-                task_data = await loop.run_in_executor(None, self.redis.client.blpop, self.queue_key, 5)
+                # 从 Redis 队列中获取任务 (阻塞式获取)，BLPOP 按键的顺序取值，控制队列放在前面以免被任务积压延迟
+                task_data = await loop.run_in_executor(None, self.redis.client.blpop, [self.control_key, self.queue_key], 5)
+                # 空闲时也定期写回重复漏洞的命中次数
+                finding_index.maybe_flush()
                 
                 if not task_data:
                     continue
 
                 # 解析原始请求数据
-                _, raw_request = task_data
+                key, raw_request = task_data
+                if key == self.control_key:
+                    self._handle_control(json.loads(raw_request))
+                    continue
                 request = json.loads(raw_request)
                 
                 # 异步启动任务，不等待它完成
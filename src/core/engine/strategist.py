@@ -1,9 +1,13 @@
 import json
+import asyncio
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
 from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
 from src.config.settings import settings
 from src.utils.auditor import auditor
-from src.core.llm.service import create_audited_llm
+from src.core.llm.service import create_audited_llm, create_worker_cascade
+from src.core.engine.stream_parser import IncrementalPacketParser
+from src.utils.endpoint import endpoint_template
 from loguru import logger
 
 class GenericStrategist:
@@ -15,13 +19,16 @@ class GenericStrategist:
             model_name=settings.MODEL_NAME_WORKER,
             api_key=settings.OPENAI_API_KEY,
             api_base=settings.OPENAI_API_BASE,
+            model_setting="MODEL_NAME_WORKER",
+            model_kwargs={"response_format": {"type": "json_object"}}
+        )
+        self.cascade = create_worker_cascade(
+            strong=self.audited_llm,
             model_kwargs={"response_format": {"type": "json_object"}}
         )
 
-    def generate(self, vuln_type: str, system_prompt: str, user_context: dict, request_id: str, project_name: str = "Default") -> dict:
-        """
-        通用生成方法：返回符合 StructuredExecutor 要求的结构化数据包
-        """
+    def _build_prompt(self, system_prompt: str, user_context: dict):
+        """构建 Prompt 模板与输入变量"""
         # 使用普通的字符串拼接，避免在构建阶段使用 f-string 导致花括号转义混乱
         user_content = "### 目标上下文\n"
         user_content += "原始请求: {full_request_json}\n"
@@ -53,17 +60,43 @@ class GenericStrategist:
             "feedback_str": str(feedback) if feedback else "",
             "history_results_json": json.dumps(history_results, ensure_ascii=False) if history_results else "[]"
         }
-        
-        chain = prompt | self.audited_llm.llm
+        return prompt, inputs
+
+    @staticmethod
+    def _endpoint(user_context: dict) -> str:
+        """用于费用统计的接口模板"""
+        full_request = user_context.get("full_request") or {}
+        return endpoint_template(full_request.get("method", "GET"), full_request.get("url") or user_context.get("url", ""))
+
+    @staticmethod
+    def _check_packet(content: str) -> Optional[str]:
+        """级联校验：快速模型的输出必须是包含 test_cases 列表的 JSON"""
+        try:
+            data = json.loads(content)
+        except Exception as e:
+            return f"JSON 解析失败: {e}"
+        if not isinstance(data, dict) or not isinstance(data.get("test_cases"), list):
+            return "缺少 test_cases 列表"
+        return None
+
+    async def agenerate(self, vuln_type: str, system_prompt: str, user_context: dict, request_id: str, project_name: str = "Default", retry_count: int = 0) -> dict:
+        """
+        通用生成方法 (异步)：返回符合 StructuredExecutor 要求的结构化数据包
+        """
+        prompt, inputs = self._build_prompt(system_prompt, user_context)
         
         try:
-            response = self.audited_llm.invoke(
-                chain=chain,
+            # 首轮生成 (无反馈) 优先使用快速模型，输出不可用时自动升级
+            response = await self.cascade.ainvoke(
+                prompt=prompt,
                 inputs=inputs,
                 agent_name=f"{vuln_type}_Strategist",
                 task_id=request_id,
-                prompt_template=prompt,
-                project_name=project_name
+                project_name=project_name,
+                easy=not user_context.get("feedback"),
+                retry_count=retry_count,
+                accept=self._check_packet,
+                endpoint=self._endpoint(user_context)
             )
             
             data = json.loads(response.content)
@@ -79,3 +112,75 @@ class GenericStrategist:
         except Exception as e:
             logger.error(f"[{vuln_type}] 生成 Payload 失败: {e}")
             return {"request": user_context.get("full_request", {}), "test_cases": []}
+
+    async def _stream_events(self, audited_llm, parser: IncrementalPacketParser, prompt: ChatPromptTemplate, inputs: Dict[str, Any], agent_name: str,
+                             request_id: str, project_name: str, retry_count: int = 0, endpoint: Optional[str] = None) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """使用指定模型流式生成并增量解析出事件 (完整输出保留在 parser.buffer 中，供生成结束后校验)"""
+        async for text in audited_llm.astream(
+            chain=prompt | audited_llm.llm,
+            inputs=inputs,
+            agent_name=agent_name,
+            task_id=request_id,
+            prompt_template=prompt,
+            project_name=project_name,
+            retry_count=retry_count,
+            endpoint=endpoint,
+            accept=self._check_packet
+        ):
+            for event in parser.feed(text):
+                yield event
+
+    async def astream_packet(self, vuln_type: str, system_prompt: str, user_context: dict, request_id: str, project_name: str = "Default", retry_count: int = 0) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        流式生成：边接收 LLM 输出边解析，依次产出 ("request", 模板) 与 ("test_case", 用例) 事件，
+        供 StructuredExecutor.execute_stream 在生成完成前即开始探测。
+        快速模型的输出在流结束后按 _check_packet 校验，未通过时升级到强模型重新流式生成：
+        快速模型已产出的用例已在执行中，强模型的用例追加执行 (重复的 request 模板由执行器忽略)。
+        """
+        prompt, inputs = self._build_prompt(system_prompt, user_context)
+        agent_name = f"{vuln_type}_Strategist"
+        tier = self.cascade.route(agent_name, easy=not user_context.get("feedback"), retry_count=retry_count)
+        audited_llm = self.cascade.tier_llm(tier)
+        request_emitted = False
+        case_count = 0
+
+        while True:
+            parser = IncrementalPacketParser()
+            parsed_cases = 0
+            try:
+                async for event_type, value in self._stream_events(audited_llm, parser, prompt, inputs, agent_name, request_id, project_name,
+                                                                   retry_count=retry_count, endpoint=self._endpoint(user_context)):
+                    if event_type == "request":
+                        request_emitted = True
+                    else:
+                        parsed_cases += 1
+                    yield event_type, value
+            except Exception as e:
+                logger.error(f"[{vuln_type}] 流式生成 Payload 失败: {e}")
+            case_count += parsed_cases
+
+            # 生成结束后对完整输出做与非流式路径相同的校验
+            reason = self._check_packet(parser.buffer) if parser.buffer.strip() else "流式输出为空"
+            if reason is None:
+                declared = len(json.loads(parser.buffer)["test_cases"])
+                if parsed_cases < declared:
+                    logger.warning(f"[{vuln_type}] 流式解析出的用例少于模型输出的用例 ({parsed_cases}/{declared})")
+            if tier == "fast" and reason:
+                audited_llm = self.cascade.escalate(agent_name, f"流式输出未通过校验: {reason}")
+                tier = "strong"
+                continue
+            if reason:
+                logger.warning(f"[{vuln_type}] 流式输出未通过校验 (已解析 {parsed_cases} 个用例): {reason}")
+            break
+
+        if not request_emitted:
+            # 兼容性处理：模型未输出 request 时回退到原始请求
+            yield "request", user_context.get("full_request", {})
+
+        logger.info(f"[{vuln_type}] 流式策略生成完成 | 探测点数量: {case_count}")
+
+    def generate(self, vuln_type: str, system_prompt: str, user_context: dict, request_id: str, project_name: str = "Default", retry_count: int = 0) -> dict:
+        """
+        同步包装：仅供没有运行中事件循环的调用方使用，图节点内请使用 agenerate
+        """
+        return asyncio.run(self.agenerate(vuln_type, system_prompt, user_context, request_id, project_name, retry_count))
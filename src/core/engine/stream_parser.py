@@ -0,0 +1,83 @@
+import json
+from typing import Any, Dict, List, Optional, Tuple
+from loguru import logger
+
+class IncrementalPacketParser:
+    """
+    增量 JSON 解析器：从 Strategist 的流式输出中尽早提取结构化数据包的组成部分。
+
+    逐字符扫描已接收的文本，维护括号深度与字符串状态：
+    - 顶层 "request" 对象闭合时产出 ("request", dict)
+    - 顶层 "test_cases" 数组中每个对象闭合时产出 ("test_case", dict)
+    """
+    def __init__(self):
+        self.buffer = ""
+        self._pos = 0
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_string: Optional[str] = None
+        self._current_key: Optional[str] = None
+        self._value_start: Optional[int] = None
+
+    def feed(self, chunk: str) -> List[Tuple[str, Dict[str, Any]]]:
+        """追加新文本，返回本次新产出的事件列表"""
+        self.buffer += chunk
+        events = []
+        buf = self.buffer
+
+        for i in range(self._pos, len(buf)):
+            c = buf[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if len(self._stack) == 1:
+                        self._last_string = buf[self._string_start + 1:i]
+                continue
+
+            if c == '"':
+                self._in_string = True
+                self._string_start = i
+            elif c in "{[":
+                self._stack.append(c)
+                depth = len(self._stack)
+                if depth == 2 and c == "{" and self._current_key == "request":
+                    self._value_start = i
+                elif depth == 3 and c == "{" and self._current_key == "test_cases" and self._stack[1] == "[":
+                    self._value_start = i
+            elif c in "}]":
+                depth = len(self._stack)
+                if self._value_start is not None and c == "}" and (
+                    (depth == 2 and self._current_key == "request") or
+                    (depth == 3 and self._current_key == "test_cases")
+                ):
+                    event_type = "request" if depth == 2 else "test_case"
+                    event = self._decode(buf[self._value_start:i + 1], event_type)
+                    if event is not None:
+                        events.append(event)
+                    self._value_start = None
+                if self._stack:
+                    self._stack.pop()
+            elif c == ":" and len(self._stack) == 1:
+                self._current_key = self._last_string
+            elif c == "," and len(self._stack) == 1:
+                self._current_key = None
+
+        self._pos = len(buf)
+        return events
+
+    @staticmethod
+    def _decode(fragment: str, event_type: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        try:
+            value = json.loads(fragment)
+        except Exception as e:
+            logger.warning(f"增量解析 {event_type} 片段失败: {e} | 片段: {fragment[:100]}")
+            return None
+        if not isinstance(value, dict):
+            return None
+        return event_type, value
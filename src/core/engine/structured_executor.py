@@ -5,8 +5,13 @@ import difflib
 import re
 import urllib.parse
 from loguru import logger
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, AsyncIterator, Tuple
 from src.config.settings import settings
+from src.utils.logger_config import lazy_logger, probe_sampler
+from src.core.engine.executor import record_probe, probe_summary
+from src.utils.tracing import tracer
+from src.utils.concurrency import ResizableSemaphore
+from src.utils.progress import progress
 
 class StructuredExecutor:
     """
@@ -14,10 +19,21 @@ class StructuredExecutor:
     数据包结构参考 AgentState 字典形式。
     """
     def __init__(self, timeout: Optional[float] = None, proxies: Optional[str] = None, max_concurrency: Optional[int] = None):
-        self.timeout = timeout or settings.SCAN_TIMEOUT
+        self._timeout = timeout
         self.proxies = proxies or settings.SCAN_PROXY
-        self.max_concurrency = max_concurrency or settings.SCAN_MAX_CONCURRENCY
-        self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        # 未显式指定时跟随 SCAN_MAX_CONCURRENCY，运行中修改配置后在下一次获取 / 释放时生效
+        self.semaphore = ResizableSemaphore(max_concurrency or (lambda: settings.SCAN_MAX_CONCURRENCY))
+        # 空闲的并发槽编号，作为探测日志的 worker 上下文 (按需分配，上限调大时自动增加)
+        self._free_slots: List[int] = []
+        self._slot_count = 0
+
+    @property
+    def timeout(self) -> float:
+        return self._timeout or settings.SCAN_TIMEOUT
+
+    @property
+    def max_concurrency(self) -> int:
+        return self.semaphore.limit
 
     async def execute_structured(self, 
                                  structured_packet: Dict[str, Any], 
@@ -34,85 +50,167 @@ class StructuredExecutor:
             logger.warning("结构化执行器收到空的测试用例列表")
             return []
 
-        method = request_template.get("method", "GET").upper()
-        target_url_template = request_template.get("target_url", "")
-        headers_template = request_template.get("headers", {})
-        body_template = request_template.get("body")
-
-        # 1. 预处理：提取所有合法的 {{}} 占位符并过滤测试用例
-        # 只从 request_template 中提取占位符，确保测试点确实存在于请求模板中
-        placeholders = re.findall(r'\{\{(.*?)\}\}', json.dumps(request_template))
-        valid_placeholders = {f"{{{{{val}}}}}" for val in placeholders}
-        placeholder_map = {f"{{{{{val}}}}}": val for val in placeholders}
-
-        filtered_test_cases = []
-        for test in test_cases:
-            param_placeholder = test.get("parameter")
-            if param_placeholder and param_placeholder in valid_placeholders:
-                filtered_test_cases.append(test)
-            else:
-                logger.warning(f"跳过无效或未定义的占位符: {param_placeholder}")
+        template = self._prepare_template(request_template)
 
+        # 只保留占位符确实存在于请求模板中的测试用例
+        filtered_test_cases = [test for test in test_cases if self._is_valid_case(test, template)]
         if not filtered_test_cases:
             logger.warning("没有合法的测试用例可执行")
             return []
 
-        # 2. 预处理 Headers，移除长度相关的头
-        clean_headers_template = headers_template.copy()
-        for h in list(clean_headers_template.keys()):
-            if h.lower() in ["content-length", "transfer-encoding"]:
-                del clean_headers_template[h]
-
         tasks = []
         async with httpx.AsyncClient(verify=False, proxy=self.proxies) as client:
             for test in filtered_test_cases:
-                param_placeholder = test.get("parameter")
-                payloads = test.get("payload", [])
-                
-                if not isinstance(payloads, list):
-                    payloads = [payloads]
-
-                for payload in payloads:
-                    # 1. 构造当前请求的具体数据
-                    # 将当前正在测试的占位符替换为 payload，将其他所有占位符还原为原始值
-                    
-                    current_url = target_url_template
-                    current_headers = clean_headers_template.copy()
-                    current_body = body_template
-
-                    # 替换 URL
-                    current_url = self._replace_logic(current_url, param_placeholder, payload, placeholder_map, is_url=True)
-                    
-                    # 替换 Headers (Headers 通常不需要 URL 编码)
-                    for k, v in current_headers.items():
-                        if isinstance(v, str):
-                            current_headers[k] = self._replace_logic(v, param_placeholder, payload, placeholder_map, is_url=False)
-                    
-                    # 替换 Body
-                    if current_body:
-                        content_type = clean_headers_template.get("Content-Type", "").lower()
-                        is_form = "application/x-www-form-urlencoded" in content_type
-                        # 只有是 application/x-www-form-urlencoded 时才进行 URL 编码，其他（JSON, XML, Plain 等）一律不编码
-                        current_body = self._replace_logic(current_body, param_placeholder, payload, placeholder_map, is_url=is_form)
-
-                    tasks.append(self._execute_with_semaphore(
-                        client, method, current_url, current_headers, current_body, 
-                        param_placeholder, payload, original_response
-                    ))
+                tasks.extend(self._build_case_tasks(client, template, test, original_response))
 
             # 并发执行所有请求
-            results = await asyncio.gather(*tasks)
+            progress.incr("probes_total", len(tasks))
+            with tracer.span("executor.structured", concurrency=self.max_concurrency) as span:
+                results = await asyncio.gather(*tasks)
+                span.set(**probe_summary(results))
             
         return results
 
+    async def execute_stream(self,
+                             packet_stream: AsyncIterator[Tuple[str, Dict[str, Any]]],
+                             original_response: Optional[str] = None) -> List[Dict]:
+        """
+        以异步流的方式消费 Strategist 的输出：收到 request 模板后，每个 test_case 一到达即开始探测，
+        使网络探测与 LLM 生成重叠执行。
+        :param packet_stream: 产出 ("request", dict) / ("test_case", dict) 事件的异步迭代器。
+        """
+        template = None
+        pending_cases: List[Dict] = []
+        futures = []
+
+        # Span 覆盖整个流式阶段 (探测与 LLM 生成重叠)
+        with tracer.span("executor.stream", concurrency=self.max_concurrency) as span:
+            async with httpx.AsyncClient(verify=False, proxy=self.proxies) as client:
+                def schedule(test: Dict):
+                    if self._is_valid_case(test, template):
+                        case_tasks = self._build_case_tasks(client, template, test, original_response)
+                        progress.incr("probes_total", len(case_tasks))
+                        for coro in case_tasks:
+                            futures.append(asyncio.ensure_future(coro))
+
+                try:
+                    async for event_type, value in packet_stream:
+                        if event_type == "request":
+                            if template is not None:
+                                continue
+                            template = self._prepare_template(value)
+                            # 模板到达前收到的用例先缓存，此时统一调度
+                            for test in pending_cases:
+                                schedule(test)
+                            pending_cases = []
+                        elif template is None:
+                            pending_cases.append(value)
+                        else:
+                            schedule(value)
+
+                    if not futures:
+                        logger.warning("流式执行没有合法的测试用例可执行")
+                        return []
+
+                    results = await asyncio.gather(*futures)
+                    span.set(**probe_summary(results))
+                finally:
+                    # 生成中途出错或被取消时，在关闭 client 之前取消并回收已启动的探测
+                    for future in futures:
+                        if not future.done():
+                            future.cancel()
+                    if futures:
+                        await asyncio.gather(*futures, return_exceptions=True)
+
+        return results
+
+    def _prepare_template(self, request_template: Dict[str, Any]) -> Dict[str, Any]:
+        """预处理请求模板：提取 {{}} 占位符并清理长度相关的请求头"""
+        # 只从 request_template 中提取占位符，确保测试点确实存在于请求模板中
+        placeholders = re.findall(r'\{\{(.*?)\}\}', json.dumps(request_template))
+
+        # 预处理 Headers，移除长度相关的头
+        clean_headers_template = dict(request_template.get("headers") or {})
+        for h in list(clean_headers_template.keys()):
+            if h.lower() in ["content-length", "transfer-encoding"]:
+                del clean_headers_template[h]
+
+        return {
+            "method": request_template.get("method", "GET").upper(),
+            "target_url": request_template.get("target_url", ""),
+            "headers": clean_headers_template,
+            "body": request_template.get("body"),
+            "valid_placeholders": {f"{{{{{val}}}}}" for val in placeholders},
+            "placeholder_map": {f"{{{{{val}}}}}": val for val in placeholders}
+        }
+
+    @staticmethod
+    def _is_valid_case(test: Dict[str, Any], template: Dict[str, Any]) -> bool:
+        param_placeholder = test.get("parameter")
+        if param_placeholder and param_placeholder in template["valid_placeholders"]:
+            return True
+        logger.warning(f"跳过无效或未定义的占位符: {param_placeholder}")
+        return False
+
+    def _build_case_tasks(self, client, template: Dict[str, Any], test: Dict[str, Any], original_response: Optional[str]) -> List:
+        """为单个测试用例的每个 Payload 构造探测协程"""
+        param_placeholder = test.get("parameter")
+        payloads = test.get("payload", [])
+        placeholder_map = template["placeholder_map"]
+        
+        if not isinstance(payloads, list):
+            payloads = [payloads]
+
+        tasks = []
+        for payload in payloads:
+            # 1. 构造当前请求的具体数据
+            # 将当前正在测试的占位符替换为 payload，将其他所有占位符还原为原始值
+            current_headers = template["headers"].copy()
+            current_body = template["body"]
+
+            # 替换 URL
+            current_url = self._replace_logic(template["target_url"], param_placeholder, payload, placeholder_map, is_url=True)
+            
+            # 替换 Headers (Headers 通常不需要 URL 编码)
+            for k, v in current_headers.items():
+                if isinstance(v, str):
+                    current_headers[k] = self._replace_logic(v, param_placeholder, payload, placeholder_map, is_url=False)
+            
+            # 替换 Body
+            if current_body:
+                content_type = template["headers"].get("Content-Type", "").lower()
+                is_form = "application/x-www-form-urlencoded" in content_type
+                # 只有是 application/x-www-form-urlencoded 时才进行 URL 编码，其他（JSON, XML, Plain 等）一律不编码
+                current_body = self._replace_logic(current_body, param_placeholder, payload, placeholder_map, is_url=is_form)
+
+            tasks.append(self._execute_with_semaphore(
+                client, template["method"], current_url, current_headers, current_body, 
+                param_placeholder, payload, original_response
+            ))
+        return tasks
+
     async def _execute_with_semaphore(self, *args, **kwargs):
-        """带并发控制的执行包装器"""
+        """带并发控制的执行包装器 (占用一个并发槽，槽内所有日志带上 worker 编号)"""
         async with self.semaphore:
-            return await self._execute_single(*args, **kwargs)
+            if self._free_slots:
+                slot = self._free_slots.pop()
+            else:
+                slot = self._slot_count
+                self._slot_count += 1
+            try:
+                with logger.contextualize(worker=slot):
+                    return await self._execute_single(*args, **kwargs)
+            finally:
+                self._free_slots.append(slot)
 
     async def _execute_single(self, client, method, url, headers, body, param_name, payload, original_response=None) -> Dict:
         """执行单个异步请求"""
-        logger.debug(f"发送结构化探测 | 方法: {method} | URL: {url} | Body: {body[:200] if body else 'None'} | Headers: {headers} | 参数点: {param_name} | Payload: {payload}")
+        # 惰性格式化：DEBUG 未启用或未被采样时不构造 Headers / Body 字符串
+        if probe_sampler.sample():
+            lazy_logger.debug("发送结构化探测 | {}", lambda: (
+                f"方法: {method} | URL: {url} | Body: {body[:200] if body else 'None'} | "
+                f"Headers: {headers} | 参数点: {param_name} | Payload: {payload}"
+            ))
         try:
             # 根据 body 类型决定发送方式
             # 注意：对于 Fuzz 场景，我们使用 content 而不是 json/data，以防止 httpx 自动对 payload 进行 urlencode
@@ -142,6 +240,7 @@ class StructuredExecutor:
                 matcher = difflib.SequenceMatcher(None, orig_snippet, resp_snippet)
                 diff_stats["similarity"] = round(matcher.quick_ratio(), 4)
 
+            record_probe(url, str(resp.status_code), resp.elapsed.total_seconds())
             return {
                 "parameter": param_name,
                 "payload": payload,
@@ -152,6 +251,7 @@ class StructuredExecutor:
             }
         except httpx.ReadTimeout:
             logger.warning(f"结构化请求超时 | 参数点: {param_name} | Payload: {payload}")
+            record_probe(url, "timeout", float(self.timeout))
             return {
                 "parameter": param_name,
                 "payload": payload,
@@ -163,6 +263,7 @@ class StructuredExecutor:
             }
         except Exception as e:
             logger.exception(f"结构化请求失败 ({param_name}): {e}")
+            record_probe(url, "error", 0.0)
             return {
                 "parameter": param_name, "payload": payload,
                 "response": f"Error: {str(e)}", "status": 0, "elapsed": 0.0,
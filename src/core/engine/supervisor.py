@@ -0,0 +1,184 @@
+"""
+组件监管进程：独立于 API 运行，持有 mitmproxy 与 TaskRunner 子进程，并负责数据库后台维护。
+1. API (可运行多个 uvicorn worker) 通过 Redis 命令队列 webagent:supervisor:commands 下发 start / stop 等命令，
+   需要结果的命令通过一次性回复队列返回
+2. 每隔 SUPERVISOR_HEARTBEAT 秒将组件状态写入 webagent:supervisor:status (带过期时间)，
+   API 的 /status 直接读取，无需与监管进程往返
+3. 组件处于期望运行状态但意外退出时自动重启
+
+启动方式: python -m src.core.engine.supervisor (main.py 会自动启动)
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import signal
+from typing import Any, Dict, Optional
+import redis
+from loguru import logger
+from src.config.settings import settings
+
+COMMAND_KEY = "webagent:supervisor:commands"
+STATUS_KEY = "webagent:supervisor:status"
+REPLY_PREFIX = "webagent:supervisor:reply:"
+
+class SupervisorUnavailable(RuntimeError):
+    """监管进程未运行或未在超时时间内响应"""
+
+class Supervisor:
+    RESTART_INTERVAL = 5.0
+
+    def __init__(self):
+        from src.core.engine.manager import ScannerManager
+        from src.utils.maintenance import maintenance_worker
+        self.manager = ScannerManager()
+        self.maintenance = maintenance_worker
+        self.client = redis.from_url(settings.REDIS_URL, decode_responses=True)
+        # 期望运行的组件，意外退出时据此自动重启
+        self.desired = {"mitmproxy": False, "runner": False}
+        self._next_restart: Dict[str, float] = {}
+        self._running = True
+
+    def handle(self, command: Dict[str, Any]) -> Dict[str, Any]:
+        action = command.get("action")
+        if action == "start":
+            self.manager.start_components()
+            self.desired = {"mitmproxy": True, "runner": True}
+        elif action == "stop":
+            self.desired = {"mitmproxy": False, "runner": False}
+            self.manager.stop_all()
+        elif action == "wake_maintenance":
+            self.maintenance.wake()
+        elif action != "status":
+            return {"error": f"未知命令: {action}"}
+        return {"components": self.manager.get_status()}
+
+    def _check_children(self):
+        """期望运行但已退出的组件按 RESTART_INTERVAL 限速重启"""
+        status = self.manager.get_status()
+        starters = {"mitmproxy": self.manager.start_mitmproxy, "runner": self.manager.start_task_runner}
+        for name, wanted in self.desired.items():
+            if not wanted or status.get(name) == "running":
+                continue
+            now = time.monotonic()
+            if now < self._next_restart.get(name, 0):
+                continue
+            self._next_restart[name] = now + self.RESTART_INTERVAL
+            logger.warning(f"组件 {name} 意外退出，正在重启")
+            starters[name]()
+
+    def _publish_status(self):
+        ttl = max(int(settings.SUPERVISOR_HEARTBEAT * 3), 2)
+        pipe = self.client.pipeline(transaction=False)
+        pipe.hset(STATUS_KEY, mapping={
+            "pid": os.getpid(),
+            "updated": time.time(),
+            "components": json.dumps(self.manager.get_status()),
+        })
+        pipe.expire(STATUS_KEY, ttl)
+        pipe.execute()
+
+    def _reply(self, command: Dict[str, Any], result: Dict[str, Any]):
+        if not command.get("id"):
+            return
+        key = REPLY_PREFIX + command["id"]
+        pipe = self.client.pipeline(transaction=False)
+        pipe.rpush(key, json.dumps(result, ensure_ascii=False))
+        pipe.expire(key, 60)
+        pipe.execute()
+
+    def run(self):
+        logger.info(f"组件监管进程已启动 (PID: {os.getpid()})")
+        self.maintenance.start()
+        # 上一个监管进程遗留的命令不再执行
+        self.client.delete(COMMAND_KEY)
+        while self._running:
+            try:
+                self._publish_status()
+                item = self.client.blpop(COMMAND_KEY, timeout=max(1, int(settings.SUPERVISOR_HEARTBEAT)))
+                if item:
+                    command = json.loads(item[1])
+                    logger.info(f"收到监管命令: {command.get('action')}")
+                    try:
+                        result = self.handle(command)
+                    except Exception as e:
+                        logger.exception(f"执行监管命令失败: {e}")
+                        result = {"error": str(e)}
+                    self._reply(command, result)
+                    self._publish_status()
+                self._check_children()
+            except redis.RedisError as e:
+                logger.error(f"监管进程 Redis 连接异常: {e}")
+                time.sleep(1)
+
+    def shutdown(self):
+        self._running = False
+        self.manager.stop_all()
+        self.maintenance.stop()
+        try:
+            self.client.delete(STATUS_KEY)
+        except redis.RedisError:
+            pass
+
+class SupervisorClient:
+    """API 进程使用的监管客户端 (同步阻塞，路由中通过 asyncio.to_thread 调用)"""
+    def __init__(self):
+        self.client = redis.from_url(settings.REDIS_URL, decode_responses=True)
+
+    def request(self, action: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """发送命令并等待结果"""
+        if not self.online():
+            raise SupervisorUnavailable("组件监管进程未运行")
+        command_id = uuid.uuid4().hex
+        self.client.rpush(COMMAND_KEY, json.dumps({"id": command_id, "action": action, "requested_at": time.time()}))
+        reply = self.client.blpop(REPLY_PREFIX + command_id, timeout=timeout or settings.SUPERVISOR_REQUEST_TIMEOUT)
+        if reply is None:
+            raise SupervisorUnavailable(f"组件监管进程未在超时时间内响应命令: {action}")
+        result = json.loads(reply[1])
+        if "error" in result:
+            raise RuntimeError(result["error"])
+        return result
+
+    def send(self, action: str):
+        """发送无需等待结果的命令"""
+        self.client.rpush(COMMAND_KEY, json.dumps({"action": action, "requested_at": time.time()}))
+
+    def online(self) -> bool:
+        return bool(self.client.exists(STATUS_KEY))
+
+    def status(self) -> Dict[str, Any]:
+        """读取监管进程定期写入的组件状态"""
+        raw = self.client.hgetall(STATUS_KEY)
+        if not raw:
+            return {"supervisor": "offline", "components": {"mitmproxy": "unknown", "runner": "unknown"}}
+        return {
+            "supervisor": "online",
+            "pid": int(raw.get("pid") or 0),
+            "updated": float(raw.get("updated") or 0),
+            "components": json.loads(raw.get("components") or "{}"),
+        }
+
+supervisor_client = SupervisorClient()
+
+def main():
+    from src.utils.logger_config import setup_logging
+    from src.utils.metrics import metrics
+    from src.utils.runtime_config import runtime_config
+    setup_logging(component="supervisor")
+    metrics.start_exporter("supervisor")
+    runtime_config.start("supervisor")
+
+    supervisor = Supervisor()
+    # 将 terminate() 发送的 SIGTERM 转换为正常退出，以便停止子进程
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        supervisor.run()
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    finally:
+        supervisor.shutdown()
+        logger.info("组件监管进程已退出")
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,9 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../.
 
 from mitmproxy import http
 from src.core.interceptor.handler import InterceptorHandler
+from src.utils.metrics import metrics
+from src.utils.runtime_config import runtime_config
+from src.config.settings import settings
 from loguru import logger
 
 def setup_logging():
@@ -38,7 +41,13 @@ class InterceptorAddon:
     
     def __init__(self):
         setup_logging()
+        metrics.start_exporter("interceptor")
         self.handler = InterceptorHandler()
+        # 白名单等配置由 API 发布，处理流量时直接读取 settings，更新后立即生效
+        runtime_config.add_listener(
+            lambda _: logger.info(f"拦截器白名单已更新: {settings.TARGET_WHITELIST}"), keys={"TARGET_WHITELIST"}
+        )
+        runtime_config.start("interceptor")
         logger.info("Mitmproxy 拦截器插件已加载")
 
     def response(self, flow: http.HTTPFlow):
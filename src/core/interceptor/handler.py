@@ -2,8 +2,12 @@ import hashlib
 from mitmproxy import http
 from src.config.settings import settings
 from src.utils.redis_helper import redis_helper
+from src.utils.metrics import metrics
 from loguru import logger
 
+FLOWS = metrics.counter("aegisx_flows_total", "拦截器收到的流量 (按处理结果)", ["result"])
+TASKS_QUEUED = metrics.counter("aegisx_tasks_queued_total", "推送到任务队列的扫描任务", ["project"])
+
 class InterceptorHandler:
     """流量处理核心逻辑"""
 
@@ -38,19 +42,21 @@ class InterceptorHandler:
         
         # 1. 白名单过滤
         if not self.is_in_whitelist(host):
-
+            FLOWS.inc(result="ignored")
             return
 
         logger.debug(f"正在处理白名单请求: {host}")
 
         # 2. 静态资源过滤 (简单扩展名过滤)
         if any(flow.request.path.endswith(ext) for ext in ['.js', '.css', '.png', '.jpg', '.gif', '.svg', '.woff','.woff2','.ico']):
+            FLOWS.inc(result="static")
             return
 
         # 3. 计算指纹并去重
         fingerprint = self.calculate_fingerprint(flow)
         if redis_helper.is_duplicate(fingerprint):
             logger.debug(f"跳过重复请求: {flow.request.pretty_url}")
+            FLOWS.inc(result="duplicate")
             return
 
         # 4. 获取当前活跃项目名称 (从 Redis 中动态获取)
@@ -71,5 +77,7 @@ class InterceptorHandler:
         # 6. 持久化指纹并推送任务
         redis_helper.add_fingerprint(fingerprint)
         redis_helper.push_task(task_data)
+        FLOWS.inc(result="queued")
+        TASKS_QUEUED.inc(project=project_name)
         
         logger.info(f"已捕获并推送新任务 [{project_name}]: [{flow.request.method}] {flow.request.pretty_url}")
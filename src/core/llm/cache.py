@@ -0,0 +1,144 @@
+import json
+import time
+import hashlib
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+from loguru import logger
+from src.config.settings import settings
+from src.utils.db_pool import SQLitePool
+
+class LLMResponseCache:
+    """
+    基于 SQLite 的 LLM 响应缓存：
+    1. Key = 模型 + 调用参数 + 完整格式化 Prompt 的哈希
+    2. 支持按 Agent 配置启用/TTL (LLM_CACHE_AGENT_POLICY)
+    3. 超过最大条目数时按最近访问时间淘汰
+    """
+    def __init__(self, db_path: str = None, max_entries: Optional[int] = None):
+        if db_path is None:
+            base_dir = Path(__file__).resolve().parent.parent.parent.parent
+            self.db_path = base_dir / "data" / "llm_cache.db"
+        else:
+            self.db_path = Path(db_path)
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries or settings.LLM_CACHE_MAX_ENTRIES
+        self.stats: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+        self.pool = SQLitePool(self.db_path, size=2, timeout=settings.DB_BUSY_TIMEOUT)
+        self._init_db()
+
+    def _get_connection(self):
+        return self.pool.connection()
+
+    def _init_db(self):
+        try:
+            with self._get_connection() as conn:
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS llm_cache (
+                        cache_key TEXT PRIMARY KEY,
+                        agent_name TEXT,
+                        model TEXT,
+                        response TEXT NOT NULL,
+                        created_at REAL NOT NULL,
+                        expires_at REAL NOT NULL,
+                        last_access REAL NOT NULL,
+                        hit_count INTEGER DEFAULT 0
+                    )
+                ''')
+                conn.execute('CREATE INDEX IF NOT EXISTS idx_llm_cache_last_access ON llm_cache (last_access)')
+                conn.commit()
+        except Exception as e:
+            logger.error(f"LLM 缓存初始化失败: {e}")
+
+    @staticmethod
+    def make_key(model: str, llm_kwargs: Dict[str, Any], prompt_str: str) -> str:
+        """根据模型、调用参数以及格式化后的 Prompt 计算缓存 Key"""
+        prompt_hash = hashlib.sha256(prompt_str.encode("utf-8")).hexdigest()
+        kwargs_str = json.dumps(llm_kwargs, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(f"{model}|{kwargs_str}|{prompt_hash}".encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _parse_policy(raw: str) -> Dict[str, int]:
+        policy = {}
+        for item in (raw or "").split(","):
+            if ":" not in item:
+                continue
+            name, ttl = item.rsplit(":", 1)
+            try:
+                policy[name.strip()] = int(ttl.strip())
+            except ValueError:
+                logger.warning(f"忽略无效的缓存策略配置: {item}")
+        return policy
+
+    def ttl_for(self, agent_name: str) -> int:
+        """返回指定 Agent 的缓存 TTL，0 表示不缓存"""
+        if not settings.LLM_CACHE_ENABLED:
+            return 0
+        policy = self._parse_policy(settings.LLM_CACHE_AGENT_POLICY)
+        return max(policy.get(agent_name, settings.LLM_CACHE_TTL), 0)
+
+    def _count(self, agent_name: str, field: str):
+        with self._lock:
+            agent_stats = self.stats.setdefault(agent_name, {"hits": 0, "misses": 0})
+            agent_stats[field] += 1
+
+    def get(self, key: str, agent_name: str) -> Optional[str]:
+        """读取缓存，命中时刷新访问时间"""
+        now = time.time()
+        try:
+            with self._get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    'SELECT response FROM llm_cache WHERE cache_key = ? AND expires_at > ?',
+                    (key, now)
+                )
+                row = cursor.fetchone()
+                if row:
+                    cursor.execute(
+                        'UPDATE llm_cache SET last_access = ?, hit_count = hit_count + 1 WHERE cache_key = ?',
+                        (now, key)
+                    )
+                    conn.commit()
+        except Exception as e:
+            logger.error(f"读取 LLM 缓存失败: {e}")
+            row = None
+
+        self._count(agent_name, "hits" if row else "misses")
+        return row[0] if row else None
+
+    def set(self, key: str, agent_name: str, model: str, response: str, ttl: int):
+        """写入缓存并执行容量淘汰"""
+        now = time.time()
+        try:
+            with self._get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    INSERT OR REPLACE INTO llm_cache (
+                        cache_key, agent_name, model, response, created_at, expires_at, last_access
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', (key, agent_name, model, response, now, now + ttl, now))
+                self._evict(cursor, now)
+                conn.commit()
+        except Exception as e:
+            logger.error(f"写入 LLM 缓存失败: {e}")
+
+    def _evict(self, cursor, now: float):
+        """清理过期条目，并按最近访问时间淘汰超出容量的条目"""
+        cursor.execute('DELETE FROM llm_cache WHERE expires_at <= ?', (now,))
+        cursor.execute('SELECT COUNT(*) FROM llm_cache')
+        overflow = cursor.fetchone()[0] - self.max_entries
+        if overflow > 0:
+            cursor.execute('''
+                DELETE FROM llm_cache WHERE cache_key IN (
+                    SELECT cache_key FROM llm_cache ORDER BY last_access ASC LIMIT ?
+                )
+            ''', (overflow,))
+
+    def clear(self):
+        with self._get_connection() as conn:
+            conn.execute('DELETE FROM llm_cache')
+            conn.commit()
+
+llm_cache = LLMResponseCache()
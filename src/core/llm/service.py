@@ -1,16 +1,46 @@
 import json
-from typing import Any, Dict, Optional, Union
+import asyncio
+import time
+import weakref
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Set, Tuple, Union
+from langchain_core.messages import AIMessage, get_buffer_string
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_openai import ChatOpenAI
+from src.config.settings import settings
 from src.utils.auditor import auditor
+from src.core.llm.cache import llm_cache
+from src.utils.metrics import metrics
+from src.utils.tracing import tracer
+from src.utils.progress import progress
+from src.utils.runtime_config import runtime_config
 from loguru import logger
 
+LLM_CALLS = metrics.counter("aegisx_llm_calls_total", "LLM 调用次数 (cache=hit 表示命中响应缓存)", ["agent", "model", "cache"])
+LLM_TOKENS = metrics.counter("aegisx_llm_tokens_total", "LLM Token 用量", ["agent", "model", "kind"])
+LLM_SECONDS = metrics.histogram("aegisx_llm_latency_seconds", "LLM 调用耗时 (含缓存查找)", ["agent", "model"])
+
+# 运行时修改后需要重建模型实例的配置项
+MODEL_SETTINGS = {"MODEL_NAME_MANAGER", "MODEL_NAME_WORKER", "MODEL_NAME_WORKER_FAST", "OPENAI_API_KEY", "OPENAI_API_BASE"}
+
 class AuditedLLM:
     """
-    包装 LLM 调用，底层自动集成审计日志记录
+    包装 LLM 调用，底层自动集成审计日志记录与响应缓存
     """
-    def __init__(self, llm: ChatOpenAI):
+    def __init__(self, llm: ChatOpenAI, model_setting: Optional[str] = None, llm_kwargs: Optional[Dict[str, Any]] = None):
         self.llm = llm
+        # 模型名对应的配置项，配置变化时据此重建底层模型 (见 apply_model_settings)
+        self.model_setting = model_setting
+        self.llm_kwargs = llm_kwargs or {}
+        if model_setting:
+            _bound_llms.add(self)
+
+    def rebind(self):
+        """按当前配置重建底层模型：每次调用都从 self.llm 构建 chain，进行中的调用继续使用旧实例"""
+        model_name = getattr(settings, self.model_setting)
+        if not model_name:
+            return
+        self.llm = _chat_model(model_name, self.llm_kwargs)
+        logger.info(f"模型已切换: {self.model_setting} -> {model_name}")
 
     def _format_prompt(self, prompt: ChatPromptTemplate, inputs: Dict[str, Any]) -> str:
         """尝试格式化提示词用于日志记录"""
@@ -20,58 +50,368 @@ class AuditedLLM:
             logger.debug(f"格式化审计提示词失败: {e}")
             return str(inputs)
 
-    def invoke(self, 
-               chain: Any, 
-               inputs: Dict[str, Any], 
-               agent_name: str, 
-               task_id: str, 
-               prompt_template: Optional[ChatPromptTemplate] = None,
-               project_name: str = "Default") -> Any:
+    def _prepare_prompt(self, prompt: Optional[ChatPromptTemplate], inputs: Dict[str, Any]) -> Tuple[str, Optional[List[Tuple[bool, str]]]]:
         """
-        同步调用并记录日志
+        格式化 Prompt，并按消息拆分为 (是否可复用, 文本) 片段用于去重存储：
+        不含输入变量的长消息 (如系统提示词) 视为可复用模板片段。
+        无法拆分时片段为 None，退化为整体存储。
+        """
+        if not prompt:
+            return str(inputs), None
+        try:
+            messages = prompt.format_messages(**inputs)
+        except Exception:
+            return self._format_prompt(prompt, inputs), None
+
+        prompt_str = get_buffer_string(messages)
+        if len(messages) != len(prompt.messages):
+            return prompt_str, None
+        segments = []
+        for i, (template, message) in enumerate(zip(prompt.messages, messages)):
+            text = get_buffer_string([message]) + ("\n" if i < len(messages) - 1 else "")
+            static = not getattr(template, "input_variables", None)
+            segments.append((static and len(text) >= settings.PROMPT_SEGMENT_MIN_CHARS, text))
+        if "".join(text for _, text in segments) != prompt_str:
+            return prompt_str, None
+        return prompt_str, segments
+
+    def _llm_kwargs(self) -> Dict[str, Any]:
+        """参与缓存 Key 计算的模型调用参数"""
+        return {
+            "temperature": getattr(self.llm, "temperature", None),
+            "model_kwargs": getattr(self.llm, "model_kwargs", None) or {}
+        }
+
+    def _cache_lookup(self, prompt_str: str, agent_name: str, use_cache: bool, retry_count: int = 0,
+                      accept: Optional[Callable[[str], Optional[str]]] = None) -> Tuple[Optional[str], Optional[str], int]:
+        """
+        返回 (缓存 Key, 命中的响应内容, TTL)，TTL 为 0 表示不使用缓存。
+        重试轮次不读写缓存 (重试正是因为上一轮结果不理想)；命中的内容未通过 accept 校验时视为未命中。
+        缓存读写涉及 SQLite I/O，异步调用路径须通过 asyncio.to_thread 调用本方法与 _cache_store。
         """
-        response = chain.invoke(inputs)
-        
-        # 记录审计
-        prompt_str = self._format_prompt(prompt_template, inputs) if prompt_template else str(inputs)
+        ttl = llm_cache.ttl_for(agent_name) if use_cache and retry_count == 0 else 0
+        if not ttl:
+            return None, None, 0
+        key = llm_cache.make_key(self.llm.model_name, self._llm_kwargs(), prompt_str)
+        cached = llm_cache.get(key, agent_name)
+        if cached is not None and accept is not None and accept(cached):
+            cached = None
+        return key, cached, ttl
+
+    def _cache_store(self, key: Optional[str], agent_name: str, content: str, ttl: int,
+                     accept: Optional[Callable[[str], Optional[str]]] = None):
+        """只缓存通过校验的输出，避免无法解析或被拒绝的结果被重复回放"""
+        if not key:
+            return
+        if accept is not None and accept(content):
+            return
+        llm_cache.set(key, agent_name, self.llm.model_name, content, ttl)
+
+    @staticmethod
+    def _extract_usage(message: Any) -> Dict[str, int]:
+        """从模型响应中提取 Token 用量"""
+        usage = getattr(message, "usage_metadata", None)
+        if usage:
+            return {"prompt_tokens": usage.get("input_tokens", 0), "completion_tokens": usage.get("output_tokens", 0)}
+        token_usage = (getattr(message, "response_metadata", None) or {}).get("token_usage") or {}
+        return {"prompt_tokens": token_usage.get("prompt_tokens", 0), "completion_tokens": token_usage.get("completion_tokens", 0)}
+
+    def _record(self, agent_name: str, task_id: str, prompt_str: str, response: Any, project_name: str, cache_hit: bool,
+                usage: Optional[Dict[str, int]] = None, started: float = 0.0, retry_count: int = 0, endpoint: Optional[str] = None,
+                prompt_segments: Optional[List[Tuple[bool, str]]] = None):
+        usage = usage or {"prompt_tokens": 0, "completion_tokens": 0}
+        model = self.llm.model_name
+        latency = time.perf_counter() - started if started else 0.0
+        LLM_CALLS.inc(agent=agent_name, model=model, cache="hit" if cache_hit else "miss")
+        LLM_TOKENS.inc(usage["prompt_tokens"] or 0, agent=agent_name, model=model, kind="prompt")
+        LLM_TOKENS.inc(usage["completion_tokens"] or 0, agent=agent_name, model=model, kind="completion")
+        LLM_SECONDS.observe(latency, agent=agent_name, model=model)
+        progress.incr("llm_calls")
+        if started:
+            tracer.record(f"llm.{agent_name}", started, model=model, cache_hit=cache_hit, retry_count=retry_count,
+                          prompt_tokens=usage["prompt_tokens"] or 0, completion_tokens=usage["completion_tokens"] or 0)
         auditor.record(
             agent_name=agent_name,
             task_id=task_id,
             prompt=prompt_str,
             response=response.content if hasattr(response, 'content') else str(response),
-            project_name=project_name
+            project_name=project_name,
+            cache_hit=cache_hit,
+            prompt_segments=prompt_segments,
+            usage={
+                "model": model,
+                "prompt_tokens": usage["prompt_tokens"],
+                "completion_tokens": usage["completion_tokens"],
+                "latency_ms": round(latency * 1000, 2),
+                "retry_count": retry_count,
+                "cost": 0.0 if cache_hit else estimate_cost(model, usage["prompt_tokens"], usage["completion_tokens"]),
+                "endpoint": endpoint
+            }
         )
+
+    def invoke(self,
+               chain: Any,
+               inputs: Dict[str, Any],
+               agent_name: str,
+               task_id: str,
+               prompt_template: Optional[ChatPromptTemplate] = None,
+               project_name: str = "Default",
+               use_cache: bool = True,
+               retry_count: int = 0,
+               endpoint: Optional[str] = None,
+               accept: Optional[Callable[[str], Optional[str]]] = None) -> Any:
+        """
+        同步调用并记录日志
+        :param accept: 输出校验函数 (返回 None 表示接受)，只有通过校验的输出才会写入缓存
+        """
+        started = time.perf_counter()
+        prompt_str, segments = self._prepare_prompt(prompt_template, inputs)
+        key, cached, ttl = self._cache_lookup(prompt_str, agent_name, use_cache, retry_count, accept)
+        if cached is not None:
+            response = AIMessage(content=cached)
+        else:
+            response = chain.invoke(inputs)
+            self._cache_store(key, agent_name, response.content, ttl, accept)
+
+        # 记录审计 (含 Token、耗时与费用统计)
+        self._record(agent_name, task_id, prompt_str, response, project_name, cache_hit=cached is not None,
+                     usage=None if cached is not None else self._extract_usage(response),
+                     started=started, retry_count=retry_count, endpoint=endpoint,
+                     prompt_segments=segments)
         return response
 
-    async def ainvoke(self, 
-                      chain: Any, 
-                      inputs: Dict[str, Any], 
-                      agent_name: str, 
-                      task_id: str, 
+    async def ainvoke(self,
+                      chain: Any,
+                      inputs: Dict[str, Any],
+                      agent_name: str,
+                      task_id: str,
                       prompt_template: Optional[ChatPromptTemplate] = None,
-                      project_name: str = "Default") -> Any:
+                      project_name: str = "Default",
+                      use_cache: bool = True,
+                      retry_count: int = 0,
+                      endpoint: Optional[str] = None,
+                      accept: Optional[Callable[[str], Optional[str]]] = None) -> Any:
         """
         异步调用并记录日志
+        :param accept: 输出校验函数 (返回 None 表示接受)，只有通过校验的输出才会写入缓存
         """
-        response = await chain.ainvoke(inputs)
-        
-        # 记录审计
-        prompt_str = self._format_prompt(prompt_template, inputs) if prompt_template else str(inputs)
-        auditor.record(
+        started = time.perf_counter()
+        prompt_str, segments = self._prepare_prompt(prompt_template, inputs)
+        key, cached, ttl = await asyncio.to_thread(
+            self._cache_lookup, prompt_str, agent_name, use_cache, retry_count, accept
+        )
+        if cached is not None:
+            response = AIMessage(content=cached)
+        else:
+            response = await chain.ainvoke(inputs)
+            if key:
+                await asyncio.to_thread(self._cache_store, key, agent_name, response.content, ttl, accept)
+
+        # 记录审计 (含 Token、耗时与费用统计)
+        self._record(agent_name, task_id, prompt_str, response, project_name, cache_hit=cached is not None,
+                     usage=None if cached is not None else self._extract_usage(response),
+                     started=started, retry_count=retry_count, endpoint=endpoint,
+                     prompt_segments=segments)
+        return response
+
+    async def astream(self,
+                      chain: Any,
+                      inputs: Dict[str, Any],
+                      agent_name: str,
+                      task_id: str,
+                      prompt_template: Optional[ChatPromptTemplate] = None,
+                      project_name: str = "Default",
+                      use_cache: bool = True,
+                      retry_count: int = 0,
+                      endpoint: Optional[str] = None,
+                      accept: Optional[Callable[[str], Optional[str]]] = None) -> AsyncIterator[str]:
+        """
+        流式调用：逐块产出文本，结束后记录完整响应的审计日志
+        :param accept: 输出校验函数 (返回 None 表示接受)，只有通过校验的完整输出才会写入缓存
+        """
+        started = time.perf_counter()
+        prompt_str, segments = self._prepare_prompt(prompt_template, inputs)
+        key, cached, ttl = await asyncio.to_thread(
+            self._cache_lookup, prompt_str, agent_name, use_cache, retry_count, accept
+        )
+        if cached is not None:
+            yield cached
+            self._record(agent_name, task_id, prompt_str, cached, project_name, cache_hit=True,
+                         started=started, retry_count=retry_count, endpoint=endpoint,
+                         prompt_segments=segments)
+            return
+
+        parts = []
+        usage = {"prompt_tokens": 0, "completion_tokens": 0}
+        async for chunk in chain.astream(inputs):
+            # 开启 stream_usage 后，用量信息随最后一个分块返回
+            chunk_usage = self._extract_usage(chunk)
+            usage["prompt_tokens"] += chunk_usage["prompt_tokens"] or 0
+            usage["completion_tokens"] += chunk_usage["completion_tokens"] or 0
+            text = chunk.content if hasattr(chunk, 'content') else str(chunk)
+            if text:
+                parts.append(text)
+                yield text
+
+        content = "".join(parts)
+        if key:
+            await asyncio.to_thread(self._cache_store, key, agent_name, content, ttl, accept)
+        self._record(agent_name, task_id, prompt_str, content, project_name, cache_hit=False,
+                     usage=usage, started=started, retry_count=retry_count, endpoint=endpoint,
+                     prompt_segments=segments)
+
+class ModelCascade:
+    """
+    分级模型调用策略：
+    1. 简单判定 (无异常结果、首轮生成) 优先路由到快速模型
+    2. 快速模型输出无法解析或置信度不足时升级到强模型
+    3. 重试轮数达到 LLM_CASCADE_ESCALATE_RETRY 后直接使用强模型
+    """
+    def __init__(self, strong: AuditedLLM, fast: Optional[AuditedLLM] = None, fast_kwargs: Optional[Dict[str, Any]] = None):
+        self.strong = strong
+        self.fast = fast
+        self.fast_kwargs = fast_kwargs or {}
+        self.stats: Dict[str, Dict[str, int]] = {}
+        _cascades.add(self)
+
+    def sync_fast_tier(self):
+        """MODEL_NAME_WORKER_FAST 在运行中开启或关闭时，相应地创建或移除快速模型"""
+        if not settings.MODEL_NAME_WORKER_FAST:
+            self.fast = None
+        elif self.fast is None:
+            self.fast = create_audited_llm(
+                model_name=settings.MODEL_NAME_WORKER_FAST,
+                api_key=settings.OPENAI_API_KEY,
+                api_base=settings.OPENAI_API_BASE,
+                model_setting="MODEL_NAME_WORKER_FAST",
+                **self.fast_kwargs
+            )
+
+    def _count(self, agent_name: str, field: str):
+        agent_stats = self.stats.setdefault(agent_name, {"fast": 0, "strong": 0, "escalated": 0})
+        agent_stats[field] += 1
+
+    def route(self, agent_name: str, easy: bool, retry_count: int = 0) -> str:
+        """选择本次调用的模型层级 ("fast" / "strong") 并记录路由统计"""
+        use_fast = self.fast is not None and easy and retry_count < settings.LLM_CASCADE_ESCALATE_RETRY
+        tier = "fast" if use_fast else "strong"
+        self._count(agent_name, tier)
+        return tier
+
+    def tier_llm(self, tier: str) -> AuditedLLM:
+        return self.fast if tier == "fast" and self.fast is not None else self.strong
+
+    def escalate(self, agent_name: str, reason: str) -> AuditedLLM:
+        """记录一次升级并返回强模型"""
+        self._count(agent_name, "escalated")
+        logger.info(f"[{agent_name}] 快速模型输出不可用，升级到强模型 | 原因: {reason}")
+        return self.strong
+
+    async def ainvoke(self,
+                      prompt: ChatPromptTemplate,
+                      inputs: Dict[str, Any],
+                      agent_name: str,
+                      task_id: str,
+                      project_name: str = "Default",
+                      easy: bool = False,
+                      retry_count: int = 0,
+                      accept: Optional[Callable[[str], Optional[str]]] = None,
+                      endpoint: Optional[str] = None) -> Any:
+        """
+        按级联策略调用模型。
+        :param accept: 校验函数，返回 None 表示接受输出，否则返回拒绝原因并触发升级。
+        """
+        tier = self.route(agent_name, easy, retry_count)
+        audited_llm = self.tier_llm(tier)
+        response = await audited_llm.ainvoke(
+            chain=prompt | audited_llm.llm,
+            inputs=inputs,
             agent_name=agent_name,
             task_id=task_id,
-            prompt=prompt_str,
-            response=response.content if hasattr(response, 'content') else str(response),
-            project_name=project_name
+            prompt_template=prompt,
+            project_name=project_name,
+            retry_count=retry_count,
+            endpoint=endpoint,
+            accept=accept
         )
+
+        if tier == "fast" and accept is not None:
+            reason = accept(response.content)
+            if reason:
+                audited_llm = self.escalate(agent_name, reason)
+                response = await audited_llm.ainvoke(
+                    chain=prompt | audited_llm.llm,
+                    inputs=inputs,
+                    agent_name=agent_name,
+                    task_id=task_id,
+                    prompt_template=prompt,
+                    project_name=project_name,
+                    retry_count=retry_count,
+                    endpoint=endpoint,
+                    accept=accept
+                )
         return response
 
-def create_audited_llm(model_name: str, api_key: str, api_base: str, **kwargs) -> AuditedLLM:
-    """工厂方法创建带审计的 LLM 实例"""
-    llm = ChatOpenAI(
+def _parse_pricing(raw: str) -> Dict[str, Tuple[float, float]]:
+    pricing = {}
+    for item in (raw or "").split(","):
+        parts = item.strip().rsplit(":", 2)
+        if len(parts) != 3:
+            continue
+        try:
+            pricing[parts[0].strip()] = (float(parts[1]), float(parts[2]))
+        except ValueError:
+            logger.warning(f"忽略无效的模型价格配置: {item}")
+    return pricing
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """按 LLM_PRICING (美元 / 百万 Token) 估算单次调用费用，未配置价格的模型记为 0"""
+    price = _parse_pricing(settings.LLM_PRICING).get(model)
+    if not price:
+        return 0.0
+    return round((prompt_tokens * price[0] + completion_tokens * price[1]) / 1_000_000, 6)
+
+def _chat_model(model_name: str, kwargs: Dict[str, Any], api_key: Optional[str] = None, api_base: Optional[str] = None) -> ChatOpenAI:
+    return ChatOpenAI(
         model=model_name,
-        openai_api_key=api_key,
-        openai_api_base=api_base,
+        openai_api_key=api_key or settings.OPENAI_API_KEY,
+        openai_api_base=api_base or settings.OPENAI_API_BASE,
         **kwargs
     )
-    return AuditedLLM(llm)
+
+def create_audited_llm(model_name: str, api_key: str, api_base: str, model_setting: Optional[str] = None, **kwargs) -> AuditedLLM:
+    """
+    工厂方法创建带审计的 LLM 实例。
+    :param model_setting: 模型名所对应的配置项 (如 MODEL_NAME_WORKER)，指定后运行中修改该配置会自动切换模型。
+    """
+    kwargs.setdefault("stream_usage", True)
+    return AuditedLLM(_chat_model(model_name, kwargs, api_key, api_base), model_setting=model_setting, llm_kwargs=kwargs)
+
+def create_worker_cascade(strong: Optional[AuditedLLM] = None, **kwargs) -> ModelCascade:
+    """工厂方法创建 Worker 级联：强模型为 MODEL_NAME_WORKER，快速模型为 MODEL_NAME_WORKER_FAST (可选)"""
+    if strong is None:
+        strong = create_audited_llm(
+            model_name=settings.MODEL_NAME_WORKER,
+            api_key=settings.OPENAI_API_KEY,
+            api_base=settings.OPENAI_API_BASE,
+            model_setting="MODEL_NAME_WORKER",
+            **kwargs
+        )
+    cascade = ModelCascade(strong, fast_kwargs=kwargs)
+    cascade.sync_fast_tier()
+    return cascade
+
+_bound_llms: "weakref.WeakSet[AuditedLLM]" = weakref.WeakSet()
+_cascades: "weakref.WeakSet[ModelCascade]" = weakref.WeakSet()
+
+def apply_model_settings(changed: Set[str]):
+    """模型或凭据配置变化后重建受影响的模型实例 (由运行时配置订阅线程调用)"""
+    credentials_changed = bool(changed & {"OPENAI_API_KEY", "OPENAI_API_BASE"})
+    for audited in list(_bound_llms):
+        if credentials_changed or audited.model_setting in changed:
+            audited.rebind()
+    if "MODEL_NAME_WORKER_FAST" in changed:
+        for cascade in list(_cascades):
+            cascade.sync_fast_tier()
+
+runtime_config.add_listener(apply_model_settings, keys=MODEL_SETTINGS)
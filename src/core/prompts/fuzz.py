@@ -110,5 +110,6 @@ FUZZ_ANALYZER_PROMPT = """你是一个 Web Fuzzing 结果分析专家。
     "reasoning": "分析触发了何种异常（参数发现/逻辑变化/报错）",
     "vulnerable_parameter": "参数名",
     "payload": "使用的 Payload",
-    "decision": "FOUND/RETRY/GIVE_UP"
+    "decision": "FOUND/RETRY/GIVE_UP",
+    "confidence": 0.0-1.0 之间的数字，表示你对该判定的把握程度
 }}"""
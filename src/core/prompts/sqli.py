@@ -98,5 +98,6 @@ SQLI_ANALYZER_PROMPT = """你是一个 Web 安全专家，专注于 SQL 注入
     "reasoning": "简明扼要的分析，说明触发了何种注入特征（报错/延时/差异）及判定理由",
     "vulnerable_parameter": "参数名",
     "payload": "使用的 Payload",
-    "decision": "FOUND/RETRY/GIVE_UP"
+    "decision": "FOUND/RETRY/GIVE_UP",
+    "confidence": 0.0-1.0 之间的数字，表示你对该判定的把握程度
 }}"""
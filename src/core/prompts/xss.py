@@ -85,5 +85,6 @@ XSS_ANALYZER_PROMPT = """你是一个 Web 安全专家，专注于 XSS 漏洞分
     "reasoning": "简明扼要的分析，说明 Payload 反射位置、转义情况及为何判定为成功/失败",
     "vulnerable_parameter": "参数名",
     "payload": "使用的 Payload",
-    "decision": "FOUND/RETRY/GIVE_UP"
+    "decision": "FOUND/RETRY/GIVE_UP",
+    "confidence": 0.0-1.0 之间的数字，表示你对该判定的把握程度
 }}"""
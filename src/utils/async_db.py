@@ -0,0 +1,47 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+from src.config.settings import settings
+
+class AsyncDBHelper:
+    """
+    db_helper 的异步门面 (供 FastAPI 路由使用)：
+    1. 所有同步的数据库调用在专用的有界线程池中执行，不阻塞事件循环 (WebSocket 推流等保持响应)
+    2. 线程数不超过连接池大小，每个线程都能拿到独立连接
+    3. 等待中的调用数量受信号量限制，过载时在协程内排队而不是无限堆积到线程池
+
+    用法: await async_db.list_projects() 等价于在线程池中执行 db_helper.list_projects()
+    """
+    def __init__(self, max_workers: int = None, max_pending: int = None):
+        self.max_workers = min(max_workers or settings.DB_ASYNC_WORKERS, settings.DB_POOL_SIZE)
+        self.max_pending = max_pending or settings.DB_ASYNC_MAX_PENDING
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="db-async")
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    @property
+    def helper(self):
+        from src.utils.db_helper import db_helper
+        return db_helper
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """在数据库线程池中执行任意同步函数"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_pending)
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    def __getattr__(self, name: str):
+        method = getattr(self.helper, name)
+        if not callable(method):
+            return method
+
+        async def call(*args, **kwargs):
+            return await self.run(method, *args, **kwargs)
+        return call
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+async_db = AsyncDBHelper()
@@ -1,50 +1,169 @@
 import json
+import asyncio
 import time
+import queue
+import atexit
+import threading
 from datetime import datetime
 from pathlib import Path
+from typing import Dict, List, Optional
 from loguru import logger
+from src.config.settings import settings
+from src.utils.metrics import metrics
+
+AUDIT_DROPPED = metrics.counter("aegisx_audit_dropped_total", "审计队列已满时丢弃的 LLM 审计记录数")
 
 class LLMAuditor:
     """
     LLM 交互审计记录器
+
+    record() 只负责组装记录并放入有界队列，控制台回显与 SQLite 写入由后台线程批量完成，
+    避免在扫描热路径上产生磁盘与控制台 I/O。队列已满时，事件循环线程中直接丢弃记录 (不能阻塞其他任务)，
+    其他线程最多等待 AUDIT_PUT_TIMEOUT 秒，丢弃数计入 aegisx_audit_dropped_total。
     """
+    _STOP = object()
+
     def __init__(self, log_dir: str = "logs/llm_audit"):
         self.log_path = Path(log_dir)
         self.log_path.mkdir(parents=True, exist_ok=True)
+        self._queue: "queue.Queue" = queue.Queue(maxsize=settings.AUDIT_QUEUE_SIZE)
+        self._writer: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.dropped = 0
+        atexit.register(self.close)
 
-    def record(self, agent_name: str, task_id: str, prompt: any, response: any, project_name: str = "Default"):
-        """记录单次交互"""
-        
-        # 0. 打印 AI 对话到控制台 (新增)
-        print("\n" + "="*50)
-        print(f"🤖 AI Conversation - Agent: {agent_name} | Task: {task_id}")
-        print("-" * 50)
-        print(f"👉 [PROMPT]\n{str(prompt)}")
-        print("-" * 50)
-        print(f"👈 [RESPONSE]\n{str(response)}")
-        print("="*50 + "\n")
-
+    def record(self, agent_name: str, task_id: str, prompt: any, response: any, project_name: str = "Default", cache_hit: bool = False, usage: dict = None, prompt_segments: list = None):
+        """
+        记录单次交互
+        :param usage: model / Token 数 / 耗时 / 重试次数 / 费用 / 接口模板
+        :param prompt_segments: Prompt 的 (是否可复用, 文本) 片段，用于去重存储
+        """
+        usage = usage or {}
         entry = {
             "timestamp": datetime.now().isoformat(),
             "project": project_name,
             "agent": agent_name,
             "task_id": task_id,
             "prompt": str(prompt),
-            "response": str(response)
+            "response": str(response),
+            "cache_hit": cache_hit,
+            "prompt_segments": prompt_segments,
+            **usage
         }
-        
-        # 1. 写入 JSONL 文件 (已禁用，仅写入数据库)
-        # try:
-        #     with open(log_file, "a", encoding="utf-8") as f:
-        #         f.write(json.dumps(entry, ensure_ascii=False) + "\n")
-        # except Exception as e:
-        #     logger.error(f"无法写入 LLM 审计日志文件: {e}")
-
-        # 2. 写入 SQLite 数据库 (新增)
+
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait(entry)
+            return
+        except queue.Full:
+            pass
+        if not self._in_event_loop():
+            try:
+                self._queue.put(entry, timeout=settings.AUDIT_PUT_TIMEOUT)
+                return
+            except queue.Full:
+                pass
+        self.dropped += 1
+        AUDIT_DROPPED.inc()
+        if self.dropped == 1 or self.dropped % 1000 == 0:
+            logger.warning(f"LLM 审计队列已满 (数据库写入过慢)，已丢弃 {self.dropped} 条审计记录")
+
+    @staticmethod
+    def _in_event_loop() -> bool:
+        try:
+            asyncio.get_running_loop()
+            return True
+        except RuntimeError:
+            return False
+
+    def _ensure_writer(self):
+        if self._writer and self._writer.is_alive():
+            return
+        with self._lock:
+            if self._writer and self._writer.is_alive():
+                return
+            self._writer = threading.Thread(target=self._writer_loop, name="llm-audit-writer", daemon=True)
+            self._writer.start()
+
+    def _writer_loop(self):
+        """后台线程：按批次 (数量或时间间隔) 回显并写入数据库"""
+        while True:
+            item = self._queue.get()
+            if item is self._STOP:
+                self._queue.task_done()
+                return
+
+            batch = [item]
+            deadline = time.monotonic() + settings.AUDIT_FLUSH_INTERVAL
+            stop = False
+            while len(batch) < settings.AUDIT_BATCH_SIZE:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is self._STOP:
+                    stop = True
+                    break
+                batch.append(item)
+
+            self._write_batch(batch)
+            for _ in range(len(batch) + (1 if stop else 0)):
+                self._queue.task_done()
+            if stop:
+                return
+
+    def _write_batch(self, batch: List[Dict]):
+        for entry in batch:
+            self._echo(entry)
+
+        # 写入 SQLite 数据库 (单事务批量插入)
         try:
             from src.utils.db_helper import db_helper
-            db_helper.save_agent_log(project_name, entry)
+            db_helper.save_agent_logs(batch)
         except Exception as e:
-            logger.error(f"无法将 LLM 审计日志存入数据库: {e}")
+            logger.error(f"无法将 LLM 审计日志存入数据库 ({len(batch)} 条): {e}")
+
+    @staticmethod
+    def _echo(entry: Dict):
+        """按 LOG_PROMPT_INTERACTION 与 AUDIT_ECHO_VERBOSITY 回显 AI 对话到控制台"""
+        verbosity = settings.AUDIT_ECHO_VERBOSITY
+        if not settings.LOG_PROMPT_INTERACTION or verbosity <= 0:
+            return
+
+        header = f"🤖 AI Conversation - Agent: {entry['agent']} | Task: {entry['task_id']}" + (" | 💾 Cache Hit" if entry.get("cache_hit") else "")
+        if entry.get("model"):
+            header += f" | Model: {entry.get('model')} | Tokens: {entry.get('prompt_tokens', 0)}+{entry.get('completion_tokens', 0)} | Latency: {entry.get('latency_ms', 0)}ms"
+        if verbosity == 1:
+            print(header)
+            return
+
+        print("\n" + "="*50)
+        print(header)
+        print("-" * 50)
+        print(f"👉 [PROMPT]\n{entry['prompt']}")
+        print("-" * 50)
+        print(f"👈 [RESPONSE]\n{entry['response']}")
+        print("="*50 + "\n")
+
+    def flush(self, timeout: Optional[float] = None):
+        """等待队列中的审计记录全部写入"""
+        if not self._writer or not self._writer.is_alive():
+            return
+        if timeout is None:
+            self._queue.join()
+            return
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+    def close(self, timeout: float = 10.0):
+        """关闭时刷新剩余记录并停止写入线程"""
+        if not self._writer or not self._writer.is_alive():
+            return
+        self._queue.put(self._STOP)
+        self._writer.join(timeout)
 
 auditor = LLMAuditor()
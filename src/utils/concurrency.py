@@ -0,0 +1,71 @@
+import asyncio
+from collections import deque
+from typing import Callable, Deque, Union
+
+class ResizableSemaphore:
+    """
+    可在运行中调整上限的 asyncio 信号量：
+    1. limit 可以是固定整数，也可以是返回当前上限的函数 (例如读取 settings)，每次获取 / 释放时重新取值
+    2. 调大上限时立即唤醒等待者；调小时不打断已持有的请求，只是在其释放前不再放行新的请求
+    3. 只能在所属事件循环的线程中使用，其他线程需通过 loop.call_soon_threadsafe(sem.refresh)
+    """
+    def __init__(self, limit: Union[int, Callable[[], int]]):
+        self._limit = limit
+        self._in_use = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def limit(self) -> int:
+        limit = self._limit() if callable(self._limit) else self._limit
+        return max(1, int(limit))
+
+    @property
+    def in_use(self) -> int:
+        return self._in_use
+
+    @property
+    def waiting(self) -> int:
+        return sum(1 for waiter in self._waiters if not waiter.done())
+
+    def locked(self) -> bool:
+        return self._in_use >= self.limit
+
+    async def acquire(self) -> bool:
+        if not self._waiters and self._in_use < self.limit:
+            self._in_use += 1
+            return True
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # 已被放行但在恢复前取消：归还名额
+                self.release()
+            raise
+        return True
+
+    def release(self):
+        self._in_use -= 1
+        self.refresh()
+
+    def refresh(self):
+        """按当前上限放行等待者 (上限变化后调用)"""
+        limit = self.limit
+        while self._waiters and self._in_use < limit:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self._in_use += 1
+                waiter.set_result(True)
+
+    def resize(self, limit: int):
+        """改为固定上限"""
+        self._limit = limit
+        self.refresh()
+
+    async def __aenter__(self):
+        await self.acquire()
+        return None
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.release()
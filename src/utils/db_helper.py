@@ -1,13 +1,22 @@
-import sqlite3
 import os
+import time
+import threading
 from pathlib import Path
 from loguru import logger
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+from src.config.settings import settings
+from .db_pool import SQLitePool
 from .db_repository import DBRepository
+from .metrics import metrics
+
+DB_WRITE_SECONDS = metrics.histogram(
+    "aegisx_db_write_duration_seconds", "SQLite 写操作耗时 (含等待写锁)", ["op"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+)
 
 class DBHelper:
     """
-    SQLite 数据库助手，负责连接管理，并持有 DBRepository 进行实际操作
+    SQLite 数据库助手，负责连接管理 (连接池 + WAL)，并持有 DBRepository 进行实际操作
     """
     def __init__(self, db_path: str = None):
         if db_path is None:
@@ -18,11 +27,15 @@ class DBHelper:
             self.db_path = Path(db_path)
         
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.pool = SQLitePool(self.db_path, size=settings.DB_POOL_SIZE, timeout=settings.DB_BUSY_TIMEOUT)
+        # 项目名称 -> (ID, 缓存时间)；带 TTL 以感知其他进程删除项目
+        self._project_ids: Dict[str, Tuple[int, float]] = {}
+        self._project_lock = threading.Lock()
         self.repo = DBRepository(self._get_connection)
         self._init_db()
 
     def _get_connection(self):
-        return sqlite3.connect(self.db_path)
+        return self.pool.connection()
 
     def _init_db(self):
         """初始化数据库"""
@@ -35,32 +48,110 @@ class DBHelper:
     # --- 代理方法，调用 repo ---
     
     def get_or_create_project(self, name: str) -> int:
-        return self.repo.get_or_create_project(name)
+        now = time.monotonic()
+        cached = self._project_ids.get(name)
+        if cached and now - cached[1] < settings.DB_PROJECT_CACHE_TTL:
+            return cached[0]
+        with self._project_lock:
+            project_id = self.repo.get_or_create_project(name)
+            self._project_ids[name] = (project_id, now)
+        return project_id
 
-    def save_vulnerability(self, project_name: str, vuln_data: Dict[str, Any]):
+    def save_vulnerability(self, project_name: str, vuln_data: Dict[str, Any]) -> Tuple[int, int]:
         project_id = self.get_or_create_project(project_name)
-        self.repo.save_vulnerability(project_id, vuln_data)
+        with DB_WRITE_SECONDS.time(op="save_vulnerability"):
+            return self.repo.save_vulnerability(project_id, vuln_data)
+
+    def add_vulnerability_hits(self, hits: List[tuple]):
+        with DB_WRITE_SECONDS.time(op="add_vulnerability_hits"):
+            self.repo.add_vulnerability_hits(hits)
 
     def save_agent_log(self, project_name: str, log_data: Dict[str, Any]):
         project_id = self.get_or_create_project(project_name or "Default")
-        self.repo.save_agent_log(project_id, log_data)
+        with DB_WRITE_SECONDS.time(op="save_agent_log"):
+            self.repo.save_agent_log(project_id, log_data)
+
+    def save_agent_logs(self, entries: List[Dict[str, Any]]):
+        """批量保存审计日志"""
+        rows = [(self.get_or_create_project(entry.get("project") or "Default"), entry) for entry in entries]
+        with DB_WRITE_SECONDS.time(op="save_agent_logs"):
+            self.repo.save_agent_logs(rows)
 
-    def query_vulnerabilities_by_project(self, project_name: str) -> List[Dict]:
+    def query_vulnerabilities_by_project(self, project_name: str, limit: Optional[int] = None) -> List[Dict]:
         project_id = self.get_or_create_project(project_name)
-        return self.repo.query_vulnerabilities(project_id)
+        return self.repo.query_vulnerabilities(project_id, limit)
+
+    def query_logs_by_project(self, project_name: str, limit: Optional[int] = None) -> List[Dict]:
+        project_id = self.get_or_create_project(project_name)
+        return self.repo.query_logs(project_id, limit)
+
+    def page_logs(self, project_name: str, **kwargs) -> Tuple[List[Dict], Optional[str]]:
+        project_id = self.get_or_create_project(project_name)
+        return self.repo.page_logs(project_id, **kwargs)
+
+    def get_log(self, project_name: str, log_id: int) -> Optional[Dict]:
+        project_id = self.get_or_create_project(project_name)
+        return self.repo.get_log(project_id, log_id)
+
+    def page_vulnerabilities(self, project_name: Optional[str] = None, **kwargs) -> Tuple[List[Dict], Optional[str]]:
+        project_id = self.get_or_create_project(project_name) if project_name else None
+        return self.repo.page_vulnerabilities(project_id, **kwargs)
+
+    def iter_vulnerabilities(self, project_name: Optional[str] = None, **kwargs) -> Iterator[Dict]:
+        project_id = self.get_or_create_project(project_name) if project_name else None
+        return self.repo.iter_vulnerabilities(project_id, **kwargs)
 
-    def query_logs_by_project(self, project_name: str) -> List[Dict]:
+    def search_archived_logs(self, query: str, project_name: str, start_month: Optional[str] = None,
+                             end_month: Optional[str] = None, agent: Optional[str] = None, limit: int = 50) -> List[Dict]:
+        from .log_archive import log_archiver
         project_id = self.get_or_create_project(project_name)
-        return self.repo.query_logs(project_id)
+        segments = self.repo.list_archive_segments(project_id, start_month, end_month)
+        return log_archiver.search(segments, query, agent=agent, limit=limit)
+
+    def search_logs(self, query: str, project_name: Optional[str] = None, **kwargs) -> List[Dict]:
+        project_id = self.get_or_create_project(project_name) if project_name else None
+        return self.repo.search_logs(query, project_id, **kwargs)
+
+    def search_vulnerabilities(self, query: str, project_name: Optional[str] = None, **kwargs) -> List[Dict]:
+        project_id = self.get_or_create_project(project_name) if project_name else None
+        return self.repo.search_vulnerabilities(query, project_id, **kwargs)
 
     def list_projects(self) -> List[Dict]:
         return self.repo.list_projects()
 
     def delete_project(self, project_id: int):
+        """标记删除 (立即返回)，数据由 MaintenanceWorker 在后台分批清理"""
         self.repo.delete_project(project_id)
+        with self._project_lock:
+            for name in [n for n, (pid, _) in self._project_ids.items() if pid == project_id]:
+                del self._project_ids[name]
+
+    def query_all_vulnerabilities(self, limit: Optional[int] = None) -> List[Dict]:
+        return self.repo.query_vulnerabilities(limit=limit)
+
+    def usage_by_project(self) -> List[Dict]:
+        return self.repo.usage_by_project()
+
+    def usage_rollup(self, project_name: str, group_by: str = "agent") -> List[Dict]:
+        project_id = self.get_or_create_project(project_name)
+        return self.repo.usage_rollup(project_id, group_by)
 
-    def query_all_vulnerabilities(self) -> List[Dict]:
-        return self.repo.query_vulnerabilities()
+    def top_endpoints_by_cost(self, project_name: str, limit: int = 10) -> List[Dict]:
+        project_id = self.get_or_create_project(project_name)
+        return self.repo.top_endpoints_by_cost(project_id, limit)
+
+    def save_spans(self, spans: List[Dict[str, Any]]):
+        """批量保存追踪 Span"""
+        rows = [(self.get_or_create_project(span.get("project") or "Default"), span) for span in spans]
+        with DB_WRITE_SECONDS.time(op="save_spans"):
+            self.repo.save_spans(rows)
+
+    def get_trace(self, trace_id: str) -> List[Dict]:
+        return self.repo.get_trace(trace_id)
+
+    def list_traces(self, project_name: str, **kwargs) -> List[Dict]:
+        project_id = self.get_or_create_project(project_name)
+        return self.repo.list_traces(project_id, **kwargs)
 
     def get_session_summary(self) -> str:
         """获取汇总信息（保持原有逻辑用于打印）"""
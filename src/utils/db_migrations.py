@@ -0,0 +1,305 @@
+"""
+版本化数据库迁移：
+1. 当前结构版本记录在 PRAGMA user_version 中
+2. 启动时按顺序执行所有高于当前版本的迁移，每个迁移在独立的 IMMEDIATE 事务中完成
+3. 新增表结构变更时只需在 MIGRATIONS 末尾追加一项，不要修改已发布的迁移
+"""
+from typing import Callable, Dict, List, Tuple
+from loguru import logger
+from src.utils.log_codec import decompress_text
+from src.utils.endpoint import finding_identity
+
+def _ensure_columns(cursor, table: str, columns: Dict[str, str]):
+    """检查并补齐缺失的列 (兼容引入版本号之前创建的数据库)"""
+    cursor.execute(f"PRAGMA table_info({table})")
+    existing = {column[1] for column in cursor.fetchall()}
+    for name, ddl in columns.items():
+        if name not in existing:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}")
+            logger.info(f"数据库迁移：在 {table} 表中添加了 {name} 列")
+
+def _v1_base_schema(cursor):
+    # 1. 项目表
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS projects (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE NOT NULL,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # 2. 漏洞结果表
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS vulnerabilities (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            project_id INTEGER NOT NULL,
+            request_id TEXT NOT NULL,
+            vuln_type TEXT NOT NULL,
+            url TEXT NOT NULL,
+            method TEXT,
+            parameter TEXT,
+            payload TEXT,
+            evidence TEXT,
+            full_request TEXT,
+            severity TEXT DEFAULT 'high',
+            found_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (project_id) REFERENCES projects (id)
+        )
+    ''')
+    _ensure_columns(cursor, "vulnerabilities", {"full_request": "TEXT"})
+
+    # 3. Agent 日志表
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS agent_logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            project_id INTEGER NOT NULL,
+            request_id TEXT NOT NULL,
+            agent_name TEXT NOT NULL,
+            prompt TEXT,
+            response TEXT,
+            cache_hit INTEGER DEFAULT 0,
+            model TEXT,
+            prompt_tokens INTEGER DEFAULT 0,
+            completion_tokens INTEGER DEFAULT 0,
+            latency_ms REAL DEFAULT 0,
+            retry_count INTEGER DEFAULT 0,
+            cost REAL DEFAULT 0,
+            endpoint TEXT,
+            prompt_manifest TEXT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (project_id) REFERENCES projects (id)
+        )
+    ''')
+
+    # 4. Prompt 模板片段表 (按哈希去重，压缩存储)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS prompt_segments (
+            hash TEXT PRIMARY KEY,
+            content BLOB NOT NULL,
+            size INTEGER NOT NULL,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # 补齐缓存、用量统计与 Prompt 去重相关的列
+    _ensure_columns(cursor, "agent_logs", {
+        "prompt_manifest": "TEXT",
+        "cache_hit": "INTEGER DEFAULT 0",
+        "model": "TEXT",
+        "prompt_tokens": "INTEGER DEFAULT 0",
+        "completion_tokens": "INTEGER DEFAULT 0",
+        "latency_ms": "REAL DEFAULT 0",
+        "retry_count": "INTEGER DEFAULT 0",
+        "cost": "REAL DEFAULT 0",
+        "endpoint": "TEXT"
+    })
+
+def _v2_query_indexes(cursor):
+    # 覆盖 "按项目过滤 + 按时间倒序" 的列表查询
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_vulns_project_found ON vulnerabilities (project_id, found_at)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_vulns_found ON vulnerabilities (found_at)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_logs_project_ts ON agent_logs (project_id, timestamp)')
+
+def _v3_project_counters(cursor):
+    # 项目级计数器，由触发器维护，避免项目列表对子表做相关 COUNT
+    _ensure_columns(cursor, "projects", {
+        "vuln_count": "INTEGER NOT NULL DEFAULT 0",
+        "log_count": "INTEGER NOT NULL DEFAULT 0"
+    })
+    cursor.execute('''
+        UPDATE projects SET
+            vuln_count = (SELECT COUNT(*) FROM vulnerabilities v WHERE v.project_id = projects.id),
+            log_count = (SELECT COUNT(*) FROM agent_logs l WHERE l.project_id = projects.id)
+    ''')
+    for statement in (
+        '''CREATE TRIGGER IF NOT EXISTS trg_vulns_count_insert AFTER INSERT ON vulnerabilities BEGIN
+            UPDATE projects SET vuln_count = vuln_count + 1 WHERE id = NEW.project_id;
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS trg_vulns_count_delete AFTER DELETE ON vulnerabilities BEGIN
+            UPDATE projects SET vuln_count = vuln_count - 1 WHERE id = OLD.project_id;
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS trg_logs_count_insert AFTER INSERT ON agent_logs BEGIN
+            UPDATE projects SET log_count = log_count + 1 WHERE id = NEW.project_id;
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS trg_logs_count_delete AFTER DELETE ON agent_logs BEGIN
+            UPDATE projects SET log_count = log_count - 1 WHERE id = OLD.project_id;
+        END'''
+    ):
+        cursor.execute(statement)
+
+def _v4_filter_indexes(cursor):
+    # 日志 / 漏洞列表按 Agent、任务过滤时的分页索引
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_logs_project_agent_ts ON agent_logs (project_id, agent_name, timestamp)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_logs_project_request ON agent_logs (project_id, request_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_vulns_project_request ON vulnerabilities (project_id, request_id)')
+
+def _v5_fulltext_search(cursor):
+    # 漏洞证据 / Payload：外部内容 FTS 表，由触发器同步
+    cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS vulnerabilities_fts USING fts5(
+            evidence, payload, content='vulnerabilities', content_rowid='id', tokenize='trigram'
+        )
+    ''')
+    for statement in (
+        '''CREATE TRIGGER IF NOT EXISTS trg_vulns_fts_insert AFTER INSERT ON vulnerabilities BEGIN
+            INSERT INTO vulnerabilities_fts (rowid, evidence, payload) VALUES (NEW.id, NEW.evidence, NEW.payload);
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS trg_vulns_fts_delete AFTER DELETE ON vulnerabilities BEGIN
+            INSERT INTO vulnerabilities_fts (vulnerabilities_fts, rowid, evidence, payload) VALUES ('delete', OLD.id, OLD.evidence, OLD.payload);
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS trg_vulns_fts_update AFTER UPDATE OF evidence, payload ON vulnerabilities BEGIN
+            INSERT INTO vulnerabilities_fts (vulnerabilities_fts, rowid, evidence, payload) VALUES ('delete', OLD.id, OLD.evidence, OLD.payload);
+            INSERT INTO vulnerabilities_fts (rowid, evidence, payload) VALUES (NEW.id, NEW.evidence, NEW.payload);
+        END'''
+    ):
+        cursor.execute(statement)
+    cursor.execute("INSERT INTO vulnerabilities_fts (vulnerabilities_fts) VALUES ('rebuild')")
+
+    # Agent 日志：文本压缩存储，无法由触发器索引，改为独立 FTS 表，由审计写入线程同步写入
+    cursor.execute("CREATE VIRTUAL TABLE IF NOT EXISTS agent_logs_fts USING fts5(prompt, response, tokenize='trigram')")
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_logs_fts_delete AFTER DELETE ON agent_logs BEGIN
+            DELETE FROM agent_logs_fts WHERE rowid = OLD.id;
+        END
+    ''')
+
+    # 回填历史日志 (只索引 Prompt 的变量部分，模板片段对检索无意义)
+    last_id, total = 0, 0
+    while True:
+        rows = cursor.execute(
+            'SELECT id, prompt, response FROM agent_logs WHERE id > ? ORDER BY id LIMIT 1000', (last_id,)
+        ).fetchall()
+        if not rows:
+            break
+        cursor.executemany(
+            'INSERT INTO agent_logs_fts (rowid, prompt, response) VALUES (?, ?, ?)',
+            [(row_id, decompress_text(prompt), decompress_text(response)) for row_id, prompt, response in rows]
+        )
+        last_id = rows[-1][0]
+        total += len(rows)
+    if total:
+        logger.info(f"数据库迁移：已为 {total} 条历史日志建立全文索引")
+
+def _v6_finding_identity(cursor):
+    # 漏洞身份 (类型 + 方法 + 接口模板 + 参数) 与命中统计，重复发现合并为一条记录
+    _ensure_columns(cursor, "vulnerabilities", {
+        "endpoint": "TEXT",
+        "fingerprint": "TEXT",
+        "hit_count": "INTEGER NOT NULL DEFAULT 1",
+        "last_seen": "DATETIME"
+    })
+
+    # 回填历史数据：每个身份保留最早的一条，其余合并进命中次数后删除
+    kept: Dict[tuple, list] = {}
+    duplicates: List[int] = []
+    rows = cursor.execute(
+        'SELECT id, project_id, vuln_type, method, url, parameter, found_at FROM vulnerabilities ORDER BY id'
+    ).fetchall()
+    for row_id, project_id, vuln_type, method, url, parameter, found_at in rows:
+        endpoint, fingerprint = finding_identity(vuln_type, method, url, parameter)
+        entry = kept.get((project_id, fingerprint))
+        if entry is None:
+            kept[(project_id, fingerprint)] = [row_id, endpoint, fingerprint, 1, found_at]
+        else:
+            entry[3] += 1
+            entry[4] = max(entry[4] or "", found_at or "")
+            duplicates.append(row_id)
+    cursor.executemany(
+        'UPDATE vulnerabilities SET endpoint = ?, fingerprint = ?, hit_count = ?, last_seen = ? WHERE id = ?',
+        [(endpoint, fingerprint, hits, last_seen, row_id) for row_id, endpoint, fingerprint, hits, last_seen in kept.values()]
+    )
+    cursor.executemany('DELETE FROM vulnerabilities WHERE id = ?', [(row_id,) for row_id in duplicates])
+    if duplicates:
+        logger.info(f"数据库迁移：合并了 {len(duplicates)} 条重复漏洞记录")
+
+    cursor.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_vulns_identity ON vulnerabilities (project_id, fingerprint)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_vulns_project_last_seen ON vulnerabilities (project_id, last_seen)')
+
+def _v7_retention(cursor):
+    # 归档段指针：每次归档向 <项目>/<月份>.jsonl.gz 追加一个 gzip 段，记录其偏移与长度
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS log_archives (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            project_id INTEGER NOT NULL,
+            month TEXT NOT NULL,
+            path TEXT NOT NULL,
+            offset INTEGER NOT NULL,
+            length INTEGER NOT NULL,
+            row_count INTEGER NOT NULL,
+            first_id INTEGER,
+            last_id INTEGER,
+            min_ts DATETIME,
+            max_ts DATETIME,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_archives_project_month ON log_archives (project_id, month)')
+    # 项目删除改为标记后由后台分批清理
+    _ensure_columns(cursor, "projects", {
+        "archived_log_count": "INTEGER NOT NULL DEFAULT 0",
+        "deleted_at": "DATETIME"
+    })
+
+def _v8_trace_spans(cursor):
+    # 任务级追踪：trace_id 为任务 request_id，时间为 Unix 秒 (浮点)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS trace_spans (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            project_id INTEGER,
+            trace_id TEXT NOT NULL,
+            span_id TEXT NOT NULL,
+            parent_id TEXT,
+            name TEXT NOT NULL,
+            start_time REAL NOT NULL,
+            duration_ms REAL NOT NULL,
+            status TEXT NOT NULL DEFAULT 'ok',
+            attributes TEXT
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_spans_trace ON trace_spans (trace_id, start_time)')
+    # 只索引根 Span，用于按项目列出最近的任务
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_spans_project_roots ON trace_spans (project_id, start_time) WHERE parent_id IS NULL')
+
+def _v9_span_start_index(cursor):
+    # 按开始时间清理过期 Span (purge_spans)，避免每批删除都全表扫描
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_spans_start ON trace_spans (start_time)')
+
+# (版本号, 说明, 迁移函数)，版本号必须连续递增
+MIGRATIONS: List[Tuple[int, str, Callable]] = [
+    (1, "基础表结构", _v1_base_schema),
+    (2, "项目 + 时间复合索引", _v2_query_indexes),
+    (3, "项目漏洞/日志计数器", _v3_project_counters),
+    (4, "日志/漏洞过滤索引", _v4_filter_indexes),
+    (5, "日志与漏洞全文索引", _v5_fulltext_search),
+    (6, "漏洞身份去重与命中统计", _v6_finding_identity),
+    (7, "日志归档与后台删除", _v7_retention),
+    (8, "任务追踪 Span", _v8_trace_spans),
+    (9, "Span 清理索引", _v9_span_start_index),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def migrate(conn):
+    """将数据库升级到最新版本 (多进程同时启动时由 IMMEDIATE 事务串行化)"""
+    cursor = conn.cursor()
+    current = cursor.execute("PRAGMA user_version").fetchone()[0]
+    if current >= SCHEMA_VERSION:
+        return
+
+    for version, description, apply in MIGRATIONS:
+        if version <= current:
+            continue
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            # 获取写锁后重新确认，避免其他进程已完成同一迁移
+            current = cursor.execute("PRAGMA user_version").fetchone()[0]
+            if version <= current:
+                conn.rollback()
+                continue
+            apply(cursor)
+            cursor.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        logger.info(f"数据库迁移：已升级到版本 {version} ({description})")
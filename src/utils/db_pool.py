@@ -0,0 +1,99 @@
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Union
+from loguru import logger
+
+class SQLitePool:
+    """
+    线程安全的 SQLite 连接池：
+    1. 连接复用，避免每次仓库调用都重新 connect
+    2. 启用 WAL 与调优的 synchronous / cache / busy_timeout 参数，读写互不阻塞
+    3. 每个连接保留预编译语句缓存 (cached_statements)，重复 SQL 无需重新解析
+    """
+    def __init__(self, db_path: Union[str, Path], size: int = 8, timeout: float = 30.0, cached_statements: int = 256):
+        self.db_path = Path(db_path)
+        self.size = size
+        self.timeout = timeout
+        self.cached_statements = cached_statements
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue(maxsize=size)
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _create(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.timeout,
+            check_same_thread=False,
+            cached_statements=self.cached_statements
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA cache_size=-16000")  # 约 16MB 页缓存
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute(f"PRAGMA busy_timeout={int(self.timeout * 1000)}")
+        return conn
+
+    def _acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                try:
+                    return self._create()
+                except Exception:
+                    self._created -= 1
+                    raise
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError(f"获取数据库连接超时 ({self.timeout}s): {self.db_path}")
+
+    def _release(self, conn: sqlite3.Connection):
+        # 清理调用方可能修改的连接状态，避免影响下一个使用者
+        conn.row_factory = None
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """
+        借出一个连接，语义与 `with sqlite3.connect(...) as conn` 一致：
+        正常退出时提交事务，异常时回滚。
+        """
+        conn = self._acquire()
+        try:
+            with conn:
+                yield conn
+        except sqlite3.Error:
+            # 连接可能已处于异常状态，丢弃并允许重新创建
+            self._discard(conn)
+            raise
+        except BaseException:
+            self._release(conn)
+            raise
+        else:
+            self._release(conn)
+
+    def _discard(self, conn: sqlite3.Connection):
+        try:
+            conn.close()
+        except Exception as e:
+            logger.debug(f"关闭数据库连接失败: {e}")
+        with self._lock:
+            self._created -= 1
+
+    def close(self):
+        """关闭所有空闲连接"""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._created -= 1
@@ -1,8 +1,13 @@
 import sqlite3
 import json
-from datetime import datetime
-from typing import List, Dict, Any, Optional
+import base64
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Iterator, Optional
 from loguru import logger
+from src.utils.log_codec import compress_text, decompress_text, segment_hash
+from src.utils.db_migrations import migrate
+from src.utils.endpoint import finding_identity
+from src.config.settings import settings
 
 class DBRepository:
     """
@@ -10,62 +15,13 @@ class DBRepository:
     """
     def __init__(self, connection_factory):
         self._get_connection = connection_factory
+        self._known_segments = set()
+        self._segment_cache: Dict[str, str] = {}
 
     def init_tables(self):
-        """初始化数据库表结构"""
+        """初始化数据库表结构 (执行版本化迁移)"""
         with self._get_connection() as conn:
-            cursor = conn.cursor()
-            
-            # 1. 项目表
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS projects (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT UNIQUE NOT NULL,
-                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # 2. 漏洞结果表
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS vulnerabilities (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    project_id INTEGER NOT NULL,
-                    request_id TEXT NOT NULL,
-                    vuln_type TEXT NOT NULL,
-                    url TEXT NOT NULL,
-                    method TEXT,
-                    parameter TEXT,
-                    payload TEXT,
-                    evidence TEXT,
-                    full_request TEXT,
-                    severity TEXT DEFAULT 'high',
-                    found_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (project_id) REFERENCES projects (id)
-                )
-            ''')
-            
-            # 自动迁移：检查 full_request 列是否存在
-            cursor.execute("PRAGMA table_info(vulnerabilities)")
-            columns = [column[1] for column in cursor.fetchall()]
-            if 'full_request' not in columns:
-                cursor.execute("ALTER TABLE vulnerabilities ADD COLUMN full_request TEXT")
-                logger.info("数据库迁移：在 vulnerabilities 表中添加了 full_request 列")
-            
-            # 3. Agent 日志表
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS agent_logs (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    project_id INTEGER NOT NULL,
-                    request_id TEXT NOT NULL,
-                    agent_name TEXT NOT NULL,
-                    prompt TEXT,
-                    response TEXT,
-                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (project_id) REFERENCES projects (id)
-                )
-            ''')
-            
-            conn.commit()
+            migrate(conn)
 
     def get_or_create_project(self, name: str) -> int:
         with self._get_connection() as conn:
@@ -83,36 +39,134 @@ class DBRepository:
         with self._get_connection() as conn:
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
-            cursor.execute('''
-                SELECT p.*, 
-                       (SELECT COUNT(*) FROM vulnerabilities v WHERE v.project_id = p.id) as vuln_count,
-                       (SELECT COUNT(*) FROM agent_logs l WHERE l.project_id = p.id) as log_count
-                FROM projects p
-                ORDER BY created_at DESC
-            ''')
+            # vuln_count / log_count 由触发器维护 (见 db_migrations v3)，已标记删除的项目不再展示
+            cursor.execute('SELECT p.* FROM projects p WHERE p.deleted_at IS NULL ORDER BY created_at DESC')
             return [dict(row) for row in cursor.fetchall()]
 
+    # --- 项目删除 (标记后由后台分批清理) ---
+
     def delete_project(self, project_id: int):
+        """标记删除并重命名，释放项目名称供新扫描使用；实际数据由 purge_project_batch 分批清理"""
+        with self._get_connection() as conn:
+            conn.execute('''
+                UPDATE projects SET deleted_at = CURRENT_TIMESTAMP, name = name || '#deleted-' || id
+                WHERE id = ? AND deleted_at IS NULL
+            ''', (project_id,))
+            conn.commit()
+
+    def pending_project_deletions(self) -> List[int]:
+        with self._get_connection() as conn:
+            return [row[0] for row in conn.execute('SELECT id FROM projects WHERE deleted_at IS NOT NULL ORDER BY id')]
+
+    def purge_project_batch(self, project_id: int, batch_size: int) -> tuple:
+        """
+        删除已标记项目的一批数据 (每批一个短事务，不长时间阻塞写入)。
+        子表清空后删除项目本身，返回 (本批删除行数, 需要删除的归档文件路径列表或 None)
+        """
         with self._get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("PRAGMA foreign_keys = ON")
-            cursor.execute('DELETE FROM agent_logs WHERE project_id = ?', (project_id,))
-            cursor.execute('DELETE FROM vulnerabilities WHERE project_id = ?', (project_id,))
+            for table in ("agent_logs", "vulnerabilities", "trace_spans"):
+                cursor.execute(
+                    f'DELETE FROM {table} WHERE id IN (SELECT id FROM {table} WHERE project_id = ? LIMIT ?)',
+                    (project_id, batch_size)
+                )
+                if cursor.rowcount:
+                    conn.commit()
+                    return cursor.rowcount, None
+
+            paths = [row[0] for row in cursor.execute('SELECT DISTINCT path FROM log_archives WHERE project_id = ?', (project_id,))]
+            cursor.execute('DELETE FROM log_archives WHERE project_id = ?', (project_id,))
             cursor.execute('DELETE FROM projects WHERE id = ?', (project_id,))
             conn.commit()
+            return 0, paths
+
+    # --- 日志归档 ---
+
+    def archive_candidates(self, cutoff: str) -> List[int]:
+        """存在早于 cutoff 的日志的项目"""
+        with self._get_connection() as conn:
+            return [row[0] for row in conn.execute('''
+                SELECT p.id FROM projects p
+                WHERE p.deleted_at IS NULL
+                  AND EXISTS (SELECT 1 FROM agent_logs l WHERE l.project_id = p.id AND l.timestamp < ?)
+            ''', (cutoff,))]
+
+    def archive_log_batch(self, project_id: int, cutoff: str, batch_size: int, write_segments) -> int:
+        """
+        归档一批过期日志：在写事务内读取、写出归档段、登记指针并删除原记录，
+        多个进程同时执行时由 IMMEDIATE 事务串行化，不会重复归档。
+        write_segments(rows) 负责写文件并返回指针字典列表。返回本批归档行数。
+        """
+        with self._get_connection() as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                cursor.execute('''
+                    SELECT * FROM agent_logs
+                    WHERE project_id = ? AND timestamp < ?
+                    ORDER BY id
+                    LIMIT ?
+                ''', (project_id, cutoff, batch_size))
+                rows = [self._hydrate_log(cursor, dict(row)) for row in cursor.fetchall()]
+                if not rows:
+                    conn.rollback()
+                    return 0
+
+                segments = write_segments(rows)
+                cursor.executemany('''
+                    INSERT INTO log_archives (project_id, month, path, offset, length, row_count, first_id, last_id, min_ts, max_ts)
+                    VALUES (:project_id, :month, :path, :offset, :length, :row_count, :first_id, :last_id, :min_ts, :max_ts)
+                ''', segments)
+                cursor.executemany('DELETE FROM agent_logs WHERE id = ?', [(row["id"],) for row in rows])
+                cursor.execute(
+                    'UPDATE projects SET archived_log_count = archived_log_count + ? WHERE id = ?',
+                    (len(rows), project_id)
+                )
+                conn.commit()
+                return len(rows)
+            except Exception:
+                conn.rollback()
+                raise
+
+    def list_archive_segments(self, project_id: int, start_month: Optional[str] = None, end_month: Optional[str] = None) -> List[Dict]:
+        where, params = ["project_id = ?"], [project_id]
+        if start_month:
+            where.append("month >= ?")
+            params.append(start_month)
+        if end_month:
+            where.append("month <= ?")
+            params.append(end_month)
+        with self._get_connection() as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            cursor.execute(f'SELECT * FROM log_archives WHERE {" AND ".join(where)} ORDER BY month DESC, id DESC', params)
+            return [dict(row) for row in cursor.fetchall()]
 
-    def save_vulnerability(self, project_id: int, vuln_data: Dict[str, Any]):
+    def save_vulnerability(self, project_id: int, vuln_data: Dict[str, Any]) -> tuple:
+        """
+        按漏洞身份 Upsert：首次发现插入完整记录，重复发现只累加 hit_count 并刷新 last_seen。
+        返回 (漏洞 id, 当前命中次数)。
+        """
         full_request = vuln_data.get("full_request")
         if isinstance(full_request, dict):
             full_request = json.dumps(full_request, ensure_ascii=False)
-            
+        endpoint, fingerprint = finding_identity(
+            vuln_data.get("type"), vuln_data.get("method"), vuln_data.get("url"), vuln_data.get("parameter")
+        )
+
         with self._get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 INSERT INTO vulnerabilities (
                     project_id, request_id, vuln_type, url, method, 
-                    parameter, payload, evidence, full_request, severity
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    parameter, payload, evidence, full_request, severity,
+                    endpoint, fingerprint, last_seen
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT (project_id, fingerprint) DO UPDATE SET
+                    hit_count = hit_count + 1,
+                    last_seen = CURRENT_TIMESTAMP
+                RETURNING id, hit_count
             ''', (
                 project_id,
                 vuln_data.get("request_id"),
@@ -123,46 +177,198 @@ class DBRepository:
                 vuln_data.get("payload"),
                 vuln_data.get("evidence"),
                 full_request,
-                vuln_data.get("severity", "high")
+                vuln_data.get("severity", "high"),
+                endpoint,
+                fingerprint
             ))
+            vuln_id, hit_count = cursor.fetchone()
+            conn.commit()
+            return vuln_id, hit_count
+
+    def add_vulnerability_hits(self, hits: List[tuple]):
+        """批量累加重复发现的命中次数，hits 为 (漏洞 id, 新增次数, 最近发现时间) 列表"""
+        with self._get_connection() as conn:
+            conn.executemany('''
+                UPDATE vulnerabilities
+                SET hit_count = hit_count + ?, last_seen = MAX(COALESCE(last_seen, found_at), ?)
+                WHERE id = ?
+            ''', [(count, last_seen, vuln_id) for vuln_id, count, last_seen in hits])
             conn.commit()
 
+    AGENT_LOG_INSERT = '''
+        INSERT INTO agent_logs (
+            project_id, request_id, agent_name, prompt, response, cache_hit,
+            model, prompt_tokens, completion_tokens, latency_ms, retry_count, cost, endpoint, prompt_manifest
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    '''
+
+    def _pack_prompt(self, cursor, log_data: Dict[str, Any], written: set) -> tuple:
+        """
+        拆分存储 Prompt：可复用的模板片段按哈希写入 prompt_segments (仅一次)，
+        其余变量部分拼接后压缩存入 agent_logs.prompt，并生成用于还原的 manifest。
+        本事务写入的片段哈希加入 written，由调用方在提交成功后记入 _known_segments
+        (事务回滚时片段未落库，下次仍需写入)。
+        返回 (prompt 列的值, manifest JSON)。
+        """
+        segments = log_data.get("prompt_segments")
+        if not segments or not any(shared for shared, _ in segments):
+            return compress_text(log_data.get("prompt")), None
+
+        manifest = []
+        variable_parts = []
+        for shared, text in segments:
+            if shared:
+                digest = segment_hash(text)
+                if digest not in self._known_segments and digest not in written:
+                    cursor.execute(
+                        'INSERT OR IGNORE INTO prompt_segments (hash, content, size) VALUES (?, ?, ?)',
+                        (digest, compress_text(text), len(text))
+                    )
+                    written.add(digest)
+                manifest.append(["s", digest])
+            else:
+                variable_parts.append(text)
+                manifest.append(["v", len(text)])
+        return compress_text("".join(variable_parts)), json.dumps(manifest)
+
+    def _agent_log_params(self, cursor, project_id: int, log_data: Dict[str, Any], written: set) -> tuple:
+        prompt_value, manifest = self._pack_prompt(cursor, log_data, written)
+        return (
+            project_id,
+            log_data.get("task_id"),
+            log_data.get("agent"),
+            prompt_value,
+            compress_text(log_data.get("response")),
+            1 if log_data.get("cache_hit") else 0,
+            log_data.get("model"),
+            log_data.get("prompt_tokens", 0),
+            log_data.get("completion_tokens", 0),
+            log_data.get("latency_ms", 0),
+            log_data.get("retry_count", 0),
+            log_data.get("cost", 0),
+            log_data.get("endpoint"),
+            manifest
+        )
+
     def save_agent_log(self, project_id: int, log_data: Dict[str, Any]):
+        self.save_agent_logs([(project_id, log_data)])
+
+    def save_agent_logs(self, rows: List[tuple]):
+        """批量写入 Agent 日志与全文索引 (单事务)，rows 为 (project_id, log_data) 列表"""
         with self._get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute('''
-                INSERT INTO agent_logs (
-                    project_id, request_id, agent_name, prompt, response
-                ) VALUES (?, ?, ?, ?, ?)
-            ''', (
-                project_id,
-                log_data.get("task_id"),
-                log_data.get("agent"),
-                log_data.get("prompt"),
-                log_data.get("response")
-            ))
+            written = set()
+            params = [self._agent_log_params(cursor, project_id, log_data, written) for project_id, log_data in rows]
+            # 逐条插入以取得每条记录的真实 id (仍在同一事务内)，全文索引的 rowid 与之对应
+            ids = []
+            for row_params in params:
+                cursor.execute(self.AGENT_LOG_INSERT, row_params)
+                ids.append(cursor.lastrowid)
+            if settings.LOG_SEARCH_INDEX_ENABLED:
+                self._index_logs(cursor, zip(ids, (log_data for _, log_data in rows)))
             conn.commit()
+            self._known_segments.update(written)
+
+    @staticmethod
+    def _index_logs(cursor, entries):
+        """为刚插入的日志写入全文索引，entries 为 (id, log_data)。Prompt 只索引变量部分"""
+        docs = []
+        for log_id, log_data in entries:
+            segments = log_data.get("prompt_segments")
+            if segments:
+                prompt = "".join(text for shared, text in segments if not shared)
+            else:
+                prompt = log_data.get("prompt")
+            docs.append((log_id, prompt, log_data.get("response")))
+        cursor.executemany('INSERT INTO agent_logs_fts (rowid, prompt, response) VALUES (?, ?, ?)', docs)
+
+    def backfill_log_index(self, after_id: int, batch_size: int) -> tuple:
+        """
+        为 id > after_id 的一批日志补建缺失的全文索引 (LOG_SEARCH_INDEX_ENABLED 关闭期间写入的日志)。
+        返回 (本批扫描到的最大 id, 补建条数)，没有更多日志时最大 id 为 None。
+        """
+        with self._get_connection() as conn:
+            cursor = conn.cursor()
+            window = cursor.execute(
+                'SELECT id FROM agent_logs WHERE id > ? ORDER BY id LIMIT ?', (after_id, batch_size)
+            ).fetchall()
+            if not window:
+                return None, 0
+            last_id = window[-1][0]
+            rows = cursor.execute('''
+                SELECT id, prompt, response FROM agent_logs l
+                WHERE id > ? AND id <= ? AND NOT EXISTS (SELECT 1 FROM agent_logs_fts f WHERE f.rowid = l.id)
+            ''', (after_id, last_id)).fetchall()
+            if rows:
+                # prompt 列只保存变量部分 (与写入时的索引内容一致)
+                cursor.executemany(
+                    'INSERT INTO agent_logs_fts (rowid, prompt, response) VALUES (?, ?, ?)',
+                    [(row_id, decompress_text(prompt), decompress_text(response)) for row_id, prompt, response in rows]
+                )
+                conn.commit()
+            return last_id, len(rows)
+
+    def _load_segments(self, cursor, hashes: List[str]) -> Dict[str, str]:
+        """读取模板片段 (带进程内缓存，片段内容不可变)，数据库中不存在的片段不在返回结果中"""
+        missing = [h for h in set(hashes) if h not in self._segment_cache]
+        if missing:
+            placeholders = ",".join("?" * len(missing))
+            cursor.execute(f'SELECT hash, content FROM prompt_segments WHERE hash IN ({placeholders})', missing)
+            for digest, content in cursor.fetchall():
+                self._segment_cache[digest] = decompress_text(content)
+        return {h: self._segment_cache[h] for h in hashes if h in self._segment_cache}
 
-    def query_vulnerabilities(self, project_id: Optional[int] = None) -> List[Dict]:
+    def _hydrate_log(self, cursor, row: Dict[str, Any]) -> Dict[str, Any]:
+        """透明还原压缩与去重存储的 Prompt / 响应文本"""
+        manifest = row.pop("prompt_manifest", None)
+        if manifest and "prompt" in row:
+            variable_text = decompress_text(row["prompt"])
+            entries = json.loads(manifest)
+            segments = self._load_segments(cursor, [value for kind, value in entries if kind == "s"])
+            parts, offset, missing = [], 0, []
+            for kind, value in entries:
+                if kind == "s":
+                    if value in segments:
+                        parts.append(segments[value])
+                    else:
+                        # 片段丢失时保留占位标记，避免把残缺的 Prompt 当作完整内容返回
+                        missing.append(value)
+                        parts.append(f"[缺失模板片段 {value}]")
+                else:
+                    parts.append(variable_text[offset:offset + value])
+                    offset += value
+            row["prompt"] = "".join(parts)
+            if missing:
+                row["prompt_missing_segments"] = missing
+                logger.warning(f"Agent 日志 {row.get('id')} 引用的模板片段不存在: {', '.join(missing)}")
+        elif "prompt" in row:
+            row["prompt"] = decompress_text(row["prompt"])
+        if "response" in row:
+            row["response"] = decompress_text(row["response"])
+        return row
+
+    def query_vulnerabilities(self, project_id: Optional[int] = None, limit: Optional[int] = None) -> List[Dict]:
         with self._get_connection() as conn:
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
             if project_id:
                 cursor.execute('''
                     SELECT v.*, p.name as project_name FROM vulnerabilities v
-                    JOIN projects p ON v.project_id = p.id
+                    JOIN projects p ON v.project_id = p.id AND p.deleted_at IS NULL
                     WHERE v.project_id = ?
                     ORDER BY v.found_at DESC
-                ''', (project_id,))
+                    LIMIT ?
+                ''', (project_id, limit or -1))
             else:
                 cursor.execute('''
                     SELECT v.*, p.name as project_name FROM vulnerabilities v
-                    JOIN projects p ON v.project_id = p.id
+                    JOIN projects p ON v.project_id = p.id AND p.deleted_at IS NULL
                     ORDER BY v.found_at DESC
-                ''')
+                    LIMIT ?
+                ''', (limit or -1,))
             return [dict(row) for row in cursor.fetchall()]
 
-    def query_logs(self, project_id: int) -> List[Dict]:
+    def query_logs(self, project_id: int, limit: Optional[int] = None) -> List[Dict]:
         with self._get_connection() as conn:
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
@@ -170,5 +376,386 @@ class DBRepository:
                 SELECT l.* FROM agent_logs l
                 WHERE l.project_id = ?
                 ORDER BY l.timestamp DESC
+                LIMIT ?
+            ''', (project_id, limit or -1))
+            rows = [dict(row) for row in cursor.fetchall()]
+            return [self._hydrate_log(cursor, row) for row in rows]
+
+    # --- 游标分页查询 ---
+
+    LOG_FIELDS = (
+        "id", "project_id", "request_id", "agent_name", "prompt", "response", "cache_hit", "model",
+        "prompt_tokens", "completion_tokens", "latency_ms", "retry_count", "cost", "endpoint", "timestamp"
+    )
+    VULN_FIELDS = (
+        "id", "project_id", "request_id", "vuln_type", "url", "method", "parameter",
+        "payload", "evidence", "full_request", "severity", "found_at", "endpoint", "fingerprint", "hit_count", "last_seen"
+    )
+
+    @staticmethod
+    def encode_cursor(sort_value: Any, row_id: int) -> str:
+        raw = json.dumps([sort_value, row_id], separators=(",", ":")).encode("utf-8")
+        return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> tuple:
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            sort_value, row_id = json.loads(raw)
+            return sort_value, int(row_id)
+        except Exception:
+            raise ValueError(f"无效的分页游标: {cursor}")
+
+    @staticmethod
+    def _normalize_time(value: Optional[str]) -> Optional[str]:
+        """将 ISO 时间转换为库内 CURRENT_TIMESTAMP 的格式 (UTC, 'YYYY-MM-DD HH:MM:SS')"""
+        if not value:
+            return None
+        try:
+            parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            raise ValueError(f"无效的时间格式: {value}")
+        if parsed.tzinfo is not None:
+            parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+        return parsed.strftime("%Y-%m-%d %H:%M:%S")
+
+    @staticmethod
+    def _projection(fields: Optional[List[str]], allowed: tuple, alias: str, sort_column: str) -> List[str]:
+        """字段投影；id 与排序列始终返回，用于生成游标"""
+        if not fields:
+            return [f"{alias}.{name}" for name in allowed]
+        unknown = [name for name in fields if name not in allowed]
+        if unknown:
+            raise ValueError(f"不支持的字段: {', '.join(unknown)}")
+        selected = ["id", sort_column] + [name for name in fields if name not in ("id", sort_column)]
+        return [f"{alias}.{name}" for name in selected]
+
+    def _keyset_page(self, cursor, columns: List[str], table: str, alias: str, joins: str, where: List[str], params: List[Any],
+                     sort_column: str, page_cursor: Optional[str], since: Optional[int], limit: int) -> tuple:
+        """
+        通用键集分页：
+        - 默认按 (排序列, id) 倒序，游标为上一页最后一行的 (排序列, id)
+        - since 模式只返回 id 大于 since 的新数据 (按 id 正序)，游标为下一次请求的 since 值；
+          此时禁用二级索引，按主键范围扫描，耗时只与新增行数相关
+        返回 (行列表, 下一页游标或 None)
+        """
+        source = f"{table} {alias}"
+        if since is not None:
+            source += " NOT INDEXED"
+            where.append(f"{alias}.id > ?")
+            params.append(since)
+            order = f"{alias}.id ASC"
+        else:
+            if page_cursor:
+                sort_value, row_id = self.decode_cursor(page_cursor)
+                where.append(f"({alias}.{sort_column}, {alias}.id) < (?, ?)")
+                params.extend([sort_value, row_id])
+            order = f"{alias}.{sort_column} DESC, {alias}.id DESC"
+
+        sql = f"SELECT {', '.join(columns)} FROM {source}{joins}"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += f" ORDER BY {order} LIMIT ?"
+        params.append(limit + 1)
+
+        cursor.execute(sql, params)
+        rows = [dict(row) for row in cursor.fetchall()]
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = str(last["id"]) if since is not None else self.encode_cursor(last[sort_column], last["id"])
+        return rows, next_cursor
+
+    def page_logs(self, project_id: int, limit: int = 100, cursor: Optional[str] = None, since: Optional[int] = None,
+                  agent: Optional[str] = None, request_id: Optional[str] = None, start: Optional[str] = None,
+                  end: Optional[str] = None, fields: Optional[List[str]] = None) -> tuple:
+        """分页查询项目日志，支持 Agent / 任务 / 时间范围过滤与字段投影"""
+        columns = self._projection(fields, self.LOG_FIELDS, "l", "timestamp")
+        if "l.prompt" in columns:
+            columns.append("l.prompt_manifest")
+        where, params = ["l.project_id = ?"], [project_id]
+        if agent:
+            where.append("l.agent_name = ?")
+            params.append(agent)
+        if request_id:
+            where.append("l.request_id = ?")
+            params.append(request_id)
+        if start:
+            where.append("l.timestamp >= ?")
+            params.append(self._normalize_time(start))
+        if end:
+            where.append("l.timestamp < ?")
+            params.append(self._normalize_time(end))
+
+        with self._get_connection() as conn:
+            conn.row_factory = sqlite3.Row
+            db_cursor = conn.cursor()
+            rows, next_cursor = self._keyset_page(
+                db_cursor, columns, "agent_logs", "l", "", where, params, "timestamp", cursor, since, limit
+            )
+            return [self._hydrate_log(db_cursor, row) for row in rows], next_cursor
+
+    def get_log(self, project_id: int, log_id: int) -> Optional[Dict]:
+        with self._get_connection() as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            cursor.execute('SELECT * FROM agent_logs WHERE id = ? AND project_id = ?', (log_id, project_id))
+            row = cursor.fetchone()
+            return self._hydrate_log(cursor, dict(row)) if row else None
+
+    def page_vulnerabilities(self, project_id: Optional[int] = None, limit: int = 100, cursor: Optional[str] = None,
+                             since: Optional[int] = None, vuln_type: Optional[str] = None, request_id: Optional[str] = None,
+                             start: Optional[str] = None, end: Optional[str] = None, fields: Optional[List[str]] = None) -> tuple:
+        """
+        分页查询漏洞，支持漏洞类型 / 任务 / 时间范围过滤与字段投影。
+        注意 since 模式按 id 增量读取，只包含新发现的漏洞：重复发现在 save_vulnerability 中只累加已有记录的
+        hit_count 并刷新 last_seen，id 不变，因此增量轮询看不到这些命中，需要最新命中次数时应重新读取列表。
+        """
+        columns = self._projection(fields, self.VULN_FIELDS, "v", "found_at") + ["p.name as project_name"]
+        where, params = [], []
+        if project_id:
+            where.append("v.project_id = ?")
+            params.append(project_id)
+        if vuln_type:
+            where.append("v.vuln_type = ?")
+            params.append(vuln_type)
+        if request_id:
+            where.append("v.request_id = ?")
+            params.append(request_id)
+        if start:
+            where.append("v.found_at >= ?")
+            params.append(self._normalize_time(start))
+        if end:
+            where.append("v.found_at < ?")
+            params.append(self._normalize_time(end))
+
+        with self._get_connection() as conn:
+            conn.row_factory = sqlite3.Row
+            return self._keyset_page(
+                conn.cursor(), columns, "vulnerabilities", "v", " JOIN projects p ON v.project_id = p.id AND p.deleted_at IS NULL",
+                where, params, "found_at", cursor, since, limit
+            )
+
+    def iter_vulnerabilities(self, project_id: Optional[int] = None, include_request: bool = False,
+                             include_logs: bool = False, batch_size: int = 500) -> Iterator[Dict]:
+        """
+        逐条产出漏洞 (用于流式导出)：按 id 键集分批读取，每批使用独立的短连接，
+        内存占用与总行数无关，也不会在客户端慢速下载期间长期占用连接池。
+        """
+        columns = [f"v.{name}" for name in self.VULN_FIELDS if include_request or name != "full_request"]
+        last_id = 0
+        while True:
+            where, params = ["v.id > ?"], [last_id]
+            if project_id:
+                where.append("v.project_id = ?")
+                params.append(project_id)
+            params.append(batch_size)
+            with self._get_connection() as conn:
+                conn.row_factory = sqlite3.Row
+                cursor = conn.cursor()
+                cursor.execute(f'''
+                    SELECT {", ".join(columns)}, p.name as project_name FROM vulnerabilities v
+                    JOIN projects p ON v.project_id = p.id AND p.deleted_at IS NULL
+                    WHERE {" AND ".join(where)}
+                    ORDER BY v.id
+                    LIMIT ?
+                ''', params)
+                rows = [dict(row) for row in cursor.fetchall()]
+                if include_logs:
+                    for row in rows:
+                        cursor.execute(
+                            'SELECT * FROM agent_logs WHERE project_id = ? AND request_id = ? ORDER BY id',
+                            (row["project_id"], row["request_id"])
+                        )
+                        row["logs"] = [self._hydrate_log(cursor, dict(log)) for log in cursor.fetchall()]
+            if not rows:
+                return
+            yield from rows
+            last_id = rows[-1]["id"]
+
+    # --- 全文检索 ---
+
+    @staticmethod
+    def fts_query(text: str, raw: bool = False) -> str:
+        """默认把输入当作字面短语 (Payload 中的引号、运算符不会被解析为 FTS 语法)"""
+        if raw:
+            return text
+        return '"' + text.replace('"', '""') + '"'
+
+    def search_logs(self, query: str, project_id: Optional[int] = None, agent: Optional[str] = None,
+                    limit: int = 50, raw: bool = False) -> List[Dict]:
+        """按相关度 (bm25) 检索 Agent 日志的 Prompt 变量部分与响应"""
+        where, params = ["agent_logs_fts MATCH ?"], [self.fts_query(query, raw)]
+        if project_id:
+            where.append("l.project_id = ?")
+            params.append(project_id)
+        if agent:
+            where.append("l.agent_name = ?")
+            params.append(agent)
+        params.append(limit)
+        with self._get_connection() as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            cursor.execute(f'''
+                SELECT l.id, l.request_id, l.agent_name, l.timestamp, p.name as project_name,
+                       snippet(agent_logs_fts, 0, '[[', ']]', '...', 24) as prompt_snippet,
+                       snippet(agent_logs_fts, 1, '[[', ']]', '...', 24) as response_snippet,
+                       bm25(agent_logs_fts) as score
+                FROM agent_logs_fts
+                JOIN agent_logs l ON l.id = agent_logs_fts.rowid
+                JOIN projects p ON p.id = l.project_id AND p.deleted_at IS NULL
+                WHERE {" AND ".join(where)}
+                ORDER BY score
+                LIMIT ?
+            ''', params)
+            return [dict(row) for row in cursor.fetchall()]
+
+    def search_vulnerabilities(self, query: str, project_id: Optional[int] = None, vuln_type: Optional[str] = None,
+                               limit: int = 50, raw: bool = False) -> List[Dict]:
+        """按相关度 (bm25) 检索漏洞证据与 Payload"""
+        where, params = ["vulnerabilities_fts MATCH ?"], [self.fts_query(query, raw)]
+        if project_id:
+            where.append("v.project_id = ?")
+            params.append(project_id)
+        if vuln_type:
+            where.append("v.vuln_type = ?")
+            params.append(vuln_type)
+        params.append(limit)
+        with self._get_connection() as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            cursor.execute(f'''
+                SELECT v.id, v.request_id, v.vuln_type, v.url, v.method, v.parameter, v.severity, v.found_at,
+                       p.name as project_name,
+                       snippet(vulnerabilities_fts, 0, '[[', ']]', '...', 24) as evidence_snippet,
+                       snippet(vulnerabilities_fts, 1, '[[', ']]', '...', 24) as payload_snippet,
+                       bm25(vulnerabilities_fts) as score
+                FROM vulnerabilities_fts
+                JOIN vulnerabilities v ON v.id = vulnerabilities_fts.rowid
+                JOIN projects p ON p.id = v.project_id AND p.deleted_at IS NULL
+                WHERE {" AND ".join(where)}
+                ORDER BY score
+                LIMIT ?
+            ''', params)
+            return [dict(row) for row in cursor.fetchall()]
+
+    # --- LLM 用量统计 ---
+
+    USAGE_GROUP_COLUMNS = {"agent": "agent_name", "model": "model", "task": "request_id"}
+
+    USAGE_AGGREGATES = '''
+        COUNT(*) as calls,
+        COALESCE(SUM(prompt_tokens), 0) as prompt_tokens,
+        COALESCE(SUM(completion_tokens), 0) as completion_tokens,
+        COALESCE(SUM(cost), 0) as cost,
+        COALESCE(AVG(latency_ms), 0) as avg_latency_ms,
+        COALESCE(SUM(latency_ms), 0) as total_latency_ms,
+        COALESCE(SUM(cache_hit), 0) as cache_hits,
+        COALESCE(SUM(retry_count), 0) as retries
+    '''
+
+    def usage_by_project(self) -> List[Dict]:
+        """按项目汇总 LLM 用量"""
+        with self._get_connection() as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            cursor.execute(f'''
+                SELECT p.id as project_id, p.name as project_name, {self.USAGE_AGGREGATES}
+                FROM agent_logs l
+                JOIN projects p ON l.project_id = p.id AND p.deleted_at IS NULL
+                GROUP BY p.id
+                ORDER BY cost DESC, prompt_tokens + completion_tokens DESC
+            ''')
+            return [dict(row) for row in cursor.fetchall()]
+
+    def usage_rollup(self, project_id: int, group_by: str = "agent") -> List[Dict]:
+        """按 Agent / 模型 / 任务汇总指定项目的 LLM 用量"""
+        column = self.USAGE_GROUP_COLUMNS.get(group_by)
+        if column is None:
+            raise ValueError(f"不支持的分组维度: {group_by}")
+        with self._get_connection() as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            cursor.execute(f'''
+                SELECT {column} as {group_by}, {self.USAGE_AGGREGATES}
+                FROM agent_logs
+                WHERE project_id = ?
+                GROUP BY {column}
+                ORDER BY cost DESC, prompt_tokens + completion_tokens DESC
             ''', (project_id,))
             return [dict(row) for row in cursor.fetchall()]
+
+    def top_endpoints_by_cost(self, project_id: int, limit: int = 10) -> List[Dict]:
+        """返回指定项目中 LLM 花费最高的 Top-N 接口模板"""
+        with self._get_connection() as conn:
+            conn.row_factory = sqlite3.Row
+            cursor = conn.cursor()
+            cursor.execute(f'''
+                SELECT endpoint, COUNT(DISTINCT request_id) as tasks, {self.USAGE_AGGREGATES}
+                FROM agent_logs
+                WHERE project_id = ? AND endpoint IS NOT NULL
+                GROUP BY endpoint
+                ORDER BY cost DESC, prompt_tokens + completion_tokens DESC
+                LIMIT ?
+            ''', (project_id, limit))
+            return [dict(row) for row in cursor.fetchall()]
+
+    # --- 任务追踪 ---
+
+    def save_spans(self, rows: List[tuple]):
+        """批量写入追踪 Span (单事务)，rows 为 (project_id, span) 列表"""
+        with self._get_connection() as conn:
+            conn.executemany('''
+                INSERT INTO trace_spans (project_id, trace_id, span_id, parent_id, name, start_time, duration_ms, status, attributes)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', [(
+                project_id, span["trace_id"], span["span_id"], span.get("parent_id"), span["name"],
+                span["start_time"], span["duration_ms"], span.get("status", "ok"),
+                json.dumps(span.get("attributes") or {}, ensure_ascii=False)
+            ) for project_id, span in rows])
+            conn.commit()
+
+    def get_trace(self, trace_id: str) -> List[Dict]:
+        """获取一个任务的全部 Span (按开始时间排序)"""
+        with self._get_connection() as conn:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute('''
+                SELECT trace_id, span_id, parent_id, name, start_time, duration_ms, status, attributes
+                FROM trace_spans WHERE trace_id = ?
+                ORDER BY start_time, id
+            ''', (trace_id,)).fetchall()
+        spans = []
+        for row in rows:
+            span = dict(row)
+            span["attributes"] = json.loads(span["attributes"]) if span["attributes"] else {}
+            spans.append(span)
+        return spans
+
+    def list_traces(self, project_id: int, limit: int = 50, min_duration_ms: float = 0) -> List[Dict]:
+        """列出项目最近的任务追踪 (根 Span)"""
+        with self._get_connection() as conn:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute('''
+                SELECT trace_id, name, start_time, duration_ms, status, attributes
+                FROM trace_spans
+                WHERE project_id = ? AND parent_id IS NULL AND duration_ms >= ?
+                ORDER BY start_time DESC
+                LIMIT ?
+            ''', (project_id, min_duration_ms, limit)).fetchall()
+        traces = []
+        for row in rows:
+            trace = dict(row)
+            trace["attributes"] = json.loads(trace["attributes"]) if trace["attributes"] else {}
+            traces.append(trace)
+        return traces
+
+    def purge_spans(self, before: float, batch_size: int) -> int:
+        """删除一批早于 before (Unix 秒) 的 Span，返回删除行数"""
+        with self._get_connection() as conn:
+            cursor = conn.execute(
+                'DELETE FROM trace_spans WHERE id IN (SELECT id FROM trace_spans WHERE start_time < ? LIMIT ?)',
+                (before, batch_size)
+            )
+            conn.commit()
+            return cursor.rowcount
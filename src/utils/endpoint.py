@@ -0,0 +1,48 @@
+import hashlib
+import re
+from urllib.parse import parse_qsl, urlparse
+
+_UUID_RE = re.compile(r"^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$")
+_HEX_ID_RE = re.compile(r"^[0-9a-fA-F]{16,}$")
+
+def endpoint_template(method: str, url: str) -> str:
+    """
+    将请求归一化为接口模板 (例如 GET example.com/api/user/{id})：
+    去掉 Query 与 Fragment，并把数字、UUID、长哈希等路径段替换为 {id}
+    """
+    if not url:
+        return f"{(method or 'GET').upper()} "
+    parsed = urlparse(url if "://" in url else f"http://{url}")
+    segments = []
+    for part in parsed.path.split("/"):
+        if part.isdigit() or _UUID_RE.match(part) or _HEX_ID_RE.match(part):
+            segments.append("{id}")
+        else:
+            segments.append(part)
+    path = "/".join(segments) or "/"
+    return f"{(method or 'GET').upper()} {parsed.netloc}{path}"
+
+def _normalize_parameter(parameter, url: str = None) -> str:
+    """
+    参数名归一化：去掉策略生成的 {{...}} 占位符包裹与首尾空白并转为小写。
+    分析器有时报告的是参数值 (如 {{1111}})，若能在 Query 中找到对应的值则还原为参数名。
+    """
+    text = str(parameter or "").strip()
+    if text.startswith("{{") and text.endswith("}}"):
+        text = text[2:-2].strip()
+    if text and url:
+        query = parse_qsl(urlparse(url if "://" in url else f"http://{url}").query, keep_blank_values=True)
+        if text.lower() not in {name.lower() for name, _ in query}:
+            for name, value in query:
+                if value == text:
+                    return name.lower()
+    return text.lower()
+
+def finding_identity(vuln_type: str, method: str, url: str, parameter) -> tuple:
+    """
+    漏洞身份：(漏洞类型, 方法, 接口模板, 参数)。
+    返回 (接口模板, 指纹)，同一项目内指纹相同的发现视为同一漏洞。
+    """
+    endpoint = endpoint_template(method, url)
+    key = "\x1f".join([(vuln_type or "").strip().lower(), endpoint, _normalize_parameter(parameter, url)])
+    return endpoint, hashlib.sha1(key.encode("utf-8")).hexdigest()
@@ -0,0 +1,138 @@
+"""
+漏洞流式导出：所有格式均逐条生成文本片段，不在内存中拼接完整结果，
+可直接作为 StreamingResponse 的迭代器或逐块写入文件。
+"""
+import io
+import csv
+import json
+import time
+from typing import Any, Dict, Iterable, Iterator
+
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "sarif": ("application/sarif+json", "sarif"),
+}
+
+CSV_COLUMNS = [
+    "id", "project_name", "vuln_type", "severity", "method", "url", "endpoint", "parameter",
+    "payload", "evidence", "request_id", "found_at", "last_seen", "hit_count"
+]
+
+_SARIF_LEVELS = {"critical": "error", "high": "error", "medium": "warning", "low": "note", "info": "note"}
+
+def _parse_request(value: Any) -> Any:
+    """full_request 以 JSON 字符串存储，导出为结构化对象 (无法解析时保持原样)"""
+    if isinstance(value, str):
+        try:
+            return json.loads(value)
+        except ValueError:
+            return value
+    return value
+
+def _prepare(row: Dict[str, Any]) -> Dict[str, Any]:
+    row.pop("project_id", None)
+    if "full_request" in row:
+        row["full_request"] = _parse_request(row["full_request"])
+    return row
+
+def iter_ndjson(rows: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    for row in rows:
+        yield json.dumps(_prepare(row), ensure_ascii=False) + "\n"
+
+def iter_csv(rows: Iterable[Dict[str, Any]], include_request: bool = False, include_logs: bool = False) -> Iterator[str]:
+    """CSV 导出；完整请求与关联日志以 JSON 字符串写入单独的列"""
+    columns = CSV_COLUMNS + (["full_request"] if include_request else []) + (["logs"] if include_logs else [])
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush() -> str:
+        text = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+        return text
+
+    # 写入 BOM，保证 Excel 正确识别中文
+    writer.writerow(columns)
+    yield "\ufeff" + flush()
+    for row in rows:
+        values = []
+        for column in columns:
+            value = row.get(column)
+            if column == "logs":
+                value = json.dumps(value or [], ensure_ascii=False)
+            values.append("" if value is None else value)
+        writer.writerow(values)
+        yield flush()
+
+def _sarif_result(row: Dict[str, Any]) -> Dict[str, Any]:
+    row = _prepare(row)
+    parameter = row.get("parameter") or "N/A"
+    properties = {
+        "project": row.get("project_name"),
+        "method": row.get("method"),
+        "parameter": row.get("parameter"),
+        "payload": row.get("payload"),
+        "evidence": row.get("evidence"),
+        "request_id": row.get("request_id"),
+        "found_at": row.get("found_at"),
+        "last_seen": row.get("last_seen"),
+        "hit_count": row.get("hit_count"),
+        "severity": row.get("severity"),
+    }
+    if "full_request" in row:
+        properties["full_request"] = row["full_request"]
+    if "logs" in row:
+        properties["logs"] = row["logs"]
+    return {
+        "ruleId": row.get("vuln_type"),
+        "level": _SARIF_LEVELS.get((row.get("severity") or "").lower(), "warning"),
+        "message": {"text": f"{row.get('vuln_type')} ({row.get('method') or 'GET'} {row.get('url')}, 参数: {parameter})"},
+        "locations": [{"physicalLocation": {"artifactLocation": {"uri": row.get("url")}}}],
+        "partialFingerprints": {"findingIdentity": str(row.get("fingerprint") or row.get("id"))},
+        "properties": properties,
+    }
+
+def iter_sarif(rows: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    """SARIF 2.1.0：先输出文档头，再逐条输出 results 数组元素"""
+    yield (
+        '{"$schema": "https://json.schemastore.org/sarif-2.1.0.json", "version": "2.1.0", '
+        '"runs": [{"tool": {"driver": {"name": "AegisX"}}, "results": [\n'
+    )
+    first = True
+    for row in rows:
+        yield ("" if first else ",\n") + json.dumps(_sarif_result(row), ensure_ascii=False)
+        first = False
+    yield "\n]}]}\n"
+
+def iter_export(rows: Iterable[Dict[str, Any]], fmt: str, include_request: bool = False, include_logs: bool = False) -> Iterator[str]:
+    if fmt == "ndjson":
+        return iter_ndjson(rows)
+    if fmt == "csv":
+        return iter_csv(rows, include_request, include_logs)
+    if fmt == "sarif":
+        return iter_sarif(rows)
+    raise ValueError(f"不支持的导出格式: {fmt} (可选: {', '.join(EXPORT_FORMATS)})")
+
+def buffered(parts: Iterable[str], min_size: int = 64 * 1024, max_delay: float = 0.5) -> Iterator[bytes]:
+    """
+    将细小的文本片段合并为较大的字节块，减少流式响应的分块数量。
+    第一个片段 (文件头 / SARIF 文档头或首行) 立即发出，之后按大小或 max_delay 秒合并，客户端不必等到凑满一块。
+    """
+    chunk, size = [], 0
+    first = True
+    last_flush = time.monotonic()
+    for part in parts:
+        data = part.encode("utf-8")
+        if first:
+            first = False
+            yield data
+            continue
+        chunk.append(data)
+        size += len(data)
+        if size >= min_size or time.monotonic() - last_flush >= max_delay:
+            yield b"".join(chunk)
+            chunk, size = [], 0
+            last_flush = time.monotonic()
+    if chunk:
+        yield b"".join(chunk)
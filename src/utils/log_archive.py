@@ -0,0 +1,117 @@
+import os
+import gzip
+import json
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+from loguru import logger
+from src.config.settings import settings
+
+class LogArchiver:
+    """
+    Agent 日志分层保留：
+    1. 超过 LOG_RETENTION_DAYS 的日志按 项目/月份 追加写入 JSONL.gz (每次归档一个独立 gzip 段)
+    2. 段的文件偏移与长度登记在 log_archives 表中，检索时只需解压相关段
+    3. 原记录在同一事务内删除，数据库只保留近期的热数据
+    """
+    def __init__(self, archive_dir: str = None):
+        base_dir = Path(__file__).resolve().parent.parent.parent
+        archive_dir = Path(archive_dir or settings.LOG_ARCHIVE_DIR)
+        self.archive_dir = archive_dir if archive_dir.is_absolute() else base_dir / archive_dir
+
+    def _segment_path(self, project_id: int, month: str) -> Path:
+        return self.archive_dir / str(project_id) / f"{month}.jsonl.gz"
+
+    def write_segments(self, project_id: int, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """按月份分组，向归档文件追加 gzip 段并落盘，返回 log_archives 指针记录"""
+        by_month: Dict[str, List[Dict[str, Any]]] = {}
+        for row in rows:
+            by_month.setdefault(str(row.get("timestamp") or "")[:7] or "unknown", []).append(row)
+
+        segments = []
+        for month, month_rows in by_month.items():
+            path = self._segment_path(project_id, month)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            payload = "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in month_rows).encode("utf-8")
+            data = gzip.compress(payload, compresslevel=6)
+            with open(path, "ab") as f:
+                offset = f.tell()
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            segments.append({
+                "project_id": project_id,
+                "month": month,
+                "path": str(path.relative_to(self.archive_dir)),
+                "offset": offset,
+                "length": len(data),
+                "row_count": len(month_rows),
+                "first_id": month_rows[0]["id"],
+                "last_id": month_rows[-1]["id"],
+                "min_ts": min(row["timestamp"] for row in month_rows),
+                "max_ts": max(row["timestamp"] for row in month_rows),
+            })
+        return segments
+
+    def run(self, retention_days: int = None, batch_size: int = None, should_stop=None) -> int:
+        """归档所有项目中过期的日志，返回归档行数"""
+        from src.utils.db_helper import db_helper
+        retention_days = settings.LOG_RETENTION_DAYS if retention_days is None else retention_days
+        if retention_days <= 0:
+            return 0
+        batch_size = batch_size or settings.DB_DELETE_BATCH_SIZE
+        cutoff = (datetime.now(timezone.utc) - timedelta(days=retention_days)).strftime("%Y-%m-%d %H:%M:%S")
+
+        total = 0
+        for project_id in db_helper.repo.archive_candidates(cutoff):
+            while not (should_stop and should_stop()):
+                archived = db_helper.repo.archive_log_batch(
+                    project_id, cutoff, batch_size, lambda rows: self.write_segments(project_id, rows)
+                )
+                if not archived:
+                    break
+                total += archived
+        if total:
+            logger.info(f"日志归档完成：{total} 条早于 {cutoff} 的日志已移入 {self.archive_dir}")
+        return total
+
+    def read_segment(self, segment: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        with open(self.archive_dir / segment["path"], "rb") as f:
+            f.seek(segment["offset"])
+            data = f.read(segment["length"])
+        for line in gzip.decompress(data).decode("utf-8").splitlines():
+            if line:
+                yield json.loads(line)
+
+    def search(self, segments: List[Dict[str, Any]], query: str, agent: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """按需检索归档日志 (不区分大小写的子串匹配)，按段的时间倒序扫描"""
+        needle = query.lower()
+        hits = []
+        for segment in segments:
+            try:
+                rows = list(self.read_segment(segment))
+            except (OSError, ValueError) as e:
+                logger.warning(f"读取归档段失败 {segment['path']}@{segment['offset']}: {e}")
+                continue
+            for row in reversed(rows):
+                if agent and row.get("agent_name") != agent:
+                    continue
+                prompt, response = row.get("prompt") or "", row.get("response") or ""
+                if needle in prompt.lower() or needle in response.lower():
+                    row["archive"] = {"month": segment["month"], "path": segment["path"]}
+                    hits.append(row)
+                    if len(hits) >= limit:
+                        return hits
+        return hits
+
+    def remove_files(self, paths: List[str]):
+        for path in paths:
+            try:
+                file_path = self.archive_dir / path
+                file_path.unlink(missing_ok=True)
+                if file_path.parent.exists() and not any(file_path.parent.iterdir()):
+                    file_path.parent.rmdir()
+            except OSError as e:
+                logger.warning(f"删除归档文件失败 {path}: {e}")
+
+log_archiver = LogArchiver()
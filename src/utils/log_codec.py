@@ -0,0 +1,30 @@
+import zlib
+import hashlib
+from typing import Any, Optional, Union
+from src.config.settings import settings
+
+# 压缩数据的标识前缀，用于在读取时区分 BLOB 与普通文本
+_ZLIB_MAGIC = b"Z1"
+
+def compress_text(text: Optional[str]) -> Optional[Union[str, bytes]]:
+    """超过 LOG_COMPRESS_MIN_BYTES 的文本压缩为 BLOB，短文本保持原样"""
+    if text is None:
+        return None
+    raw = text.encode("utf-8")
+    if len(raw) < settings.LOG_COMPRESS_MIN_BYTES:
+        return text
+    return _ZLIB_MAGIC + zlib.compress(raw, 6)
+
+def decompress_text(value: Any) -> Optional[str]:
+    """还原 compress_text 的结果，兼容未压缩的历史数据"""
+    if value is None:
+        return None
+    if isinstance(value, (bytes, memoryview)):
+        value = bytes(value)
+        if value.startswith(_ZLIB_MAGIC):
+            return zlib.decompress(value[len(_ZLIB_MAGIC):]).decode("utf-8")
+        return value.decode("utf-8", errors="replace")
+    return value
+
+def segment_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
@@ -0,0 +1,133 @@
+import sys
+import json
+import time
+import atexit
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional
+import redis
+from src.config.settings import settings
+
+class RedisLogShipper:
+    """
+    实时日志后台发送器 (替代逐条同步 PUBLISH 的 loguru sink)：
+    1. sink 只把记录放入内存缓冲区，日志调用方不做任何网络 I/O
+    2. 后台线程按批次发送：先通过 pipeline XADD 到定长 Stream 供新客户端回放，再一次 PUBLISH 推送整批 (JSON 数组)，
+       推送的每条日志带有其 Stream ID，订阅端据此对回放与实时日志去重
+    3. Redis 不可用时缓冲区满则丢弃最旧记录，按指数退避重连，恢复后补发一条丢弃提示
+    """
+    def __init__(self, channel: str = "webagent:logs", stream_key: str = "webagent:logs:stream"):
+        self.channel = channel
+        self.stream_key = stream_key
+        self._buffer: deque = deque(maxlen=settings.LOG_SHIP_BUFFER)
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._client: Optional[redis.Redis] = None
+        self._lost = 0
+        self.component = "api"
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="log-shipper", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def sink(self, message):
+        """loguru sink：仅构建精简记录并入队"""
+        record = message.record
+        extra = record["extra"]
+        if len(self._buffer) == self._buffer.maxlen:
+            self._lost += 1
+        # 前端需要的字段 (project / request_id 由 logger.contextualize 注入)
+        self._buffer.append({
+            "time": record["time"].strftime("%H:%M:%S"),
+            "level": record["level"].name,
+            "levelno": record["level"].no,
+            "content": record["message"],
+            "component": extra.get("component", self.component),
+            "project": extra.get("project"),
+            "request_id": extra.get("request_id"),
+            "worker": extra.get("worker"),
+        })
+        if len(self._buffer) >= settings.LOG_SHIP_BATCH_SIZE:
+            self._wake.set()
+
+    def _drain(self) -> List[Dict[str, Any]]:
+        batch = []
+        try:
+            while len(batch) < settings.LOG_SHIP_BATCH_SIZE:
+                batch.append(self._buffer.popleft())
+        except IndexError:
+            pass
+        return batch
+
+    def _lost_marker(self, lost: int) -> Dict[str, Any]:
+        return {
+            "time": time.strftime("%H:%M:%S"),
+            "level": "WARNING",
+            "levelno": 30,
+            "content": f"实时日志通道不可用期间丢弃了 {lost} 条日志",
+            "component": self.component,
+            "dropped": lost,
+        }
+
+    def _send(self, batch: List[Dict[str, Any]]):
+        if self._client is None:
+            self._client = redis.from_url(
+                settings.REDIS_URL, decode_responses=True, socket_timeout=2, socket_connect_timeout=2
+            )
+        # 已写入 Stream 的记录带有 id，PUBLISH 失败重试时不会重复写入
+        unsaved = [entry for entry in batch if "id" not in entry]
+        if unsaved:
+            pipe = self._client.pipeline(transaction=False)
+            for entry in unsaved:
+                pipe.xadd(self.stream_key, {"data": json.dumps(entry, ensure_ascii=False)},
+                          maxlen=settings.LOG_STREAM_MAXLEN, approximate=True)
+            for entry, stream_id in zip(unsaved, pipe.execute()):
+                entry["id"] = stream_id
+        self._client.publish(self.channel, json.dumps(batch, ensure_ascii=False))
+
+    def _loop(self):
+        delay, retry_at = 0.0, 0.0
+        while True:
+            self._wake.wait(timeout=settings.LOG_SHIP_INTERVAL)
+            self._wake.clear()
+            stopping = self._stop.is_set()
+            if time.monotonic() < retry_at and not stopping:
+                continue
+            while self._buffer:
+                batch = self._drain()
+                lost, self._lost = self._lost, 0
+                try:
+                    self._send(([self._lost_marker(lost)] if lost else []) + batch)
+                    delay = 0.0
+                except (redis.RedisError, OSError) as e:
+                    # 不能通过 loguru 记录 (会再次进入本 sink)，只在首次失败时写 stderr
+                    if not delay:
+                        sys.stderr.write(f"实时日志发送失败，进入退避重试: {e}\n")
+                    delay = min(max(delay * 2, 1.0), 30.0)
+                    retry_at = time.monotonic() + delay
+                    self._client = None
+                    # 退回缓冲区头部等待重试，缓冲区已满时最旧的记录计入丢弃
+                    self._lost += lost
+                    for entry in reversed(batch):
+                        if len(self._buffer) == self._buffer.maxlen:
+                            self._lost += 1
+                        else:
+                            self._buffer.appendleft(entry)
+                    break
+            if stopping:
+                return
+
+    def close(self, timeout: float = 2.0):
+        """进程退出前尽量发送剩余日志"""
+        if not self._thread or not self._thread.is_alive():
+            return
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout)
+
+log_shipper = RedisLogShipper()
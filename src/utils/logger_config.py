@@ -1,10 +1,35 @@
 import os
-import json
+import itertools
 from loguru import logger
-from src.utils.redis_helper import redis_helper
+from src.utils.log_shipper import log_shipper
+from src.config.settings import settings
+from src.utils.runtime_config import runtime_config
 
-def setup_logging(level="DEBUG"):
-    """配置日志输出到控制台、文件和 Redis"""
+# 热路径使用的惰性 logger：参数为可调用对象，只有日志级别启用时才会格式化。
+# 复用同一个实例，避免每次调用 opt() 创建新的 Logger 对象
+lazy_logger = logger.opt(lazy=True)
+
+class ProbeSampler:
+    """逐个探测日志的采样器：按 LOG_PROBE_SAMPLE_RATE 每 N 次记录一次 (计数器采样，无随机数开销)"""
+    def __init__(self, rate: float = None):
+        self.set_rate(settings.LOG_PROBE_SAMPLE_RATE if rate is None else rate)
+        self._counter = itertools.count(1)
+
+    def set_rate(self, rate: float):
+        self.every = max(1, round(1 / rate)) if rate > 0 else 0
+
+    def sample(self) -> bool:
+        return self.every > 0 and next(self._counter) % self.every == 0
+
+probe_sampler = ProbeSampler()
+runtime_config.add_listener(lambda _: probe_sampler.set_rate(settings.LOG_PROBE_SAMPLE_RATE), keys={"LOG_PROBE_SAMPLE_RATE"})
+
+def setup_logging(level: str = None, component: str = "api"):
+    """
+    配置日志输出到控制台、文件和 Redis，级别默认取 LOG_LEVEL。
+    component 标识当前进程 (api / runner ...)，随实时日志推送，供前端按组件过滤。
+    """
+    level = level or settings.LOG_LEVEL
     # 移除所有默认处理器
     logger.remove()
     
@@ -30,20 +55,10 @@ def setup_logging(level="DEBUG"):
         enqueue=True
     )
     
-    # 3. Redis Sink 用于前端实时日志显示
-    def redis_sink(message):
-        try:
-            record = message.record
-            # 构建简化的 JSON 格式推送给前端
-            payload = {
-                "time": record["time"].strftime("%H:%M:%S"),
-                "level": record["level"].name,
-                "content": record["message"]
-            }
-            redis_helper.publish_log(json.dumps(payload))
-        except Exception:
-            pass
-
-    logger.add(redis_sink, level=level)
+    # 3. Redis 实时日志 (后台线程批量发送，日志调用方不做网络 I/O)
+    # 实时通道只推送 LOG_STREAM_LEVEL 及以上级别，避免逐个探测的 DEBUG 日志淹没 Redis 与浏览器
+    log_shipper.component = component
+    logger.add(log_shipper.sink, level=settings.LOG_STREAM_LEVEL)
+    log_shipper.start()
     
     logger.info(f"日志系统初始化完成 (级别: {level})")
@@ -0,0 +1,100 @@
+import time
+import threading
+from typing import Optional
+from loguru import logger
+from src.config.settings import settings
+from src.utils.log_archive import log_archiver
+
+class MaintenanceWorker:
+    """
+    数据库后台维护线程 (运行于组件监管进程，多个 API worker 不会重复执行归档与清理；API 删除项目后通过监管命令 wake_maintenance 唤醒)：
+    1. 分批清理已标记删除的项目，每批一个短事务，批次之间让出写锁
+    2. 按 RETENTION_INTERVAL 周期性归档过期日志，并删除过期的追踪 Span
+    3. 同一周期内为 LOG_SEARCH_INDEX_ENABLED 关闭期间写入的日志补建全文索引
+    """
+    def __init__(self, batch_pause: float = 0.05):
+        self.batch_pause = batch_pause
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # 已确认建立全文索引的日志 id 上界，进程重启后从头扫描一遍
+        self._indexed_upto = 0
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="db-maintenance", daemon=True)
+        self._thread.start()
+
+    def wake(self):
+        """有新的删除请求时立即处理"""
+        self._wake.set()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _loop(self):
+        next_retention = time.monotonic()
+        while not self._stop.is_set():
+            try:
+                self.purge_deleted_projects()
+                if time.monotonic() >= next_retention:
+                    log_archiver.run(should_stop=self._stop.is_set)
+                    self.purge_expired_spans()
+                    self.backfill_log_index()
+                    next_retention = time.monotonic() + settings.RETENTION_INTERVAL
+            except Exception as e:
+                logger.error(f"数据库维护任务异常: {e}")
+            self._wake.wait(timeout=max(1.0, next_retention - time.monotonic()))
+            self._wake.clear()
+
+    def purge_deleted_projects(self):
+        from src.utils.db_helper import db_helper
+        for project_id in db_helper.repo.pending_project_deletions():
+            deleted = 0
+            while not self._stop.is_set():
+                count, archive_paths = db_helper.repo.purge_project_batch(project_id, settings.DB_DELETE_BATCH_SIZE)
+                deleted += count
+                if archive_paths is not None:
+                    log_archiver.remove_files(archive_paths)
+                    logger.info(f"项目 {project_id} 已清理完成 (共删除 {deleted} 行)")
+                    break
+                time.sleep(self.batch_pause)
+
+    def purge_expired_spans(self):
+        """追踪数据与日志使用相同的保留天数，超期直接删除 (不归档)"""
+        if settings.LOG_RETENTION_DAYS <= 0:
+            return
+        from src.utils.db_helper import db_helper
+        before = time.time() - settings.LOG_RETENTION_DAYS * 86400
+        deleted = 0
+        while not self._stop.is_set():
+            count = db_helper.repo.purge_spans(before, settings.DB_DELETE_BATCH_SIZE)
+            deleted += count
+            if count < settings.DB_DELETE_BATCH_SIZE:
+                break
+            time.sleep(self.batch_pause)
+        if deleted:
+            logger.info(f"已删除 {deleted} 个过期追踪 Span")
+
+    def backfill_log_index(self):
+        """索引开启时分批补建缺失的日志全文索引；关闭期间不推进进度，重新开启后自然补齐"""
+        if not settings.LOG_SEARCH_INDEX_ENABLED:
+            return
+        from src.utils.db_helper import db_helper
+        indexed = 0
+        while not self._stop.is_set() and settings.LOG_SEARCH_INDEX_ENABLED:
+            last_id, count = db_helper.repo.backfill_log_index(self._indexed_upto, settings.DB_DELETE_BATCH_SIZE)
+            if last_id is None:
+                break
+            self._indexed_upto = last_id
+            indexed += count
+            time.sleep(self.batch_pause)
+        if indexed:
+            logger.info(f"已为 {indexed} 条日志补建全文索引")
+
+maintenance_worker = MaintenanceWorker()
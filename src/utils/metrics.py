@@ -0,0 +1,296 @@
+"""
+进程内指标 (Prometheus 文本格式)：
+1. 各进程 (拦截器 / 运行器 / API) 在本进程注册表中累加计数器、仪表与直方图，热路径上只有一次加锁的字典更新
+2. 后台线程按 METRICS_FLUSH_INTERVAL 将快照原子写入 METRICS_DIR/<component>.json
+3. API 合并本进程与各快照文件 (按 process 标签区分来源进程)，渲染为 /api/metrics，无需任何外部服务
+"""
+import os
+import json
+import time
+import atexit
+import bisect
+import functools
+import threading
+import inspect
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from src.config.settings import settings
+from src.utils.tracing import tracer
+from src.utils.progress import progress
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            samples = [[list(key), value] for key, value in self._values.items()]
+        return {"type": self.type, "help": self.help, "labels": list(self.labelnames), "samples": samples}
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+class Gauge(_Metric):
+    type = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # [各桶计数 (非累积，最后一个为 +Inf), 总和, 总数]
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            samples = [[list(key), [list(state[0]), state[1], state[2]]] for key, state in self._values.items()]
+        data = {"type": self.type, "help": self.help, "labels": list(self.labelnames), "samples": samples}
+        data["buckets"] = list(self.buckets)
+        return data
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+        self._exporter: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.component: Optional[str] = None
+
+    def _register(self, cls, name: str, help: str, labelnames: Sequence[str], **kwargs) -> Any:
+        """按名称获取或创建指标，同名指标在多个模块中定义时共享同一实例"""
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help, labelnames, **kwargs)
+            return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter, name, help, labelnames)
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge, name, help, labelnames)
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, help, labelnames, buckets=buckets)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {
+            "component": self.component,
+            "pid": os.getpid(),
+            "updated": time.time(),
+            "metrics": {metric.name: metric.snapshot() for metric in metrics},
+        }
+
+    @staticmethod
+    def metrics_dir() -> Path:
+        path = Path(settings.METRICS_DIR)
+        return path if path.is_absolute() else Path(__file__).resolve().parent.parent.parent / path
+
+    def write_snapshot(self):
+        """原子写入快照文件 (先写临时文件再替换)，读取方不会读到半个文件"""
+        if not self.component:
+            return
+        directory = self.metrics_dir()
+        directory.mkdir(parents=True, exist_ok=True)
+        target = directory / f"{self.component}.json"
+        tmp = directory / f".{self.component}.{os.getpid()}.tmp"
+        tmp.write_text(json.dumps(self.snapshot()), encoding="utf-8")
+        os.replace(tmp, target)
+
+    def start_exporter(self, component: str):
+        """启动快照导出线程 (每个进程调用一次)"""
+        self.component = component
+        if self._exporter and self._exporter.is_alive():
+            return
+        self._stop.clear()
+        self._exporter = threading.Thread(target=self._export_loop, name="metrics-exporter", daemon=True)
+        self._exporter.start()
+        atexit.register(self.stop_exporter)
+
+    def _export_loop(self):
+        while not self._stop.wait(settings.METRICS_FLUSH_INTERVAL):
+            try:
+                self.write_snapshot()
+            except OSError:
+                pass
+
+    def stop_exporter(self, remove: bool = False):
+        """停止导出线程；remove 为 True 时删除本进程的快照文件 (用于按 PID 命名、退出后不再复用的组件)"""
+        if self._exporter and self._exporter.is_alive():
+            self._stop.set()
+            self._exporter.join(2.0)
+            try:
+                if remove and self.component:
+                    (self.metrics_dir() / f"{self.component}.json").unlink(missing_ok=True)
+                else:
+                    self.write_snapshot()
+            except OSError:
+                pass
+
+    def collect_snapshots(self, include_self: bool = True) -> List[Dict[str, Any]]:
+        """
+        读取其他进程的快照文件 (本进程的数据直接取内存)。
+        超过 METRICS_SNAPSHOT_TTL 未更新的文件 (进程被强制结束、未能自行清理) 直接删除。
+        """
+        snapshots = [self.snapshot()] if include_self else []
+        directory = self.metrics_dir()
+        if not directory.exists():
+            return snapshots
+        now = time.time()
+        for path in sorted(directory.glob("*.json")):
+            if include_self and path.stem == self.component:
+                continue
+            try:
+                snapshot = json.loads(path.read_text(encoding="utf-8"))
+                if now - snapshot.get("updated", 0) > settings.METRICS_SNAPSHOT_TTL:
+                    path.unlink(missing_ok=True)
+                    continue
+                snapshots.append(snapshot)
+            except (OSError, ValueError):
+                continue
+        return snapshots
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Iterable[str], values: Iterable[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+def render(snapshots: List[Dict[str, Any]]) -> str:
+    """
+    合并多个进程的快照并渲染为 Prometheus 文本格式。
+    每个快照的样本附加 process 标签 (快照的组件名) 而不是跨进程相加：进程退出后其序列消失，
+    不会让合计的计数器回落 (Prometheus 会将回落误判为计数器重置)，聚合交给 PromQL 的 sum。
+    """
+    merged: Dict[str, Dict[str, Any]] = {}
+    for snapshot in snapshots:
+        process = snapshot.get("component")
+        for name, metric in snapshot.get("metrics", {}).items():
+            labelnames = list(metric["labels"]) + (["process"] if process else [])
+            target = merged.setdefault(name, {**metric, "labels": labelnames, "samples": {}})
+            if metric.get("buckets") != target.get("buckets") or labelnames != target["labels"]:
+                continue
+            for labels, value in metric["samples"]:
+                key = tuple(labels) + ((process,) if process else ())
+                current = target["samples"].get(key)
+                if metric["type"] == "histogram":
+                    if current is None:
+                        target["samples"][key] = [list(value[0]), value[1], value[2]]
+                    else:
+                        current[0] = [a + b for a, b in zip(current[0], value[0])]
+                        current[1] += value[1]
+                        current[2] += value[2]
+                else:
+                    target["samples"][key] = (current or 0.0) + value
+
+    lines = []
+    for name in sorted(merged):
+        metric = merged[name]
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        labelnames = metric["labels"]
+        for key in sorted(metric["samples"]):
+            value = metric["samples"][key]
+            if metric["type"] != "histogram":
+                lines.append(f"{name}{_labels(labelnames, key)} {_format_value(value)}")
+                continue
+            counts, total, count = value
+            cumulative = 0
+            for bound, bucket_count in zip(list(metric["buckets"]) + [float("inf")], counts):
+                cumulative += bucket_count
+                lines.append(f"{name}_bucket{_labels(labelnames, key, ('le', _format_value(bound)))} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labelnames, key)} {_format_value(total)}")
+            lines.append(f"{name}_count{_labels(labelnames, key)} {count}")
+    return "\n".join(lines) + "\n"
+
+metrics = MetricsRegistry()
+
+GRAPH_NODE_SECONDS = metrics.histogram(
+    "aegisx_graph_node_duration_seconds", "LangGraph 节点执行耗时", ["graph", "node"]
+)
+
+def instrument_node(graph: str, node: str, func: Callable) -> Callable:
+    """包装图节点函数，记录执行耗时、开启节点 Span 并上报任务进度 (保留原函数签名，LangGraph 依赖签名注入 config 等参数)"""
+    span_name = f"{graph}.{node}"
+    retry_field = f"{graph}_retry_count"
+
+    def report(args):
+        # 子图状态中的 <graph>_retry_count 即当前轮次 (从 0 开始)
+        state = args[0] if args and isinstance(args[0], dict) else {}
+        if retry_field in state:
+            progress.update(node=span_name, round=(state[retry_field] or 0) + 1)
+        else:
+            progress.update(node=span_name)
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            report(args)
+            with GRAPH_NODE_SECONDS.time(graph=graph, node=node), tracer.span(span_name):
+                return await func(*args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        report(args)
+        with GRAPH_NODE_SECONDS.time(graph=graph, node=node), tracer.span(span_name):
+            return func(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,220 @@
+"""
+按需性能剖析 (运行器 / API 进程内)，无需重启进程：
+1. sample: 纯 Python 栈采样器，后台线程按 PROFILE_SAMPLE_INTERVAL 读取各线程栈，输出折叠栈 (flamegraph.pl / speedscope 可直接导入)
+2. cprofile: 在事件循环线程上开启 cProfile，输出 .prof (pstats / snakeviz) 与按累计耗时排序的文本
+3. memory: tracemalloc 起止快照，输出增长最多的分配位置
+会话结束后结果写入 PROFILE_DIR，未开启剖析时没有任何额外开销 (不安装钩子、不启动线程)
+"""
+import io
+import os
+import sys
+import time
+import pstats
+import asyncio
+import cProfile
+import threading
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+from loguru import logger
+from src.config.settings import settings
+
+MODES = ("sample", "cprofile", "memory")
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+class Profiler:
+    def __init__(self):
+        self._active: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def profile_dir() -> Path:
+        path = Path(settings.PROFILE_DIR)
+        return path if path.is_absolute() else Path(__file__).resolve().parent.parent.parent / path
+
+    def active(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [dict(session) for session in self._active.values()]
+
+    def start(self, mode: str, duration: float, component: str) -> Dict[str, Any]:
+        """
+        开启一个剖析会话，duration 秒后自动结束并写出结果。
+        cprofile 模式只剖析调用线程，因此应在事件循环线程中调用 (运行器主循环、API 的 async 路由)。
+        """
+        if mode not in MODES:
+            raise ValueError(f"不支持的剖析模式: {mode} (可选: {', '.join(MODES)})")
+        duration = min(max(float(duration), 1.0), settings.PROFILE_MAX_DURATION)
+        with self._lock:
+            if mode in self._active:
+                raise RuntimeError(f"{mode} 剖析正在进行中")
+            session = {
+                "mode": mode,
+                "component": component,
+                "duration": duration,
+                "started": time.time(),
+                "name": f"{component}-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{mode}",
+            }
+            self._active[mode] = session
+
+        try:
+            if mode == "sample":
+                threading.Thread(target=self._run_sampler, args=(session,), name="profiler-sampler", daemon=True).start()
+            elif mode == "cprofile":
+                self._start_cprofile(session)
+            else:
+                self._start_memory(session)
+        except Exception:
+            with self._lock:
+                self._active.pop(mode, None)
+            raise
+        logger.info(f"已开启 {mode} 剖析 ({component})，持续 {duration:.0f} 秒")
+        return dict(session)
+
+    def _finish(self, session: Dict[str, Any], writer: Callable[[Path], None]):
+        try:
+            directory = self.profile_dir()
+            directory.mkdir(parents=True, exist_ok=True)
+            writer(directory)
+            logger.info(f"{session['mode']} 剖析完成，结果已写入 {directory / session['name']}.*")
+        except Exception as e:
+            logger.error(f"写入剖析结果失败: {e}")
+        finally:
+            with self._lock:
+                self._active.pop(session["mode"], None)
+
+    # --- 栈采样 ---
+
+    def _run_sampler(self, session: Dict[str, Any]):
+        own = threading.get_ident()
+        names = {}
+        stacks: Counter = Counter()
+        samples = 0
+        deadline = time.monotonic() + session["duration"]
+        while time.monotonic() < deadline:
+            if len(names) != threading.active_count():
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                labels = []
+                while frame is not None:
+                    labels.append(_frame_label(frame))
+                    frame = frame.f_back
+                labels.append(names.get(ident, str(ident)))
+                stacks[";".join(reversed(labels))] += 1
+            samples += 1
+            time.sleep(settings.PROFILE_SAMPLE_INTERVAL)
+
+        def write(directory: Path):
+            with open(directory / f"{session['name']}.folded", "w", encoding="utf-8") as f:
+                for stack, count in stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+            # 汇总：按函数统计自身 (栈顶) 与包含 (出现在栈中) 的采样数
+            self_counts: Counter = Counter()
+            total_counts: Counter = Counter()
+            for stack, count in stacks.items():
+                frames = stack.split(";")[1:]
+                if frames:
+                    self_counts[frames[-1]] += count
+                for label in set(frames):
+                    total_counts[label] += count
+            lines = [f"采样次数: {samples} | 间隔: {settings.PROFILE_SAMPLE_INTERVAL}s | 时长: {session['duration']:.0f}s", ""]
+            lines.append(f"{'self':>8} {'total':>8}  function")
+            for label, count in self_counts.most_common(40):
+                lines.append(f"{count:>8} {total_counts[label]:>8}  {label}")
+            (directory / f"{session['name']}.txt").write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+        self._finish(session, write)
+
+    # --- cProfile ---
+
+    def _start_cprofile(self, session: Dict[str, Any]):
+        profile = cProfile.Profile()
+        profile.enable()
+
+        def stop():
+            profile.disable()
+
+            def write(directory: Path):
+                profile.dump_stats(str(directory / f"{session['name']}.prof"))
+                out = io.StringIO()
+                pstats.Stats(profile, stream=out).sort_stats("cumulative").print_stats(60)
+                (directory / f"{session['name']}.txt").write_text(out.getvalue(), encoding="utf-8")
+
+            self._finish(session, write)
+
+        # 必须在开启剖析的同一线程上停止
+        try:
+            asyncio.get_running_loop().call_later(session["duration"], stop)
+        except RuntimeError:
+            profile.disable()
+            raise RuntimeError("cprofile 剖析需要在事件循环中开启")
+
+    # --- tracemalloc ---
+
+    def _start_memory(self, session: Dict[str, Any]):
+        was_tracing = tracemalloc.is_tracing()
+        if not was_tracing:
+            tracemalloc.start(settings.PROFILE_TRACEMALLOC_FRAMES)
+        before = tracemalloc.take_snapshot()
+
+        def stop():
+            after = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            if not was_tracing:
+                tracemalloc.stop()
+            filters = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, "<frozen importlib._bootstrap>")]
+            before_f, after_f = before.filter_traces(filters), after.filter_traces(filters)
+
+            def write(directory: Path):
+                lines = [f"当前跟踪内存: {current / 1024:.1f} KiB | 峰值: {peak / 1024:.1f} KiB", "", "增长最多的分配位置:"]
+                lines += [str(stat) for stat in after_f.compare_to(before_f, "lineno")[:40]]
+                lines += ["", "当前占用最多的分配位置:"]
+                lines += [str(stat) for stat in after_f.statistics("lineno")[:40]]
+                lines += ["", "增长最多的调用栈:"]
+                for stat in after_f.compare_to(before_f, "traceback")[:10]:
+                    lines.append(str(stat))
+                    lines += [f"    {line}" for line in stat.traceback.format()]
+                (directory / f"{session['name']}.txt").write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+            self._finish(session, write)
+
+        timer = threading.Timer(session["duration"], stop)
+        timer.daemon = True
+        timer.start()
+
+    # --- 结果文件 ---
+
+    def list_profiles(self) -> List[Dict[str, Any]]:
+        """列出剖析结果文件 (所有进程共用同一目录)，按时间倒序"""
+        directory = self.profile_dir()
+        if not directory.exists():
+            return []
+        files = []
+        for path in directory.iterdir():
+            if not path.is_file():
+                continue
+            stat = path.stat()
+            parts = path.stem.rsplit("-", 3)
+            files.append({
+                "name": path.name,
+                "component": parts[0] if len(parts) == 4 else None,
+                "mode": parts[-1] if len(parts) == 4 else None,
+                "size": stat.st_size,
+                "modified": datetime.fromtimestamp(stat.st_mtime).isoformat(timespec="seconds"),
+            })
+        return sorted(files, key=lambda item: item["modified"], reverse=True)
+
+    def resolve(self, name: str) -> Optional[Path]:
+        """按文件名取得结果文件路径 (拒绝目录穿越)"""
+        path = self.profile_dir() / name
+        if Path(name).name != name or not path.is_file():
+            return None
+        return path
+
+profiler = Profiler()
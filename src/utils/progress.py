@@ -0,0 +1,158 @@
+"""
+任务实时进度 (运行器进程)：
+1. 每个任务维护一个紧凑的进度状态：当前节点、轮次、探测已发送 / 总数、LLM 调用次数、发现数
+2. 热路径只在内存中累加 (一次加锁的字典更新)，当前任务通过 contextvars 传递，无需修改函数签名
+3. 后台线程每 PROGRESS_INTERVAL 秒将有变化的任务写入 Redis 哈希 webagent:progress:<request_id> (带 TTL)，
+   并将变化合并为一条 JSON 数组发布到 webagent:progress 频道，供 API 推送到前端
+"""
+import json
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+import redis
+from loguru import logger
+from src.config.settings import settings
+
+PROGRESS_CHANNEL = "webagent:progress"
+PROGRESS_KEY_PREFIX = "webagent:progress:"
+# 有序集合：request_id -> 最近更新时间，用于列出近期任务
+PROGRESS_INDEX_KEY = "webagent:progress:index"
+
+class ProgressReporter:
+    def __init__(self):
+        self._current: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("aegisx_progress_task", default=None)
+        self._tasks: Dict[str, Dict[str, Any]] = {}
+        self._dirty: set = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._client: Optional[redis.Redis] = None
+
+    @contextmanager
+    def task(self, request_id: str, project: str, method: str = "", url: str = "") -> Iterator[None]:
+        """登记一个任务并将其设为当前任务，退出时标记完成 (最终状态仍会发布)"""
+        now = time.time()
+        with self._lock:
+            self._tasks[request_id] = {
+                "request_id": request_id, "project": project, "method": method, "url": url,
+                "status": "running", "node": "", "round": 0,
+                "probes_sent": 0, "probes_total": 0, "llm_calls": 0, "findings": 0,
+                "started": now, "updated": now,
+            }
+            self._dirty.add(request_id)
+        self._ensure_started()
+        token = self._current.set(request_id)
+        status = "done"
+        try:
+            yield
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            self._current.reset(token)
+            self.update(request_id, status=status)
+            self._wake.set()
+
+    def update(self, request_id: Optional[str] = None, **fields):
+        """更新当前任务 (或指定任务) 的字段"""
+        request_id = request_id or self._current.get()
+        if request_id is None:
+            return
+        with self._lock:
+            state = self._tasks.get(request_id)
+            if state is None:
+                return
+            state.update(fields)
+            state["updated"] = time.time()
+            self._dirty.add(request_id)
+
+    def incr(self, field: str, amount: int = 1):
+        """累加当前任务的计数字段 (probes_sent / probes_total / llm_calls / findings)"""
+        request_id = self._current.get()
+        if request_id is None:
+            return
+        with self._lock:
+            state = self._tasks.get(request_id)
+            if state is None:
+                return
+            state[field] += amount
+            state["updated"] = time.time()
+            self._dirty.add(request_id)
+
+    def _ensure_started(self):
+        if self._thread and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._loop, name="progress-publisher", daemon=True)
+            self._thread.start()
+
+    def _loop(self):
+        while True:
+            self._wake.wait(settings.PROGRESS_INTERVAL)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.debug(f"发布任务进度失败: {e}")
+                time.sleep(min(settings.PROGRESS_INTERVAL * 4, 5.0))
+
+    def flush(self):
+        """将有变化的任务写入 Redis 并发布，已结束的任务在发布后从内存移除"""
+        with self._lock:
+            if not self._dirty:
+                return
+            changed = [dict(self._tasks[request_id]) for request_id in self._dirty if request_id in self._tasks]
+            self._dirty.clear()
+            for state in changed:
+                if state["status"] != "running":
+                    self._tasks.pop(state["request_id"], None)
+
+        if self._client is None:
+            self._client = redis.from_url(settings.REDIS_URL, decode_responses=True)
+        ttl = settings.PROGRESS_TTL
+        try:
+            pipe = self._client.pipeline(transaction=False)
+            for state in changed:
+                key = PROGRESS_KEY_PREFIX + state["request_id"]
+                pipe.hset(key, mapping=state)
+                pipe.expire(key, ttl)
+                pipe.zadd(PROGRESS_INDEX_KEY, {state["request_id"]: state["updated"]})
+            pipe.zremrangebyscore(PROGRESS_INDEX_KEY, 0, time.time() - ttl)
+            pipe.publish(PROGRESS_CHANNEL, json.dumps(changed, ensure_ascii=False))
+            pipe.execute()
+        except Exception:
+            # 发送失败时重新标记，下一次连同之后的变化一起发送
+            with self._lock:
+                for state in changed:
+                    self._tasks.setdefault(state["request_id"], state)
+                    self._dirty.add(state["request_id"])
+            raise
+
+def parse_progress(raw: Dict[str, str]) -> Dict[str, Any]:
+    """将 Redis 哈希 (字段均为字符串) 还原为进度状态"""
+    state: Dict[str, Any] = dict(raw)
+    for field in ("round", "probes_sent", "probes_total", "llm_calls", "findings"):
+        state[field] = int(state.get(field) or 0)
+    for field in ("started", "updated"):
+        state[field] = float(state.get(field) or 0)
+    return state
+
+def annotate(state: Dict[str, Any], now: Optional[float] = None) -> Dict[str, Any]:
+    """补充派生字段：运行时长、空闲时长、探测速率与是否停滞 (运行中且超过 PROGRESS_STALL_SECONDS 无进展)"""
+    now = now or time.time()
+    end = now if state.get("status") == "running" else state["updated"]
+    elapsed = max(end - state["started"], 0.0)
+    idle = max(now - state["updated"], 0.0) if state.get("status") == "running" else 0.0
+    return {
+        **state,
+        "elapsed": round(elapsed, 1),
+        "idle": round(idle, 1),
+        "probe_rate": round(state["probes_sent"] / elapsed, 1) if elapsed > 0 else 0.0,
+        "stalled": idle > settings.PROGRESS_STALL_SECONDS,
+    }
+
+progress = ProgressReporter()
@@ -0,0 +1,189 @@
+"""
+运行时配置同步：
+1. API 修改配置时写入 Redis 哈希 webagent:config (字段为 JSON 值，__version__ 为单调递增的版本号)，
+   并在 webagent:config:changed 频道发布变更通知
+2. 运行器、拦截器等子进程启动时只记录当前版本号作为基线，不应用已有的配置文档：进程启动时的配置以
+   环境变量与 .env 为准 (API 修改配置时会同时写入 .env)，启动后手动修改的 .env 在重启后即可生效
+3. 之后订阅通知，版本号高于基线时重新加载并应用到本进程的 settings
+4. 各组件通过 add_listener 注册回调，在配置变化后重新应用与吞吐相关的设置 (并发上限、模型等)，无需重启进程
+"""
+import json
+import time
+import asyncio
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+import redis
+from loguru import logger
+from src.config.settings import settings, Settings
+
+CONFIG_KEY = "webagent:config"
+CONFIG_CHANNEL = "webagent:config:changed"
+VERSION_FIELD = "__version__"
+
+# 只在进程启动时读取的配置，修改后需重启对应组件才会生效
+RESTART_REQUIRED = {
+    "MITM_PROXY_PORT", "REDIS_URL", "DB_POOL_SIZE", "DB_BUSY_TIMEOUT", "DB_ASYNC_WORKERS", "DB_ASYNC_MAX_PENDING",
+    "LOG_LEVEL", "LOG_STREAM_LEVEL", "AUDIT_QUEUE_SIZE", "LOG_SHIP_BUFFER", "METRICS_DIR",
+    "API_WORKERS",
+}
+
+class RuntimeConfig:
+    def __init__(self):
+        self.version = 0
+        self.component: Optional[str] = None
+        self._listeners: List[Tuple[Optional[Set[str]], Callable[[Set[str]], None], Optional[asyncio.AbstractEventLoop]]] = []
+        self._thread: Optional[threading.Thread] = None
+        self._client: Optional[redis.Redis] = None
+        self._lock = threading.Lock()
+        # 已见过的配置文档原始值：只有与之不同 (即本进程启动后发布) 的配置项才会被应用
+        self._seen: Dict[str, str] = {}
+
+    @property
+    def client(self) -> redis.Redis:
+        if self._client is None:
+            self._client = redis.from_url(settings.REDIS_URL, decode_responses=True)
+        return self._client
+
+    @staticmethod
+    def validate(updates: Dict[str, Any]) -> Dict[str, Any]:
+        """按 Settings 的字段定义与校验器转换取值，未知字段或非法取值抛出 ValueError"""
+        unknown = [key for key in updates if key not in Settings.model_fields]
+        if unknown:
+            raise ValueError(f"未知的配置项: {', '.join(unknown)}")
+        # model_validate 不读取环境变量与 .env，只校验传入的值
+        merged = Settings.model_validate({**settings.model_dump(), **updates})
+        return {key: getattr(merged, key) for key in updates}
+
+    def apply(self, values: Dict[str, Any]) -> Set[str]:
+        """将配置应用到本进程的 settings，返回实际发生变化的配置项"""
+        changed = set()
+        with self._lock:
+            for key, value in values.items():
+                if key in Settings.model_fields and getattr(settings, key) != value:
+                    setattr(settings, key, value)
+                    changed.add(key)
+        return changed
+
+    def publish(self, updates: Dict[str, Any]) -> Tuple[int, Set[str]]:
+        """
+        校验并发布配置变更：先应用到本进程，再写入 Redis 并通知其他进程。
+        返回 (新版本号, 本进程中发生变化的配置项)；Redis 不可用时抛出异常，但本进程已生效。
+        """
+        values = self.validate(updates)
+        changed = self.apply(values)
+        self._notify(changed)
+        encoded = {key: json.dumps(value) for key, value in values.items()}
+        pipe = self.client.pipeline(transaction=True)
+        pipe.hset(CONFIG_KEY, mapping=encoded)
+        pipe.hincrby(CONFIG_KEY, VERSION_FIELD, 1)
+        version = pipe.execute()[1]
+        self.version = version
+        self._seen.update(encoded)
+        self.client.publish(CONFIG_CHANNEL, json.dumps({"version": version, "keys": sorted(values)}))
+        return version, changed
+
+    def load(self, keys: Optional[Iterable[str]] = None) -> Set[str]:
+        """
+        从 Redis 读取配置文档，应用本进程启动后发布的配置项 (版本号不高于已应用的版本时跳过)：
+        取值与已见过的不同，或在变更通知的 keys 中 (重复发布相同取值) 的配置项。
+        文档中早于本进程启动的配置项不会覆盖环境变量与 .env。
+        """
+        raw = self.client.hgetall(CONFIG_KEY)
+        version = int(raw.pop(VERSION_FIELD, 0) or 0)
+        if version <= self.version:
+            return set()
+        published = set(keys or ()) & raw.keys()
+        fresh = {key: value for key, value in raw.items() if key in published or self._seen.get(key) != value}
+        self._seen.update(raw)
+        values = {}
+        for key, value in fresh.items():
+            try:
+                values[key] = json.loads(value)
+            except ValueError:
+                continue
+        try:
+            values = self.validate({key: value for key, value in values.items() if key in Settings.model_fields})
+        except ValueError as e:
+            logger.error(f"运行时配置 (版本 {version}) 校验失败，已忽略: {e}")
+            self.version = version
+            return set()
+        changed = self.apply(values)
+        self.version = version
+        if changed:
+            logger.info(f"已应用运行时配置 (版本 {version}): {', '.join(sorted(changed))}")
+            restart = changed & RESTART_REQUIRED
+            if restart:
+                logger.warning(f"以下配置需重启 {self.component or '当前进程'} 后生效: {', '.join(sorted(restart))}")
+        self._notify(changed)
+        return changed
+
+    def sync_version(self):
+        """以 Redis 中的当前配置文档为基线，不应用 (启动时 settings 已从环境变量与 .env 读取)"""
+        raw = self.client.hgetall(CONFIG_KEY)
+        self.version = max(self.version, int(raw.pop(VERSION_FIELD, 0) or 0))
+        self._seen.update(raw)
+
+    def add_listener(self, callback: Callable[[Set[str]], None], keys: Optional[Iterable[str]] = None,
+                     loop: Optional[asyncio.AbstractEventLoop] = None):
+        """
+        注册配置变化回调 (参数为发生变化的配置项)。
+        keys 为关注的配置项 (为空表示全部)；指定 loop 时回调在该事件循环线程中执行，用于调整 asyncio 对象。
+        """
+        self._listeners.append((set(keys) if keys else None, callback, loop))
+
+    def _notify(self, changed: Set[str]):
+        if not changed:
+            return
+        for keys, callback, loop in list(self._listeners):
+            relevant = changed if keys is None else changed & keys
+            if not relevant:
+                continue
+            try:
+                if loop is not None:
+                    loop.call_soon_threadsafe(callback, relevant)
+                else:
+                    callback(relevant)
+            except Exception as e:
+                logger.error(f"应用配置变更失败 ({getattr(callback, '__qualname__', callback)}): {e}")
+
+    def start(self, component: str):
+        """启动配置订阅线程 (每个子进程调用一次)，启动时只记录当前版本号，之后发布的变更才会应用"""
+        self.component = component
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._listen, name="config-listener", daemon=True)
+        self._thread.start()
+
+    def _listen(self):
+        delay = 1.0
+        baseline = True
+        while True:
+            pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(CONFIG_CHANNEL)
+                # 订阅后再读取，避免错过订阅建立期间发布的变更；首次连接只记录基线，重连后补齐断开期间的变更
+                if baseline:
+                    self.sync_version()
+                    baseline = False
+                else:
+                    self.load()
+                delay = 1.0
+                for message in pubsub.listen():
+                    try:
+                        notice = json.loads(message["data"])
+                        version, keys = notice.get("version", 0), notice.get("keys")
+                    except (ValueError, AttributeError):
+                        version, keys = self.version + 1, None
+                    if version > self.version:
+                        self.load(keys)
+            except Exception as e:
+                logger.warning(f"运行时配置订阅中断，{delay:.0f} 秒后重连: {e}")
+                time.sleep(delay)
+                delay = min(delay * 2, 30.0)
+            finally:
+                try:
+                    pubsub.close()
+                except Exception:
+                    pass
+
+runtime_config = RuntimeConfig()
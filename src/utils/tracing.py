@@ -0,0 +1,206 @@
+"""
+任务级轻量追踪：
+1. 每个任务 (request_id) 形成一棵 Span 树：任务根 Span -> 图节点 -> LLM 调用 / 执行器批次
+2. 当前 Span 保存在 contextvars 中，随 asyncio 任务与 LangGraph 节点自动传递，无需修改函数签名
+3. 结束的 Span 放入队列，由后台线程批量写入 SQLite (trace_spans)，热路径不做 IO
+4. 可选地以 OTLP/JSON 格式追加写入 TRACE_OTLP_FILE，供 OpenTelemetry Collector 的文件接收器或其他工具导入
+"""
+import json
+import time
+import queue
+import secrets
+import threading
+import contextvars
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+from loguru import logger
+from src.config.settings import settings
+
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "project", "name", "start_time", "_started", "status", "attributes")
+
+    def __init__(self, trace_id: str, name: str, parent: Optional["Span"] = None, project: Optional[str] = None,
+                 attributes: Optional[Dict[str, Any]] = None):
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent.span_id if parent else None
+        self.project = project or (parent.project if parent else None)
+        self.name = name
+        self.start_time = time.time()
+        self._started = time.perf_counter()
+        self.status = "ok"
+        self.attributes = dict(attributes or {})
+
+    def set(self, **attributes):
+        """补充属性 (例如执行完成后的探测数量)"""
+        self.attributes.update(attributes)
+
+    def to_dict(self, duration: float) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "project": self.project,
+            "name": self.name,
+            "start_time": self.start_time,
+            "duration_ms": round(duration * 1000, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+class _NoopSpan:
+    """不在任务上下文中 (或追踪关闭) 时返回的空 Span"""
+    def set(self, **attributes):
+        pass
+
+_NOOP = _NoopSpan()
+
+class Tracer:
+    def __init__(self):
+        self._current: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("aegisx_span", default=None)
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=settings.TRACE_QUEUE_SIZE)
+        self._writer: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    @property
+    def enabled(self) -> bool:
+        return settings.TRACE_ENABLED
+
+    def current(self) -> Optional[Span]:
+        return self._current.get()
+
+    @contextmanager
+    def span(self, name: str, trace_id: Optional[str] = None, project: Optional[str] = None, **attributes) -> Iterator[Any]:
+        """
+        开启一个 Span。传入 trace_id 时开启新的追踪 (根 Span)，否则作为当前 Span 的子 Span；
+        两者都没有时不记录，因此在任务之外调用 (如单元脚本、API 进程) 没有任何开销。
+        """
+        parent = self._current.get()
+        if not self.enabled or (trace_id is None and parent is None):
+            yield _NOOP
+            return
+        span = Span(trace_id or parent.trace_id, name, parent=None if trace_id else parent,
+                    project=project, attributes=attributes)
+        token = self._current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.status = "error"
+            span.attributes.setdefault("error", f"{type(e).__name__}: {e}"[:500])
+            raise
+        finally:
+            self._current.reset(token)
+            self._finish(span, time.perf_counter() - span._started)
+
+    def record(self, name: str, started: float, status: str = "ok", **attributes):
+        """补记一个已结束的子 Span (started 为 time.perf_counter() 起点)，用于 LLM 调用这类已自行计时的操作"""
+        parent = self._current.get()
+        if not self.enabled or parent is None:
+            return
+        duration = time.perf_counter() - started
+        span = Span(parent.trace_id, name, parent=parent, attributes=attributes)
+        span.start_time -= duration
+        span.status = status
+        self._finish(span, duration)
+
+    def _finish(self, span: Span, duration: float):
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait(span.to_dict(duration))
+        except queue.Full:
+            # 数据库写入跟不上时丢弃 Span，不能阻塞任务也不能无限占用内存
+            self._drop()
+
+    def _drop(self):
+        # metrics 模块依赖本模块，延迟导入
+        from src.utils.metrics import metrics
+        self.dropped += 1
+        metrics.counter("aegisx_trace_spans_dropped_total", "追踪队列已满时丢弃的 Span 数").inc()
+        if self.dropped == 1 or self.dropped % 1000 == 0:
+            logger.warning(f"追踪队列已满 (数据库写入过慢)，已丢弃 {self.dropped} 个 Span")
+
+    def _ensure_writer(self):
+        if self._writer and self._writer.is_alive():
+            return
+        with self._lock:
+            if self._writer and self._writer.is_alive():
+                return
+            self._writer = threading.Thread(target=self._write_loop, name="trace-writer", daemon=True)
+            self._writer.start()
+
+    def _write_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            # 稍等片刻，让同一任务内相继结束的 Span 合并为一次事务
+            time.sleep(0.2)
+            while len(batch) < 500:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._write(batch)
+            for _ in batch:
+                self._queue.task_done()
+
+    def _write(self, spans: List[Dict[str, Any]]):
+        from src.utils.db_helper import db_helper
+        try:
+            db_helper.save_spans(spans)
+        except Exception as e:
+            logger.warning(f"写入追踪数据失败 ({len(spans)} 个 Span): {e}")
+        if settings.TRACE_OTLP_FILE:
+            try:
+                path = Path(settings.TRACE_OTLP_FILE)
+                path.parent.mkdir(parents=True, exist_ok=True)
+                with path.open("a", encoding="utf-8") as f:
+                    f.write(json.dumps(to_otlp(spans), ensure_ascii=False) + "\n")
+            except OSError as e:
+                logger.warning(f"导出 OTLP 追踪数据失败: {e}")
+
+    def flush(self, timeout: float = 2.0):
+        """退出前等待已结束的 Span 全部写入"""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+def to_otlp(spans: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    转换为 OTLP/JSON (ExportTraceServiceRequest) 结构：
+    traceId 由 request_id 去掉连字符得到 (32 位十六进制)，时间为 Unix 纳秒
+    """
+    otlp_spans = []
+    for span in spans:
+        start_ns = int(span["start_time"] * 1e9)
+        attributes = dict(span.get("attributes") or {})
+        if span.get("project"):
+            attributes.setdefault("aegisx.project", span["project"])
+        item = {
+            "traceId": span["trace_id"].replace("-", "")[:32].rjust(32, "0"),
+            "spanId": span["span_id"],
+            "name": span["name"],
+            "kind": 1,
+            "startTimeUnixNano": str(start_ns),
+            "endTimeUnixNano": str(start_ns + int(span["duration_ms"] * 1e6)),
+            "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in attributes.items()],
+            "status": {"code": 2} if span.get("status") == "error" else {"code": 1},
+        }
+        if span.get("parent_id"):
+            item["parentSpanId"] = span["parent_id"]
+        otlp_spans.append(item)
+    return {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": "aegisx"}}]},
+        "scopeSpans": [{"scope": {"name": "aegisx.tracing"}, "spans": otlp_spans}],
+    }]}
+
+tracer = Tracer()